@@ -0,0 +1 @@
+"""Performance benchmarks; run a module with ``python -m benchmarks.<name>``."""
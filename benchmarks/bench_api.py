@@ -0,0 +1,112 @@
+"""Benchmark the HTTP/JSON API under concurrent keep-alive clients.
+
+Seeds a temporary SQLite database with synthetic profiles, starts the API
+server in-process on a free port and runs concurrent clients that mix
+profile lookups, cached single advice and label counts. Clients share the
+event loop (and CPU) with the server, so the throughput is a lower bound.
+Exits non-zero when throughput falls below the budget.
+
+    python -m benchmarks.bench_api --profiles 100000 --clients 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from consumer_insights.engine import InsightsEngine
+from consumer_insights.server import ApiServer
+from consumer_insights.storage import SQLiteRepository
+
+from .synthetic import generate_profiles
+
+MIN_REQUESTS_PER_SECOND = 1000
+
+
+def _requests(rng, profile_count, count):
+    """Mixed workload: profile lookups, single advice and counts."""
+    kinds = rng.choice(3, size=count, p=[0.5, 0.4, 0.1])
+    ids = rng.integers(1, min(profile_count, 1000) + 1, size=count)
+    requests = []
+    for kind, profile_id in zip(kinds, ids):
+        if kind == 0:
+            requests.append(("GET", f"/profiles/{profile_id}", b""))
+        elif kind == 1:
+            body = json.dumps({"profile_id": int(profile_id), "advice_type": "Marketing Messaging"})
+            requests.append(("POST", "/advice", body.encode()))
+        else:
+            requests.append(("GET", "/analytics/counts/interests", b""))
+    return requests
+
+
+async def _client(port, requests, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for method, path, body in requests:
+            started = time.perf_counter()
+            writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            status = await reader.readline()
+            length = 0
+            while (line := await reader.readline()) != b"\r\n":
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            if not status.startswith(b"HTTP/1.1 200"):
+                raise RuntimeError(f"{method} {path}: {status.decode().strip()}")
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        writer.close()
+
+
+async def _run(engine, clients, requests):
+    api = ApiServer(engine)
+    server = await api.start("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    latencies = []
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(_client(port, requests[i::clients], latencies) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.close()
+        await server.wait_closed()
+        api.close()
+    return elapsed, latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=100_000)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--min-rps", type=float, default=MIN_REQUESTS_PER_SECOND)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        repository = SQLiteRepository(path)
+        for start in range(0, args.profiles, 100_000):
+            repository.save_profiles(generate_profiles(min(100_000, args.profiles - start), start_id=start + 1))
+        engine = InsightsEngine.open(path)
+        print(f"loaded {len(engine.profiles):,} profiles")
+
+        requests = _requests(np.random.default_rng(0), args.profiles, args.requests)
+        elapsed, latencies = asyncio.run(_run(engine, args.clients, requests))
+
+    rate = len(latencies) / elapsed
+    p99 = np.percentile(latencies, 99)
+    status = "ok" if rate >= args.min_rps else "SLOW"
+    print(f"{status:4} {len(latencies):,} requests from {args.clients} clients: {rate:,.0f} req/s, "
+          f"median {statistics.median(latencies):.2f} ms, p99 {p99:.2f} ms")
+    return 0 if rate >= args.min_rps else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
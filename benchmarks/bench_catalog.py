@@ -0,0 +1,96 @@
+"""Benchmark the product catalog and recommendations across catalog sizes.
+
+For each catalog size (1,000 to 1,000,000 products by default) builds a
+``ProductCatalog`` from synthetic products and times, per operation:
+
+- the bulk load (``extend``) and one product saved or deleted,
+- a price-band query in one category,
+- product recommendations for sample profiles (filtering, ranking and
+  reading the chosen records), which should not grow with the catalog.
+
+Results are printed and optionally written as JSON; exits non-zero when a
+case exceeds its budget or regresses against a baseline.
+
+    python -m benchmarks.bench_catalog --sizes 1000 100000 1000000
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from consumer_insights.catalog import ProductCatalog
+from consumer_insights.recommendations import RecommendationEngine
+from consumer_insights.schema import ALL_CATEGORIES
+
+from . import harness
+from .synthetic import generate_products, generate_profiles
+
+# Per-operation budgets in milliseconds
+BUDGETS_MS = {
+    "recommend": 0.2,
+    "price_range": 0.1,
+    "upsert": 20,
+    "delete": 50,
+}
+
+# Budget of the bulk load, per million products
+LOAD_BUDGET_MS_PER_MILLION = 5000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ops", type=int, default=200)
+    harness.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    profiles = generate_profiles(args.ops, seed=5)
+    results = []
+    for size in args.sizes:
+        products = generate_products(size)
+        started = time.perf_counter()
+        catalog = ProductCatalog.from_records(products)
+        load_ms = (time.perf_counter() - started) * 1000
+        results.append(harness.result(f"catalog.{size}.load", [load_ms],
+                                      budget_ms=LOAD_BUDGET_MS_PER_MILLION * max(size, 100_000) / 1_000_000))
+
+        engine = RecommendationEngine(catalog)
+        rng = np.random.default_rng(size)
+        categories = [ALL_CATEGORIES if i % 2 else products[i]["category"] for i in range(len(profiles))]
+        sample = [products[i] for i in rng.choice(size, size=args.ops)]
+        edits = [dict(product, price=round(product["price"] * 1.1, 2)) for product in sample]
+        bands = [(low, low * 1.5) for low in rng.uniform(5, 1000, size=args.ops)]
+        new = [dict(product, id=size + 1 + i) for i, product in enumerate(sample)]
+
+        def recommend(i):
+            profile, category = profiles[i], categories[i]
+            engine.recommend(profile["interests"], None if category == ALL_CATEGORIES else category,
+                             price_sensitive=i % 3 == 0)
+
+        def add_and_delete(i):
+            # Appending then deleting the newest row keeps the catalog the same size
+            catalog.upsert(new[i])
+            catalog.delete(new[i]["id"])
+
+        cases = {
+            "recommend": recommend,
+            "price_range": lambda i: catalog.price_range(*bands[i], category=sample[i]["category"])[:20],
+            "upsert": lambda i: catalog.upsert(edits[i]),
+            "delete": add_and_delete,
+        }
+        for name, func in cases.items():
+            timings = harness.measure(func, ops=args.ops, repeat=args.repeat)
+            results.append(harness.result(f"catalog.{size}.{name}", timings, ops=args.ops,
+                                          budget_ms=BUDGETS_MS[name]))
+
+    if args.baseline:
+        harness.compare(results, args.baseline, args.tolerance)
+    env = harness.environment(sizes=args.sizes)
+    return harness.report("catalog", results, env, args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Benchmark the advice job queue under concurrent users.
+
+Loads synthetic profiles into a SQLite-backed engine and times, per case:
+
+- submitting an advice job (what a Generate Advice click blocks on),
+- one uncached advice request end to end through the queue,
+- a user's single advice request while another user has a full queue of
+  segment batch jobs (fairness: it waits for at most one batch job per
+  worker, not for the whole backlog),
+- the same segment batch requested by many users at once (single-flight:
+  it runs once and every user waits about one batch's duration).
+
+Results are printed and optionally written as JSON; exits non-zero when a
+case exceeds its budget or regresses against a baseline.
+
+    python -m benchmarks.bench_jobs --profiles 100000 --users 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from consumer_insights.advice import SUPPORTED_ADVICE_TYPES
+from consumer_insights.dataset import SharedDataset
+from consumer_insights.engine import InsightsEngine
+from consumer_insights.sample_data import SAMPLE_PRODUCTS
+from consumer_insights.storage import SQLiteRepository
+
+from . import harness
+from .synthetic import generate_profiles
+
+# Per-operation budgets in milliseconds
+BUDGETS_MS = {
+    "jobs.submit": 0.2,
+    "jobs.advice": 5,
+}
+
+# Budgets in units of one segment batch job run alone. The fair advice may wait for the batches
+# already running, one per worker and sharing the CPU, but not for the rest of the backlog
+FAIR_ADVICE_BATCHES_PER_WORKER = 1.25
+SHARED_BATCH_BATCHES = 1.5
+
+# Profiles in each segment batch job
+BATCH_PROFILES = 4000
+
+
+def _timed(func):
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ops", type=int, default=1000)
+    harness.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        repository = SQLiteRepository(os.path.join(directory, "bench.db"))
+        repository.save_profiles(generate_profiles(args.profiles, seed=6))
+        repository.save_products(SAMPLE_PRODUCTS)
+        engine = InsightsEngine(SharedDataset(repository))
+        # Submits outpace the workers in the first case, so let it queue every job
+        engine.jobs.max_pending_per_user = engine.jobs.max_queued = args.ops * (args.repeat + 1)
+        store = engine.profiles
+        print(f"loaded {len(store):,} profiles")
+
+        rng = np.random.default_rng(7)
+        profiles = [store.record(int(row)) for row in rng.choice(len(store), size=args.ops, replace=False)]
+        advice_types = list(SUPPORTED_ADVICE_TYPES)
+        results = []
+
+        submitted = []
+
+        def submit(i):
+            submitted.append(engine.submit_advice("bench", profiles[i], "Product Recommendations"))
+
+        timings = harness.measure(submit, ops=args.ops, repeat=args.repeat)
+        results.append(harness.result("jobs.submit", timings, ops=args.ops, budget_ms=BUDGETS_MS["jobs.submit"]))
+        for job in submitted:
+            job.wait()
+        engine.jobs.max_pending_per_user = 4
+
+        def advice(i):
+            engine.dataset.advice_cache.clear()
+            engine.submit_advice("bench", profiles[i], advice_types[i % len(advice_types)]).wait()
+
+        timings = harness.measure(advice, ops=args.ops, repeat=args.repeat)
+        results.append(harness.result("jobs.advice", timings, ops=args.ops, budget_ms=BUDGETS_MS["jobs.advice"]))
+
+        # Fresh segments each time, so no batch job is shared unless it is meant to be
+        batches = (np.sort(rng.choice(len(store), size=BATCH_PROFILES, replace=False)) for _ in iter(int, 1))
+        single = [_timed(lambda: engine.submit_segment_advice("bench", next(batches), advice_types).wait())
+                  for _ in range(args.repeat)]
+        batch_ms = float(np.median(single))
+        print(f"one batch job of {BATCH_PROFILES:,} profiles: {batch_ms:.0f} ms")
+
+        fair = []
+        for _ in range(args.repeat):
+            # One user queues as many batch jobs as allowed, then another asks for one advice
+            flood = [engine.submit_segment_advice("flood", next(batches), advice_types)
+                     for _ in range(engine.jobs.max_pending_per_user)]
+            while engine.jobs.stats()["running"] < engine.jobs.workers:
+                time.sleep(0.001)
+            engine.dataset.advice_cache.clear()
+            fair.append(_timed(lambda: engine.submit_advice("analyst", profiles[0], advice_types[0]).wait()))
+            for job in flood:
+                job.wait()
+        results.append(harness.result("jobs.fair_advice", fair,
+                                      budget_ms=FAIR_ADVICE_BATCHES_PER_WORKER * engine.jobs.workers * batch_ms))
+
+        shared = []
+        for _ in range(args.repeat):
+            rows = next(batches)
+            start = threading.Barrier(args.users)
+            latencies = []
+
+            def user(i, rows=rows, start=start, latencies=latencies):
+                start.wait()
+                latencies.append(_timed(lambda: engine.submit_segment_advice(f"user{i}", rows, advice_types).wait()))
+
+            threads = [threading.Thread(target=user, args=(i,)) for i in range(args.users)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            shared.append(max(latencies))
+        results.append(harness.result("jobs.shared_batch", shared,
+                                      budget_ms=SHARED_BATCH_BATCHES * batch_ms))
+        engine.jobs.close()
+
+    if args.baseline:
+        harness.compare(results, args.baseline, args.tolerance)
+    print(f"job queue: {engine.jobs.stats()}")
+    env = harness.environment(profiles=args.profiles, users=args.users, batch_profiles=BATCH_PROFILES,
+                              workers=engine.jobs.workers)
+    return harness.report("jobs", results, env, args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
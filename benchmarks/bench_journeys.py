@@ -0,0 +1,102 @@
+"""Benchmark journey-stage event storage and funnel analytics.
+
+Generates synthetic stage transitions (20M events over a year by default),
+appends them to a day-partitioned ``StageEventStore`` on disk and times:
+
+- appending the whole history, and recording single transitions,
+- loading every partition back from disk,
+- cohort conversion over 30 and 90-day windows,
+- time in stage and transition counts over 90 days.
+
+The analytics cases run against the loaded store, as queries after the
+first in the app do. Results are printed and optionally written as JSON;
+exits non-zero when a case exceeds its budget or regresses.
+
+    python -m benchmarks.bench_journeys --events 20000000 --output journeys.json
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+
+from consumer_insights.journeys import StageEventStore, cohort_conversion, time_in_stage, transition_counts
+
+from . import harness
+from .synthetic import generate_stage_events
+
+# Per-operation budgets in milliseconds
+BUDGETS_MS = {
+    "journeys.record": 1,
+    "journeys.cohorts.30d": 200,
+    "journeys.cohorts.90d": 500,
+    "journeys.time_in_stage.90d": 500,
+    "journeys.transitions.90d": 300,
+}
+
+# Budgets of the cases whose cost grows with the whole history, per million events
+BUDGETS_MS_PER_MILLION = {
+    "journeys.append": 500,
+    "journeys.load": 50,
+}
+
+DAY = 86400
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20_000_000)
+    parser.add_argument("--profiles", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=5)
+    harness.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    now = time.time()
+    events = generate_stage_events(args.events, args.profiles, args.days, end=now)
+    print(f"generated {len(events[0]):,} transitions for {args.profiles:,} profiles over {args.days} days")
+    millions = max(args.events, 1_000_000) / 1_000_000
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        # Each repetition appends the history to a fresh store, so it is timed once
+        started = time.perf_counter()
+        StageEventStore(directory).append(*events)
+        append_ms = (time.perf_counter() - started) * 1000
+        results.append(harness.result("journeys.append", [append_ms],
+                                      budget_ms=BUDGETS_MS_PER_MILLION["journeys.append"] * millions))
+        del events
+
+        def load(i):
+            StageEventStore(directory).columns(fields=("time",))
+
+        timings = harness.measure(load, repeat=args.repeat, warmup=0)
+        results.append(harness.result("journeys.load", timings,
+                                      budget_ms=BUDGETS_MS_PER_MILLION["journeys.load"] * millions))
+
+        store = StageEventStore(directory)
+        store.columns(fields=("time",))
+        cases = {
+            "journeys.cohorts.30d": lambda i: cohort_conversion(store, now - 30 * DAY, now, period_days=1),
+            "journeys.cohorts.90d": lambda i: cohort_conversion(store, now - 90 * DAY, now, period_days=7),
+            "journeys.time_in_stage.90d": lambda i: time_in_stage(store, now - 90 * DAY, now),
+            "journeys.transitions.90d": lambda i: transition_counts(store, now - 90 * DAY, now),
+        }
+        for name, func in cases.items():
+            results.append(harness.result(name, harness.measure(func, repeat=args.repeat),
+                                          budget_ms=BUDGETS_MS[name]))
+
+        ops = 1000
+        profile_ids = range(args.profiles + 1, args.profiles + 1 + ops)
+        record = lambda i: store.record(profile_ids[i], None, store.stages[0])
+        results.append(harness.result("journeys.record", harness.measure(record, ops=ops, repeat=args.repeat),
+                                      ops=ops, budget_ms=BUDGETS_MS["journeys.record"]))
+
+    if args.baseline:
+        harness.compare(results, args.baseline, args.tolerance)
+    env = harness.environment(events=args.events, profiles=args.profiles, days=args.days)
+    return harness.report("journeys", results, env, args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
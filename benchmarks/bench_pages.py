@@ -0,0 +1,84 @@
+"""Load test: full-page rerun latency of the Streamlit app per navigation page.
+
+Seeds a temporary SQLite database with synthetic profiles, then drives
+``main.py`` headlessly with Streamlit's ``AppTest``: for every page of the
+sidebar navigation it times the first visit (cold caches) and repeated
+reruns (what a user waits for after every widget interaction). The engine
+is created once per process (``st.cache_resource``), so the first
+``AppTest`` run, which loads the data, is reported separately as
+``startup``.
+
+    python -m benchmarks.bench_pages --profiles 100000 --output pages.json
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from consumer_insights.storage import SQLiteRepository
+
+from . import harness
+from .synthetic import generate_profiles
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+PAGES = {
+    "dashboard": "🏠 Dashboard",
+    "profiles": "👥 Consumer Profiles",
+    "advisor": "🤖 AI Consumer Advisor",
+    "insights": "📊 Insights & Analytics",
+    "settings": "⚙️ Settings",
+}
+
+# Rerun latency budget per page, in milliseconds
+RERUN_BUDGET_MS = 1000
+
+
+def _timed_run(app):
+    started = time.perf_counter()
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return (time.perf_counter() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=RERUN_BUDGET_MS)
+    harness.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from streamlit.testing.v1 import AppTest
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pages.db")
+        repository = SQLiteRepository(path)
+        for start in range(0, args.profiles, 100_000):
+            repository.save_profiles(generate_profiles(min(100_000, args.profiles - start), start_id=start + 1))
+        os.environ["CONSUMER_INSIGHTS_DB"] = path
+        print(f"seeded {args.profiles:,} profiles")
+
+        app = AppTest.from_file(APP_PATH, default_timeout=600)
+        results.append(harness.result("startup", [_timed_run(app)]))
+        for name, page in PAGES.items():
+            app = AppTest.from_file(APP_PATH, default_timeout=600)
+            app.run()
+            app.sidebar.radio[0].set_value(page)
+            first = _timed_run(app)
+            reruns = [_timed_run(app) for _ in range(args.repeat)]
+            results.append(harness.result(f"page.{name}.first", [first]))
+            results.append(harness.result(f"page.{name}.rerun", reruns, budget_ms=args.budget_ms))
+
+    if args.baseline:
+        harness.compare(results, args.baseline, args.tolerance)
+    env = harness.environment(profiles=args.profiles)
+    return harness.report("pages", results, env, args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Benchmark the Insights page segment analytics.
+
+Builds a synthetic store (1M profiles by default) and times a full
+``segment_report`` for every segment dimension. Each repetition edits one
+profile first, so the report and the derived occupation codes are rebuilt
+from the columns exactly as after an edit in the app. Exits non-zero when
+the median exceeds the interactivity budget.
+
+    python -m benchmarks.bench_segments --profiles 1000000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from consumer_insights.segments import SEGMENT_FIELDS, segment_report
+
+from .synthetic import generate_store
+
+BUDGET_MS = 200
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    store = generate_store(args.profiles)
+    print(f"built {len(store):,} profiles in {time.perf_counter() - started:.1f}s")
+
+    profile = store.record(0)
+    failed = False
+    for label, field in SEGMENT_FIELDS.items():
+        timings = []
+        for _ in range(args.repeat):
+            store.upsert(profile)
+            started = time.perf_counter()
+            segment_report(store, field)
+            timings.append((time.perf_counter() - started) * 1000)
+        median = statistics.median(timings)
+        status = "ok" if median <= args.budget_ms else "SLOW"
+        failed |= median > args.budget_ms
+        print(f"{status:4} {label:<13} median {median:7.1f} ms  max {max(timings):7.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
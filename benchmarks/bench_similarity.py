@@ -0,0 +1,67 @@
+"""Benchmark persona similarity search.
+
+Builds a synthetic store (1M profiles by default), encodes it and times
+single-query and batched k-NN search on the exact index and on the IVF
+approximate index, whose recall is measured against exact results.
+Exits non-zero when a median query latency exceeds its budget.
+
+    python -m benchmarks.bench_similarity --profiles 1000000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from consumer_insights.similarity import ExactIndex, IVFIndex, feature_matrix
+
+from .synthetic import generate_store
+
+EXACT_BUDGET_MS = 50
+APPROXIMATE_BUDGET_MS = 5
+
+
+def _timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    store = generate_store(args.profiles)
+    (vectors, names), ms = _timed(lambda: feature_matrix(store))
+    print(f"encoded {len(vectors):,} profiles x {len(names)} features in {ms:.0f} ms")
+    queries = vectors[np.random.default_rng(1).choice(len(vectors), args.queries, replace=False)]
+
+    exact, ms = _timed(lambda: ExactIndex(vectors))
+    print(f"exact index built in {ms:.0f} ms")
+    single = [_timed(lambda: exact.search(query, args.k))[1] for query in queries]
+    (exact_rows, exact_scores), batch_ms = _timed(lambda: exact.search(queries, args.k))
+
+    ivf, ms = _timed(lambda: IVFIndex(vectors))
+    print(f"IVF index built in {ms:.0f} ms ({len(ivf.centroids)} cells, nprobe {ivf.nprobe})")
+    approximate = [_timed(lambda: ivf.search(query, args.k))[1] for query in queries]
+    _, ivf_scores = ivf.search(queries, args.k)
+    # Ties are common, so a hit is any result scoring at least the exact k-th score
+    recall = np.mean(ivf_scores >= exact_scores[:, -1:] - 1e-6)
+
+    failed = False
+    for label, timings, budget in (("exact", single, EXACT_BUDGET_MS), ("ivf", approximate, APPROXIMATE_BUDGET_MS)):
+        median = statistics.median(timings)
+        failed |= median > budget
+        status = "ok" if median <= budget else "SLOW"
+        print(f"{status:4} {label:<6} median {median:7.2f} ms  max {max(timings):7.2f} ms  (budget {budget} ms)")
+    print(f"     exact batched {batch_ms / len(queries):.2f} ms/query; ivf recall@{args.k} {recall:.3f}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
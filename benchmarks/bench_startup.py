@@ -0,0 +1,113 @@
+"""Benchmark cold start: time to the first render of each page in a fresh process.
+
+For every navigation page a new interpreter runs ``main.py`` once with
+Streamlit's ``AppTest`` and that page preselected, and the time from
+before the script starts to the end of its first run is recorded (the
+``streamlit`` import itself is excluded). Two modes are compared:
+
+``lazy``
+    the app as it is: each page imports and loads only what it uses.
+``eager``
+    the same run after importing the whole data and plotting stack and
+    loading the profile data up front, as the app did before imports and
+    data loading became page-scoped.
+
+    python -m benchmarks.bench_startup --profiles 100000 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from consumer_insights.storage import SQLiteRepository
+
+from . import harness
+from .bench_pages import APP_PATH, PAGES
+from .synthetic import generate_profiles
+
+# Modules the app used to import before rendering anything
+EAGER_MODULES = [
+    "numpy", "pandas", "PIL.Image", "matplotlib.pyplot", "seaborn",
+    "consumer_insights.charts", "consumer_insights.profile_query", "consumer_insights.segments",
+    "consumer_insights.similarity", "consumer_insights.batch", "consumer_insights.profile_store",
+]
+
+# Pages that load the profile data themselves
+DATA_PAGES = {"dashboard", "profiles", "advisor", "insights"}
+
+
+def _child(mode, page, db_path):
+    """Run one cold start in this (fresh) process and print its duration in ms."""
+    import importlib
+
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["CONSUMER_INSIGHTS_DB"] = db_path
+    started = time.perf_counter()
+    if mode == "eager":
+        for module in EAGER_MODULES:
+            importlib.import_module(module)
+        if page not in DATA_PAGES:
+            from consumer_insights.engine import InsightsEngine
+
+            dataset = InsightsEngine.open(db_path).dataset
+            dataset.profiles, dataset.engine
+    app = AppTest.from_file(APP_PATH, default_timeout=600)
+    app.session_state["page"] = PAGES[page]
+    app.run()
+    elapsed = (time.perf_counter() - started) * 1000
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    print(json.dumps({"ms": elapsed}))
+
+
+def _cold_start(mode, page, db_path):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", mode, page, db_path],
+        check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])["ms"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "PAGE", "DB"), help=argparse.SUPPRESS)
+    harness.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(*args.child)
+        return 0
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "startup.db")
+        repository = SQLiteRepository(path)
+        for start in range(0, args.profiles, 100_000):
+            repository.save_profiles(generate_profiles(min(100_000, args.profiles - start), start_id=start + 1))
+        print(f"seeded {args.profiles:,} profiles")
+
+        for page in PAGES:
+            timings = {mode: [_cold_start(mode, page, path) for _ in range(args.repeat)]
+                       for mode in ("eager", "lazy")}
+            for mode, samples in timings.items():
+                results.append(harness.result(f"startup.{page}.{mode}", samples))
+            eager, lazy = (statistics.median(timings[mode]) for mode in ("eager", "lazy"))
+            print(f"{page:<10} eager {eager:8.0f} ms  lazy {lazy:8.0f} ms  saved {1 - lazy / eager:6.1%}")
+
+    if args.baseline:
+        harness.compare(results, args.baseline, args.tolerance)
+    env = harness.environment(profiles=args.profiles)
+    return harness.report("startup", results, env, args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Benchmark the advisor, analytics and profile paths.
+
+Builds a synthetic store and product catalog at the requested scale and
+times, per operation:
+
+- product recommendation filtering (posting list selection) and ranking,
+- product catalog updates (one product saved) and price-band queries,
+- Product Recommendations text and every rule-based advice type, per
+  profile and vectorized over a segment of 10,000 profiles,
+- the analytics DataFrame, subset label counts and segment reports
+  (rebuilt from the columns each time),
+- every chart on the Dashboard and Insights pages with both backends:
+  matplotlib (render + PNG encode) and Vega-Lite (spec + JSON encode),
+- profile lookup by id and profile save through the shared dataset
+  (SQLite + store + advice cache).
+
+Results are printed and optionally written as JSON. A case fails when its
+median exceeds its budget (scale-dependent budgets are per million
+profiles) or regresses against a baseline run. Exits non-zero on failure.
+
+    python -m benchmarks.bench_suite --profiles 1000000 --output results.json
+    python -m benchmarks.bench_suite --profiles 1000000 --baseline results.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from consumer_insights import charts, vega_charts
+from consumer_insights.advice import DECISION_TABLES, product_recommendations
+from consumer_insights.batch import iter_rule_advice
+from consumer_insights.catalog import ProductCatalog
+from consumer_insights.dataset import SharedDataset
+from consumer_insights.figure_cache import FigureCache
+from consumer_insights.recommendations import RecommendationEngine
+from consumer_insights.schema import ALL_CATEGORIES, BUYING_STAGES
+from consumer_insights.segments import segment_report
+from consumer_insights.storage import SQLiteRepository
+
+from . import harness
+from .synthetic import generate_products, generate_profiles, generate_store
+
+# Per-operation budgets in milliseconds
+BUDGETS_MS = {
+    "recommend.filter": 0.05,
+    "recommend.rank": 0.1,
+    "catalog.upsert": 5,
+    "catalog.price_range": 0.1,
+    "advice.product_recommendations": 0.2,
+    "advice.rules": 0.05,
+    "advice.rules_batch": 500,
+    "profile.lookup": 0.05,
+    "profile.save": 10,
+    "chart.matplotlib": 500,
+    "chart.vega": 5,
+}
+
+# Budgets of the cases whose cost grows with the number of profiles, per million profiles
+BUDGETS_MS_PER_MILLION = {
+    "analytics.frame": 500,
+    "analytics.value_counts": 200,
+    "analytics.segment_report": 200,
+}
+
+# Profiles advised per run of the vectorized rule batch
+RULE_BATCH_PROFILES = 10_000
+
+# Profiles in the SQLite database used for the save benchmark
+SAVE_PROFILES = 10_000
+
+
+def _scaled_budget(name, profiles):
+    return BUDGETS_MS_PER_MILLION[name] * max(profiles, 100_000) / 1_000_000
+
+
+def _advice_cases(store, catalog, ops):
+    engine = RecommendationEngine(catalog)
+    products = catalog.records()
+    rng = np.random.default_rng(1)
+    sample = [store.record(int(row)) for row in rng.choice(len(store), size=min(ops, len(store)), replace=False)]
+    categories = [ALL_CATEGORIES if i % 2 else products[i % len(products)]["category"] for i in range(len(sample))]
+    candidates = [engine.candidate_lists(p["interests"], None if c == ALL_CATEGORIES else c)
+                  for p, c in zip(sample, categories)]
+    sensitive = ["Price sensitivity" in p["pain_points"] for p in sample]
+    n = len(sample)
+
+    def filtering(i):
+        category = categories[i % n]
+        engine.candidate_lists(sample[i % n]["interests"], None if category == ALL_CATEGORIES else category)
+
+    cases = {
+        "recommend.filter": filtering,
+        "recommend.rank": lambda i: engine.rank(candidates[i % n], sensitive[i % n], k=3),
+        "advice.product_recommendations":
+            lambda i: product_recommendations(sample[i % n], categories[i % n], engine),
+    }
+    for advice_type, table in DECISION_TABLES.items():
+        name = "advice.rules." + advice_type.lower().replace(" ", "_")
+        cases[name] = lambda i, table=table: table.render(sample[i % n], categories[i % n])
+    return cases
+
+
+def _catalog_cases(catalog, ops):
+    rng = np.random.default_rng(4)
+    sample = catalog.records(rng.choice(len(catalog), size=min(ops, len(catalog)), replace=False))
+    # Each save removes the product from its indexes and reinserts it at the new price
+    edits = [dict(product, price=round(product["price"] * 1.1, 2)) for product in sample]
+    bands = [(low, low * 1.5) for low in rng.uniform(5, 1000, size=len(sample))]
+    n = len(sample)
+    return {
+        "catalog.upsert": lambda i: catalog.upsert(edits[i % n]),
+        "catalog.price_range":
+            lambda i: catalog.price_range(*bands[i % n], category=sample[i % n]["category"])[:20],
+    }
+
+
+def _rule_batch_cases(store):
+    """Every rule-based advice type for a segment of ``RULE_BATCH_PROFILES`` profiles."""
+    rows = np.arange(min(RULE_BATCH_PROFILES, len(store)))
+    advice_types = list(DECISION_TABLES)
+    return {"advice.rules_batch": lambda i: sum(len(chunk) for chunk in iter_rule_advice(store, rows, advice_types))}
+
+
+def _analytics_cases(store):
+    decision = store.filter(stages=[BUYING_STAGES[-1]])
+    profile = store.record(0)
+
+    def value_counts(i):
+        for field in ("location", "buying_stage", "interests", "pain_points"):
+            store.value_counts(field, rows=decision)
+
+    def report(i):
+        store.upsert(profile)  # invalidates the cached report, as an edit in the app does
+        segment_report(store, "age_band")
+
+    return {
+        "analytics.frame": lambda i: store._build_frame(),
+        "analytics.value_counts": value_counts,
+        "analytics.segment_report": report,
+    }
+
+
+def _chart_cases(store):
+    stages = list(store.labels("buying_stage"))
+    stage_counts = store.value_counts("buying_stage", sort=False).reindex(stages, fill_value=0).tolist()
+    funnel = segment_report(store, "age_band")["funnel"]
+    renders = {
+        "interests_column": lambda backend: backend.interests_column_chart(store.value_counts("interests")),
+        "age_histogram": lambda backend: backend.age_histogram(*store.age_histogram()),
+        "location_pie": lambda backend: backend.location_pie(store.value_counts("location")),
+        "interests_bar": lambda backend: backend.horizontal_bar(store.value_counts("interests")),
+        "pain_points_bar": lambda backend: backend.horizontal_bar(store.value_counts("pain_points")),
+        "stage_bar": lambda backend: backend.stage_bar(store.value_counts("buying_stage")),
+        "stage_funnel": lambda backend: backend.stage_funnel(stages, stage_counts),
+        "segment_heatmap": lambda backend: backend.heatmap(funnel, "Buying stage by age band"),
+    }
+    cases = {}
+    for name, render in renders.items():
+        # A fresh cache per render, so every call draws and encodes the figure
+        cases[f"chart.matplotlib.{name}"] = \
+            lambda i, render=render: FigureCache().get_or_render(i, lambda: render(charts))
+        cases[f"chart.vega.{name}"] = lambda i, render=render: json.dumps(render(vega_charts))
+    return cases
+
+
+def _profile_cases(store, directory):
+    repository = SQLiteRepository(os.path.join(directory, "bench.db"))
+    repository.save_profiles(generate_profiles(SAVE_PROFILES, seed=2))
+    dataset = SharedDataset(repository)
+    ids = np.random.default_rng(3).choice(store.ids, size=1000)
+    edits = [dict(profile, name=profile["name"] + " Jr") for profile in dataset.profiles.records(range(1000))]
+
+    return {
+        "profile.lookup": lambda i: store.get(int(ids[i % len(ids)])),
+        "profile.save": lambda i: dataset.save_profile(edits[i % len(edits)]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=100_000)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ops", type=int, default=1000, help="operations per repetition of the fast cases")
+    parser.add_argument("--only", help="run only cases whose name starts with this prefix")
+    harness.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    store = generate_store(args.profiles)
+    catalog = ProductCatalog.from_records(generate_products(args.products))
+    print(f"built {len(store):,} profiles and {len(catalog):,} products")
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        groups = [
+            (_advice_cases(store, catalog, args.ops), args.ops, args.repeat),
+            (_catalog_cases(catalog, args.ops), args.ops, args.repeat),
+            (_rule_batch_cases(store), 1, args.repeat),
+            (_profile_cases(store, directory), args.ops // 10 or 1, args.repeat),
+            (_analytics_cases(store), 1, args.repeat),
+            (_chart_cases(store), 1, min(args.repeat, 3)),
+        ]
+        for cases, ops, repeat in groups:
+            for name, func in cases.items():
+                if args.only and not name.startswith(args.only):
+                    continue
+                if name in BUDGETS_MS_PER_MILLION:
+                    budget = _scaled_budget(name, len(store))
+                else:
+                    budget = BUDGETS_MS.get(name, BUDGETS_MS.get(name.rsplit(".", 1)[0]))
+                timings = harness.measure(func, ops=ops, repeat=repeat)
+                results.append(harness.result(name, timings, ops=ops, budget_ms=budget))
+
+    if args.baseline:
+        harness.compare(results, args.baseline, args.tolerance)
+    env = harness.environment(profiles=len(store), products=len(catalog))
+    return harness.report("advisor", results, env, args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
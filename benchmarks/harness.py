@@ -0,0 +1,105 @@
+"""Timing, JSON results and regression checks shared by the benchmark suites.
+
+A result is a dict::
+
+    {"name", "ops", "runs", "median_ms", "p95_ms", "min_ms",
+     "budget_ms", "baseline_ms", "status"}
+
+where the timings are per operation. ``status`` is ``"ok"``, ``"slow"``
+(median above the case's absolute budget) or ``"regressed"`` (median more
+than ``tolerance`` times the median of the same case in a baseline file).
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+# A case regresses when its median exceeds the baseline median by this factor
+DEFAULT_TOLERANCE = 1.25
+
+
+def measure(func, ops=1, repeat=5, warmup=1):
+    """Time ``func(i)`` for ``i`` in ``range(ops)``, ``repeat`` times.
+
+    Returns the per-operation time of every repetition in milliseconds.
+    """
+    for _ in range(warmup):
+        for i in range(ops):
+            func(i)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for i in range(ops):
+            func(i)
+        timings.append((time.perf_counter() - started) * 1000 / ops)
+    return timings
+
+
+def result(name, timings, ops=1, budget_ms=None):
+    return {
+        "name": name,
+        "ops": ops,
+        "runs": len(timings),
+        "median_ms": statistics.median(timings),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "min_ms": min(timings),
+        "budget_ms": budget_ms,
+        "baseline_ms": None,
+        "status": "slow" if budget_ms is not None and statistics.median(timings) > budget_ms else "ok",
+    }
+
+
+def environment(**parameters):
+    """Machine and run parameters recorded next to the results."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        **parameters,
+    }
+
+
+def compare(results, baseline_path, tolerance=DEFAULT_TOLERANCE):
+    """Mark results whose median regressed against ``baseline_path``."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {entry["name"]: entry for entry in json.load(f)["results"]}
+    for entry in results:
+        previous = baseline.get(entry["name"])
+        if previous is None:
+            continue
+        entry["baseline_ms"] = previous["median_ms"]
+        if entry["status"] == "ok" and entry["median_ms"] > previous["median_ms"] * tolerance:
+            entry["status"] = "regressed"
+
+
+def report(suite, results, env, output=None):
+    """Print a table, optionally write JSON, and return the exit status."""
+    for entry in results:
+        budget = f"budget {entry['budget_ms']:g}" if entry["budget_ms"] is not None else ""
+        baseline = f"baseline {entry['baseline_ms']:.3f}" if entry["baseline_ms"] is not None else ""
+        print(f"{entry['status']:9} {entry['name']:<36} median {entry['median_ms']:10.3f} ms  "
+              f"p95 {entry['p95_ms']:10.3f} ms  {budget} {baseline}".rstrip())
+    if output:
+        payload = {"suite": suite, "environment": env, "results": results}
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"wrote {output}")
+    failed = [entry["name"] for entry in results if entry["status"] != "ok"]
+    if failed:
+        print(f"{len(failed)} case(s) over budget or regressed: {', '.join(failed)}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def add_arguments(parser):
+    """Add the ``--output``, ``--baseline`` and ``--tolerance`` options."""
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown against the baseline (default %(default)s)")
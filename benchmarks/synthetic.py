@@ -0,0 +1,125 @@
+"""Synthetic consumer profiles and products for benchmarks.
+
+Profiles are drawn with a seeded NumPy generator from the app's own
+vocabularies, so runs are reproducible and every label is known to the
+profile store.
+"""
+
+import numpy as np
+
+from consumer_insights.profile_store import ProfileStore
+from consumer_insights.schema import (ALL_CATEGORIES, AVATARS, BUYING_STAGES, INTERESTS, LOCATIONS, PAIN_POINTS,
+                                      PRODUCT_CATEGORIES)
+
+FIRST_NAMES = ["Emily", "James", "Maria", "David", "Aisha", "Wei", "Sofia", "Liam", "Noah", "Olivia",
+               "Priya", "Lucas", "Chloe", "Mateo", "Hana", "Omar"]
+LAST_NAMES = ["Chen", "Wilson", "Rodriguez", "Smith", "Khan", "Nguyen", "Garcia", "Brown", "Kim",
+              "Müller", "Rossi", "Okafor", "Silva", "Cohen", "Patel", "Jones"]
+OCCUPATIONS = ["Marketing Manager", "IT Professional", "Healthcare Worker", "Teacher", "Nurse",
+               "Software Engineer", "Accountant", "Designer", "Student", "Retail Associate", "Chef",
+               "Sales Representative", "Consultant", "Electrician", "Lawyer", "Retired"]
+PRODUCT_ADJECTIVES = ["Premium", "Smart", "Organic", "Compact", "Classic", "Eco", "Pro", "Family", "Portable"]
+PRODUCT_NOUNS = ["Tracker", "Hub", "Kit", "Bottle", "Game Set", "Blender", "Speaker", "Backpack", "Lamp"]
+SPENDING_HABITS = ["Prefers quality over quantity", "Looks for deals", "Early adopter",
+                   "Practical buyer", "Brand loyal"]
+
+
+def _labels(rng, vocabulary, size, max_items):
+    counts = rng.integers(1, max_items + 1, size=size)
+    return [rng.choice(vocabulary, size=count, replace=False).tolist() for count in counts]
+
+
+def generate_profiles(count, start_id=1, seed=0):
+    """Return ``count`` synthetic profile dicts with consecutive ids."""
+    rng = np.random.default_rng(seed)
+    ages = rng.integers(18, 80, size=count)
+    first = rng.choice(FIRST_NAMES, size=count)
+    last = rng.choice(LAST_NAMES, size=count)
+    occupations = rng.choice(OCCUPATIONS, size=count)
+    incomes = rng.integers(20, 200, size=count) * 1000
+    locations = rng.choice(LOCATIONS, size=count)
+    stages = rng.choice(BUYING_STAGES, size=count, p=[0.5, 0.3, 0.2])
+    habits = rng.choice(SPENDING_HABITS, size=count)
+    avatars = rng.choice(AVATARS, size=count)
+    interests = _labels(rng, INTERESTS, count, 4)
+    pain_points = _labels(rng, PAIN_POINTS, count, 3)
+    return [
+        {
+            "id": start_id + i,
+            "name": f"{first[i]} {last[i]}",
+            "age": int(ages[i]),
+            "occupation": str(occupations[i]),
+            "income": f"${incomes[i]:,}",
+            "location": str(locations[i]),
+            "interests": interests[i],
+            "pain_points": pain_points[i],
+            "spending_habits": str(habits[i]),
+            "avatar": str(avatars[i]),
+            "buying_stage": str(stages[i]),
+        }
+        for i in range(count)
+    ]
+
+
+def generate_store(count, chunk_size=100_000, seed=0):
+    """Return a ``ProfileStore`` filled with ``count`` synthetic profiles."""
+    store = ProfileStore(capacity=count)
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        store.extend(generate_profiles(size, start_id=start + 1, seed=seed + start))
+    return store
+
+
+def generate_products(count, seed=0):
+    """Return ``count`` synthetic products spread over the app's categories.
+
+    Ids are consecutive from 1. Prices are log-uniform between $5 and
+    $2,000; about a third of the products are eco-friendly.
+    """
+    rng = np.random.default_rng(seed)
+    categories = rng.choice([c for c in PRODUCT_CATEGORIES if c != ALL_CATEGORIES], size=count)
+    adjectives = rng.choice(PRODUCT_ADJECTIVES, size=count)
+    nouns = rng.choice(PRODUCT_NOUNS, size=count)
+    prices = np.round(np.exp(rng.uniform(np.log(5), np.log(2000), size=count)), 2)
+    eco_friendly = rng.random(count) < 0.35
+    return [
+        {
+            "id": i + 1,
+            "name": f"{adjectives[i]} {nouns[i]} {i + 1}",
+            "category": str(categories[i]),
+            "price": float(prices[i]),
+            "eco_friendly": bool(eco_friendly[i]),
+        }
+        for i in range(count)
+    ]
+
+
+def generate_stage_events(count, profiles=1_000_000, days=365, end=None, seed=0):
+    """Return ``count`` synthetic buying-stage transitions for a ``StageEventStore``.
+
+    Times are uniform over the ``days`` before ``end`` (Unix seconds,
+    default now). Each profile enters the first stage, then moves a random
+    number of stages forward (wrapping around) at every later event.
+    Returns ``(times_ms, profile_ids, from_stages, to_stages)`` arrays
+    ordered by time.
+    """
+    import time
+
+    rng = np.random.default_rng(seed)
+    end_ms = int((time.time() if end is None else end) * 1000)
+    ids = np.sort(rng.integers(1, profiles + 1, size=count))
+    times = rng.integers(end_ms - days * 86_400_000, end_ms, size=count)
+    order = np.lexsort((times, ids))
+    ids, times = ids[order], times[order]
+
+    first = np.concatenate(([True], ids[1:] != ids[:-1]))
+    steps = rng.integers(1, len(BUYING_STAGES), size=count)
+    steps[first] = 0
+    position = np.cumsum(steps)
+    position -= np.maximum.accumulate(np.where(first, position, 0))
+    to_stages = (position % len(BUYING_STAGES)).astype(np.int8)
+    from_stages = np.concatenate(([-1], to_stages[:-1])).astype(np.int8)
+    from_stages[first] = -1
+
+    order = np.argsort(times, kind="stable")
+    return times[order], ids[order], from_stages[order], to_stages[order]
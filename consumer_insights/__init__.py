@@ -0,0 +1,24 @@
+"""Data and advice engine behind the Consumer Insights AI Advisor app.
+
+The classes below are imported on first access, so importing a light
+module such as ``consumer_insights.schema`` does not pull in numpy and
+pandas.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "InsightsEngine": ".engine",
+    "ProductCatalog": ".catalog",
+    "ProfileStore": ".profile_store",
+    "RecommendationEngine": ".recommendations",
+    "SharedDataset": ".dataset",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
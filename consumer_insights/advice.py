@@ -0,0 +1,215 @@
+"""Advice text generation for a single consumer profile.
+
+Every advice type is rendered from fixed templates: the pieces for a
+profile are selected, formatted and joined once, rather than grown by
+repeated string concatenation. Product recommendations are ranked by the
+``RecommendationEngine``; every other advice type is declared as data in
+``ADVICE_RULES`` and compiled once into a decision table, so a new advice
+type is a new entry there.
+"""
+
+from .advice_rules import compile_rules, template_context
+from .progress import StageProgress
+from .schema import ALL_CATEGORIES
+
+STAGE_EMPHASIS = {
+    "Awareness": "how these products solve specific problems they face.",
+    "Consideration": "comparative benefits and unique features.",
+    "Decision": "social proof, guarantees, and easy purchasing process.",
+}
+
+PRODUCT_HEADER = "Based on {name}'s profile, I recommend focusing on these products:\n\n"
+PRODUCT_LINE = "- {name}{eco_label}: ${price}\n"
+PRODUCT_RATIONALE = "\nRationale: These products align with {name}'s interests in {top_interests}. "
+PRODUCT_PRICE_NOTE = "I've prioritized more affordable options due to price sensitivity. "
+PRODUCT_ECO_NOTE = "I've included eco-friendly options as requested. "
+PRODUCT_STAGE = "\n\nFor this {stage} stage consumer, emphasize {emphasis}"
+PRODUCT_NONE = ("No specific products match the criteria. Consider expanding your product catalog "
+                "to include items related to {interests}.")
+
+MESSAGING_HEADER = "Recommended messaging approach for {name}:\n\n"
+MESSAGING_AWARENESS = (
+    "Focus on problem identification and education. Use messaging that helps this consumer "
+    "recognize the challenges they face.\n\n"
+    "Suggested headlines:\n"
+    "- \"How {occupation}s Save Time While Maximizing Results\"\n"
+    "- \"The Hidden Challenges of {first_interest} That Nobody Talks About\"\n"
+    "- \"Discover What's Possible: Reimagining Your Approach to {focus}\"\n"
+)
+MESSAGING_CONSIDERATION = (
+    "Focus on solution comparison and value demonstration. Help this consumer evaluate options "
+    "and see your unique value.\n\n"
+    "Suggested headlines:\n"
+    "- \"Why Busy {occupation}s Choose Our {offering}\"\n"
+    "- \"5 Ways Our Approach Stands Apart in {focus}\"\n"
+    "- \"How We Address the Top 3 {top_pain_point} Challenges\"\n"
+)
+MESSAGING_DECISION = (
+    "Focus on risk reduction and purchase facilitation. Make the final decision easy and low-risk.\n\n"
+    "Suggested headlines:\n"
+    "- \"Join Thousands Who've Transformed Their {focus} Experience\"\n"
+    "- \"Our 30-Day Satisfaction Guarantee Means Zero Risk\"\n"
+    "- \"Special Offer for {location} {occupation}s: Start Today\"\n"
+)
+
+PRICING_HEADER = "Pricing strategy recommendations for {name}:\n\n"
+PRICING_SENSITIVE = (
+    "This consumer shows price sensitivity. Consider these strategies:\n\n"
+    "1. Value-tier offerings with essential features only\n"
+    "2. Installment payment options\n"
+    "3. Entry-level products with upgrade paths\n"
+    "4. Loyalty programs that reward repeat purchases\n"
+    "5. Bundle discounts for complementary products\n\n"
+    "Avoid premium pricing or luxury positioning as this may create immediate barriers."
+)
+PRICING_VALUE = (
+    "This consumer prioritizes value over lowest price. Consider these strategies:\n\n"
+    "1. Good-better-best tiering with clear value steps\n"
+    "2. Premium options with additional services included\n"
+    "3. Subscription models with exclusive benefits\n"
+    "4. Value-based pricing highlighting ROI\n"
+    "5. Early adopter or VIP pricing tiers\n\n"
+    "Emphasize the quality/price relationship rather than focusing on discount messaging."
+)
+
+TIME_PAIN_POINTS = ["Lack of time", "Limited free time"]
+BUDGET_PAIN_POINTS = ["Price sensitivity", "Family budget constraints", "Value for money"]
+
+# Rule-based advice types as decision tables (see ``consumer_insights.advice_rules``):
+# each section adds the template of its first matching rule, or of all matching rules
+ADVICE_RULES = {
+    "Marketing Messaging": [
+        [({}, MESSAGING_HEADER)],
+        [
+            ({"buying_stage": "Awareness"}, MESSAGING_AWARENESS),
+            ({"buying_stage": "Consideration"}, MESSAGING_CONSIDERATION),
+            ({}, MESSAGING_DECISION),
+        ],
+        [({}, "\nRecommended channels:\n")],
+        [
+            ({"age": ("<", 30)}, "- Social media (Instagram, TikTok)\n- Mobile-first content\n- Influencer partnerships\n"),
+            ({"age": ("<", 45)}, "- LinkedIn\n- Email newsletters\n- Podcast sponsorships\n"),
+            ({}, "- Email campaigns\n- Industry publications\n- Facebook\n"),
+        ],
+    ],
+    "Pricing Strategy": [
+        [({}, PRICING_HEADER)],
+        [
+            ({"pain_points": "Price sensitivity"}, PRICING_SENSITIVE),
+            ({}, PRICING_VALUE),
+        ],
+    ],
+    "Customer Experience": [
+        [({}, "Customer experience recommendations for {name}:\n\n")],
+        {"match": "all", "rules": [
+            ({"pain_points": TIME_PAIN_POINTS},
+             "- Keep every interaction short: saved preferences, one-click reordering and skimmable content\n"),
+            ({"pain_points": "Feature complexity"},
+             "- Guide onboarding with setup wizards, short tutorials and sensible defaults\n"),
+            ({"pain_points": "Technical support"},
+             "- Offer responsive live chat with a clear escalation path to a specialist\n"),
+            ({"pain_points": "Product reliability"},
+             "- Build trust with warranties, visible quality testing and proactive status updates\n"),
+            ({"pain_points": BUDGET_PAIN_POINTS},
+             "- Make costs transparent: no hidden fees, clear comparisons and reminders of savings\n"),
+            ({"pain_points": "Wants eco-friendly options"},
+             "- Show sustainability details: materials, packaging and take-back options\n"),
+            ({}, "- Personalize follow-ups around {top_interests}\n"),
+        ]},
+        [
+            ({"buying_stage": "Awareness"},
+             "\nKey touchpoint at the awareness stage: a welcoming first visit with no-pressure guides "
+             "to {first_interest}."),
+            ({"buying_stage": "Consideration"},
+             "\nKey touchpoint at the consideration stage: side-by-side comparisons, reviews from other "
+             "{occupation}s and quick answers to questions."),
+            ({}, "\nKey touchpoint at the {stage} stage: a frictionless checkout, clear delivery times and "
+                 "a follow-up that confirms the purchase was the right choice."),
+        ],
+        [
+            ({"location": "Urban"}, "\n\nService preference: fast delivery and in-app support suit {location} consumers."),
+            ({"location": "Rural"}, "\n\nService preference: reliable delivery estimates and phone or email "
+                                    "support suit {location} consumers."),
+            ({}, "\n\nService preference: scheduled delivery or pickup and self-service help suit "
+                 "{location} consumers."),
+        ],
+    ],
+    "Feature Prioritization": [
+        [({}, "Feature priorities for {name} ({occupation}):\n\n")],
+        {"match": "all", "rules": [
+            ({"pain_points": TIME_PAIN_POINTS}, "- Time-saving automation and quick actions\n"),
+            ({"pain_points": "Feature complexity"},
+             "- A simpler interface that reveals advanced features progressively\n"),
+            ({"pain_points": "Technical support"}, "- Built-in help, troubleshooting guides and in-app chat\n"),
+            ({"pain_points": "Product reliability"}, "- Stability and durability ahead of new functionality\n"),
+            ({"pain_points": BUDGET_PAIN_POINTS},
+             "- A capable entry tier, with premium features as optional add-ons\n"),
+            ({"pain_points": "Wants eco-friendly options"}, "- Energy efficiency and sustainable materials\n"),
+            ({"interests": "Technology"}, "- Integrations with the devices and apps they already use\n"),
+            ({"interests": ["Fitness", "Health & wellness"]}, "- Progress tracking and goal setting\n"),
+            ({"interests": "Family activities"}, "- Shared accounts and family-friendly settings\n"),
+            ({}, "- Features that make {focus} easier to enjoy\n"),
+        ]},
+        [
+            ({"buying_stage": "Awareness"},
+             "\nAt the awareness stage, lead with the single feature that best addresses their biggest problem."),
+            ({"buying_stage": "Consideration"},
+             "\nAt the consideration stage, lead with the features that set the {offering} apart from alternatives."),
+            ({}, "\nAt the {stage} stage, lead with the features that make getting started immediate: "
+                 "setup, migration and support."),
+        ],
+    ],
+}
+
+DECISION_TABLES = compile_rules(ADVICE_RULES)
+
+SUPPORTED_ADVICE_TYPES = ["Product Recommendations", *DECISION_TABLES]
+
+
+def product_recommendations(profile, category, engine, progress=None):
+    progress = progress or StageProgress(None)
+    candidates = engine.candidate_lists(profile["interests"], None if category == ALL_CATEGORIES else category)
+    progress.done("filtering")
+    with engine.catalog.lock:
+        rows = engine.rank(candidates, price_sensitive="Price sensitivity" in profile["pain_points"], k=3)
+        products = engine.catalog.records(rows)
+    progress.done("ranking")
+    parts = [PRODUCT_HEADER.format(name=profile["name"])]
+    if not products:
+        parts.append(PRODUCT_NONE.format(interests=", ".join(profile["interests"])))
+        return "".join(parts)
+
+    for product in products:
+        eco_label = " (Eco-friendly)" if product["eco_friendly"] else ""
+        parts.append(PRODUCT_LINE.format(name=product["name"], eco_label=eco_label, price=product["price"]))
+    parts.append(PRODUCT_RATIONALE.format(name=profile["name"], top_interests=", ".join(profile["interests"][:2])))
+    if "Price sensitivity" in profile["pain_points"]:
+        parts.append(PRODUCT_PRICE_NOTE)
+    if "Wants eco-friendly options" in profile["pain_points"] and any(p["eco_friendly"] for p in products):
+        parts.append(PRODUCT_ECO_NOTE)
+    stage = profile["buying_stage"]
+    parts.append(PRODUCT_STAGE.format(stage=stage.lower(), emphasis=STAGE_EMPHASIS.get(stage, STAGE_EMPHASIS["Decision"])))
+    return "".join(parts)
+
+
+def generate_advice(profile, advice_type, category=ALL_CATEGORIES, engine=None, progress=None):
+    """Return an advice record ``{"type", "date", "content"}`` for a profile.
+
+    ``engine`` is the ``RecommendationEngine`` used by product
+    recommendations. ``progress`` is an optional ``callback(stage, fraction)``
+    (see ``consumer_insights.progress``) called as each pipeline stage
+    finishes. Raises ``ValueError`` for advice types without a generator.
+    """
+    if advice_type == "Product Recommendations":
+        stages = StageProgress(progress)
+        content = product_recommendations(profile, category, engine, stages)
+    elif advice_type in DECISION_TABLES:
+        table = DECISION_TABLES[advice_type]
+        stages = StageProgress(progress, ["filtering", "rendering"])
+        selection = table.select(profile, category)
+        stages.done("filtering")
+        content = table.format(selection, template_context(profile, category))
+    else:
+        raise ValueError(f"Unsupported advice type: {advice_type}")
+    stages.done("rendering")
+    return {"type": advice_type, "date": "Today", "content": content}
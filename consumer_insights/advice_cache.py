@@ -0,0 +1,127 @@
+"""Memoized advice and a time-bounded advice history.
+
+``AdviceCache`` keeps generated advice keyed on the profile's content hash
+plus the advice options, so generating the same advice for an unchanged
+profile is a dictionary lookup. Entries are evicted least recently used
+first and expire after a time-to-live; saving or deleting a profile drops
+its entries right away.
+
+``AdviceHistory`` is the per-session list of generated advice: a ring
+buffer that forgets records older than the retention period.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+DAY = 24 * 60 * 60
+
+
+def profile_hash(profile):
+    """Stable hash of a profile's content (independent of key order)."""
+    encoded = json.dumps(profile, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def advice_key(profile, advice_type, category):
+    return (profile["id"], profile_hash(profile), advice_type, category)
+
+
+class AdviceCache:
+    """Thread-safe LRU cache with a time-to-live for advice records."""
+
+    def __init__(self, max_entries=1024, ttl=60 * 60, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_create(self, key, create):
+        """Return a copy of the cached advice for ``key``, calling ``create()`` on a miss."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            self.misses += 1
+
+        advice = create()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, advice)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return dict(advice)
+
+    def invalidate_profile(self, profile_id):
+        """Drop every entry for ``profile_id`` (keys start with the profile id)."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == profile_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class AdviceHistory:
+    """Ring buffer of advice records from the last ``retention_days`` days.
+
+    Records carry a ``created_at`` timestamp; at most ``max_entries`` are
+    kept regardless of age.
+    """
+
+    def __init__(self, retention_days, records=(), max_entries=500, clock=time.time):
+        self.retention_days = retention_days
+        self._clock = clock
+        self._records = deque(maxlen=max_entries)
+        for record in records:
+            self._records.append(record)
+        self._expire()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def _expire(self):
+        cutoff = self._clock() - self.retention_days * DAY
+        while self._records and self._records[0].get("created_at", cutoff) < cutoff:
+            self._records.popleft()
+
+    def append(self, advice):
+        record = dict(advice)
+        record.setdefault("created_at", self._clock())
+        self._records.append(record)
+        self._expire()
+        return record
+
+    def set_retention(self, days):
+        self.retention_days = days
+        self._expire()
+
+    def recent(self, count):
+        """Return the newest ``count`` records, oldest first."""
+        self._expire()
+        return list(self._records)[-count:]
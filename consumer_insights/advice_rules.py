@@ -0,0 +1,199 @@
+"""Decision tables for rule-based advice types.
+
+An advice type is declared as data: a list of sections, each a list of
+``(when, template)`` rules. ``when`` maps profile fields to conditions
+and every condition must hold for the rule to fire (an empty ``when``
+always fires):
+
+- ``{"buying_stage": "Awareness"}`` or ``{"location": ["Urban", "Rural"]}``
+  for single-valued fields (location, buying stage, occupation) and for
+  ``category``, the selected product category,
+- ``{"pain_points": "Price sensitivity"}`` or a list of labels for
+  multi-valued fields (interests, pain points), matching profiles that
+  have any of them,
+- ``{"age": ("<", 30)}`` for numeric comparisons (``<``, ``<=``, ``>``,
+  ``>=``) or ``{"age": 30}`` for equality.
+
+A section contributes the template of its first matching rule, or of
+every matching rule when declared as ``{"match": "all", "rules": [...]}``.
+Templates are ``str.format`` strings over ``CONTEXT_FIELDS`` (literal
+braces are doubled).
+
+``DecisionTable`` compiles a spec once: conditions become predicates that
+work on a single profile dict or, vectorized, on a ``ProfileStore``'s
+code and bitset columns for many rows at once. The rules chosen in a
+section are a bitmask, so a selection is a small tuple of ints and the
+templates for each distinct selection are joined once and reused.
+"""
+
+import operator
+import string
+
+from .schema import ALL_CATEGORIES
+
+SINGLE_VALUED_FIELDS = ("location", "buying_stage", "occupation")
+MULTI_VALUED_FIELDS = ("interests", "pain_points")
+NUMERIC_FIELDS = ("age",)
+
+COMPARISONS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "==": operator.eq}
+
+CONTEXT_FIELDS = (
+    "name", "age", "occupation", "income", "location", "buying_stage", "stage", "interests",
+    "pain_points", "first_interest", "top_interests", "top_pain_point", "category", "focus", "offering",
+)
+
+# Rules per section, so that a section's selection fits in an int64 bitmask
+MAX_RULES = 63
+
+
+def template_context(profile, category=ALL_CATEGORIES):
+    """Values available to advice templates for ``profile`` and ``category``."""
+    interests = profile["interests"]
+    pain_points = profile["pain_points"]
+    first_interest = interests[0] if interests else "Products"
+    has_category = category != ALL_CATEGORIES
+    return {
+        "name": profile["name"],
+        "age": profile["age"],
+        "occupation": profile["occupation"],
+        "income": profile["income"],
+        "location": profile["location"],
+        "buying_stage": profile["buying_stage"],
+        "stage": profile["buying_stage"].lower(),
+        "interests": ", ".join(interests),
+        "pain_points": ", ".join(pain_points),
+        "first_interest": first_interest,
+        "top_interests": ", ".join(interests[:2]),
+        "top_pain_point": ", ".join(pain_points[:1]),
+        "category": category,
+        "focus": category if has_category else first_interest,
+        "offering": category if has_category else "Products",
+    }
+
+
+class _Condition:
+    """One ``field: condition`` entry of a rule, compiled."""
+
+    def __init__(self, field, condition):
+        self.field = field
+        if field in NUMERIC_FIELDS:
+            op, value = condition if isinstance(condition, tuple) else ("==", condition)
+            if op not in COMPARISONS:
+                raise ValueError(f"Unknown comparison {op!r} for {field}")
+            self.compare, self.value = COMPARISONS[op], value
+        elif field in SINGLE_VALUED_FIELDS or field in MULTI_VALUED_FIELDS or field == "category":
+            self.labels = frozenset([condition] if isinstance(condition, str) else condition)
+        else:
+            raise ValueError(f"Rules cannot test the field {field!r}")
+
+    def matches(self, profile, category):
+        if self.field in NUMERIC_FIELDS:
+            return self.compare(profile[self.field], self.value)
+        if self.field == "category":
+            return category in self.labels
+        if self.field in MULTI_VALUED_FIELDS:
+            return not self.labels.isdisjoint(profile[self.field])
+        return profile[self.field] in self.labels
+
+    def mask(self, store, rows, category):
+        """Boolean array: whether the condition holds for each of ``rows``."""
+        import numpy as np
+
+        if self.field in NUMERIC_FIELDS:
+            return self.compare(store.column(self.field)[rows], self.value)
+        if self.field == "category":
+            return np.full(len(rows), category in self.labels)
+        codes = [code for code, label in enumerate(store.labels(self.field)) if label in self.labels]
+        if self.field in MULTI_VALUED_FIELDS:
+            bits = np.uint64(sum(1 << code for code in codes))
+            return (store.bitsets(self.field)[rows] & bits) != 0
+        return np.isin(store.codes(self.field)[rows], codes)
+
+
+class _Section:
+    def __init__(self, spec):
+        if isinstance(spec, dict):
+            self.match_all = spec.get("match", "first") == "all"
+            spec = spec["rules"]
+        else:
+            self.match_all = False
+        if not 0 < len(spec) <= MAX_RULES:
+            raise ValueError(f"A section needs between 1 and {MAX_RULES} rules")
+        self.conditions = []
+        self.templates = []
+        for when, template in spec:
+            self.conditions.append([_Condition(field, condition) for field, condition in when.items()])
+            self.templates.append(_check_template(template))
+
+    def select(self, profile, category):
+        bits = 0
+        for i, conditions in enumerate(self.conditions):
+            if all(condition.matches(profile, category) for condition in conditions):
+                if not self.match_all:
+                    return 1 << i
+                bits |= 1 << i
+        return bits
+
+    def select_rows(self, store, rows, category):
+        import numpy as np
+
+        bits = np.zeros(len(rows), dtype=np.int64)
+        for i, conditions in enumerate(self.conditions):
+            fires = np.ones(len(rows), dtype=bool)
+            for condition in conditions:
+                fires &= condition.mask(store, rows, category)
+            bits |= fires.astype(np.int64) << i
+        if not self.match_all:
+            bits &= -bits  # keep the first matching rule only
+        return bits
+
+    def join(self, bits):
+        return "".join(template for i, template in enumerate(self.templates) if bits >> i & 1)
+
+
+def _check_template(template):
+    for _, field, _, _ in string.Formatter().parse(template):
+        if field is not None and field not in CONTEXT_FIELDS:
+            raise ValueError(f"Unknown template field {{{field}}} in {template[:40]!r}")
+    return template
+
+
+class DecisionTable:
+    """A compiled advice type: select rules per section, then render them."""
+
+    def __init__(self, advice_type, sections):
+        self.advice_type = advice_type
+        self.sections = [_Section(section) for section in sections]
+        self._templates = {}
+
+    def select(self, profile, category=ALL_CATEGORIES):
+        """Return the selection for one profile: a rule bitmask per section."""
+        return tuple(section.select(profile, category) for section in self.sections)
+
+    def select_rows(self, store, rows, category=ALL_CATEGORIES):
+        """Vectorized ``select`` for ``rows`` of a ``ProfileStore``.
+
+        Returns a ``(len(rows), sections)`` int64 array of rule bitmasks.
+        """
+        import numpy as np
+
+        with store.lock:
+            columns = [section.select_rows(store, rows, category) for section in self.sections]
+        return np.stack(columns, axis=1) if columns else np.zeros((len(rows), 0), dtype=np.int64)
+
+    def format(self, selection, context):
+        """Render a selection (a tuple or list of bitmasks) with a ``template_context``."""
+        selection = tuple(selection)
+        template = self._templates.get(selection)
+        if template is None:
+            template = self._templates[selection] = "".join(
+                section.join(bits) for section, bits in zip(self.sections, selection))
+        return template.format_map(context)
+
+    def render(self, profile, category=ALL_CATEGORIES):
+        return self.format(self.select(profile, category), template_context(profile, category))
+
+
+def compile_rules(rules):
+    """Compile ``{advice type: sections}`` specs into ``{advice type: DecisionTable}``."""
+    return {advice_type: DecisionTable(advice_type, sections) for advice_type, sections in rules.items()}
@@ -0,0 +1,78 @@
+"""Incrementally maintained profile aggregates.
+
+``ProfileAggregates`` keeps per-label counts for locations, buying stages,
+interests and pain points, plus a per-year age histogram. The profile
+store applies a delta for every inserted, replaced or deleted row, so
+reading any aggregate costs O(number of categories) rather than a pass
+over all profiles.
+"""
+
+import numpy as np
+
+MAX_AGE = 127
+
+
+def _bincount(codes, size):
+    codes = codes[codes >= 0]
+    return np.bincount(codes.ravel(), minlength=size)
+
+
+class ProfileAggregates:
+    """Running counts over a set of profile rows."""
+
+    def __init__(self):
+        self.location_counts = np.zeros(0, dtype=np.int64)
+        self.stage_counts = np.zeros(0, dtype=np.int64)
+        self.interest_counts = np.zeros(0, dtype=np.int64)
+        self.pain_point_counts = np.zeros(0, dtype=np.int64)
+        self.age_counts = np.zeros(MAX_AGE + 1, dtype=np.int64)
+        self.total = 0
+
+    @staticmethod
+    def _grown(counts, size):
+        if len(counts) >= size:
+            return counts
+        grown = np.zeros(size, dtype=np.int64)
+        grown[:len(counts)] = counts
+        return grown
+
+    def apply(self, locations, stages, interest_codes, pain_point_codes, ages, sign=1):
+        """Add (``sign=1``) or remove (``sign=-1``) a block of rows.
+
+        Arguments are the store's column slices for those rows: location and
+        stage codes, the padded interest/pain-point code matrices and ages.
+        """
+        if len(locations) == 0:
+            return
+        sizes = (
+            int(locations.max()) + 1,
+            int(stages.max()) + 1,
+            int(interest_codes.max(initial=-1)) + 1,
+            int(pain_point_codes.max(initial=-1)) + 1,
+        )
+        self.location_counts = self._grown(self.location_counts, sizes[0])
+        self.stage_counts = self._grown(self.stage_counts, sizes[1])
+        self.interest_counts = self._grown(self.interest_counts, sizes[2])
+        self.pain_point_counts = self._grown(self.pain_point_counts, sizes[3])
+
+        self.location_counts += sign * _bincount(locations, len(self.location_counts))
+        self.stage_counts += sign * _bincount(stages, len(self.stage_counts))
+        self.interest_counts += sign * _bincount(interest_codes, len(self.interest_counts))
+        self.pain_point_counts += sign * _bincount(pain_point_codes, len(self.pain_point_counts))
+        self.age_counts += sign * np.bincount(np.clip(ages, 0, MAX_AGE), minlength=MAX_AGE + 1)
+        self.total += sign * len(locations)
+
+    def counts(self, field, size):
+        """Return the count array for ``field`` padded to ``size`` labels."""
+        counts = {
+            "location": self.location_counts,
+            "buying_stage": self.stage_counts,
+            "interests": self.interest_counts,
+            "pain_points": self.pain_point_counts,
+        }[field]
+        return self._grown(counts, size)[:size]
+
+    def age_histogram(self):
+        """Return ``(ages, counts)`` for every age that occurs at least once."""
+        ages = np.flatnonzero(self.age_counts)
+        return ages, self.age_counts[ages]
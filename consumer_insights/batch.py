@@ -0,0 +1,132 @@
+"""Batch advice generation across many profiles.
+
+Profiles are cut into chunks and fanned out to a process pool. Each worker
+builds its own ``ProductCatalog`` and ``RecommendationEngine`` once from the
+catalog's records, and
+results are yielded chunk by chunk as soon as a worker finishes, with a
+bounded number of chunks in flight so memory stays flat for large batches.
+Workers are started by a fork server (or spawned), so scripts that call
+into the pool need the usual ``if __name__ == "__main__":`` guard.
+
+Rule-based advice types (``consumer_insights.advice.DECISION_TABLES``) need
+no pool: ``iter_rule_advice`` selects their rules for a whole chunk of
+store rows with vectorized column tests and only formats text per profile.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from .advice import DECISION_TABLES, generate_advice
+from .advice_rules import template_context
+from .catalog import ProductCatalog
+from .recommendations import RecommendationEngine
+from .schema import ALL_CATEGORIES
+
+# Pool workers start from a clean fork server (or a fresh interpreter where there is none), never
+# as forks of the calling process: the app server runs many threads (Streamlit, the job queue,
+# SQLite connections), and a forked child can inherit a lock another thread held and deadlock on it
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_worker_engine = None
+
+
+def _init_worker(products):
+    global _worker_engine
+    _worker_engine = RecommendationEngine(ProductCatalog.from_records(products))
+
+
+def advise_chunk(profiles, advice_types, category=ALL_CATEGORIES, engine=None):
+    """Generate every requested advice type for a list of profiles."""
+    engine = engine if engine is not None else _worker_engine
+    results = []
+    for profile in profiles:
+        for advice_type in advice_types:
+            advice = generate_advice(profile, advice_type, category, engine)
+            advice["profile_id"] = profile["id"]
+            results.append(advice)
+    return results
+
+
+def iter_rule_advice(store, rows, advice_types, category=ALL_CATEGORIES, chunk_size=2000):
+    """Yield lists of advice records for ``rows`` of a ``ProfileStore``, chunk by chunk.
+
+    Every advice type must have a decision table. Records are ordered by
+    profile, then advice type, and carry the ``profile_id``.
+    """
+    tables = [DECISION_TABLES[advice_type] for advice_type in advice_types]
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        with store.lock:
+            selections = [table.select_rows(store, chunk, category).tolist() for table in tables]
+            profiles = [store.record(int(row)) for row in chunk]
+        results = []
+        for i, profile in enumerate(profiles):
+            context = template_context(profile, category)
+            for table, selection in zip(tables, selections):
+                results.append({"type": table.advice_type, "date": "Today",
+                                "content": table.format(selection[i], context), "profile_id": profile["id"]})
+        yield results
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_batch_advice(profiles, advice_types, catalog, category=ALL_CATEGORIES,
+                      workers=None, chunk_size=2000, progress=None, total=None):
+    """Yield lists of advice records as each chunk of profiles completes.
+
+    ``profiles`` may be any iterable (e.g. ``ProfileStore.records()``) and is
+    consumed lazily; ``catalog`` is the ``ProductCatalog`` to recommend
+    from. With ``workers=1`` everything runs in-process, which avoids pool
+    start-up cost for small batches. Each advice record carries
+    the ``profile_id`` it was generated for; chunks may complete out of order.
+
+    When ``progress`` is given, it is called as ``progress("rendering",
+    fraction)`` after every completed chunk; ``total`` is the number of
+    profiles, needed when ``profiles`` has no ``len()``.
+    """
+    advice_types = list(advice_types)
+    if total is None and hasattr(profiles, "__len__"):
+        total = len(profiles)
+    expected = (total or 0) * len(advice_types)
+    completed = 0
+
+    for results in _iter_chunks(profiles, advice_types, catalog, category, workers, chunk_size):
+        completed += len(results)
+        if progress is not None and expected:
+            progress("rendering", min(completed / expected, 1.0))
+        yield results
+
+
+def _iter_chunks(profiles, advice_types, catalog, category, workers, chunk_size):
+    chunks = _chunked(profiles, chunk_size)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        engine = RecommendationEngine(catalog)
+        for chunk in chunks:
+            yield advise_chunk(chunk, advice_types, category, engine)
+        return
+
+    products = catalog.records()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(_START_METHOD),
+                             initializer=_init_worker, initargs=(products,)) as pool:
+        pending = set()
+        for chunk in chunks:
+            pending.add(pool.submit(advise_chunk, chunk, advice_types, category))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -0,0 +1,334 @@
+"""Columnar product catalog with category and price indexes.
+
+Products are held as one NumPy array per attribute (id, name, category
+code, price, eco-friendly flag), rows in insertion order, like the
+profile store. Sorted indexes are kept per category and catalog-wide,
+each for all products and for eco-friendly ones only, and each in two
+orders: catalog order and by price. Recommendations read the heads of a
+few indexes and price-band queries are two binary searches, so neither
+depends on the catalog size.
+
+Updates are incremental: saving or deleting a product inserts into and
+deletes from the sorted indexes it belongs to (one array copy each)
+instead of re-sorting, and bulk loads merge each touched index once.
+"""
+
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from .profile_store import Vocabulary, _synchronized
+from .schema import ALL_CATEGORIES, PRODUCT_CATEGORIES, PRODUCT_FIELDS
+
+# Batches larger than this (or than 1/8 of an index) are merged with a sort instead of inserted
+_MERGE_THRESHOLD = 1024
+
+
+class _SortedIndex:
+    """Catalog rows ordered by ``(price, row)``, or by row alone (catalog order).
+
+    Updates replace the arrays rather than modifying them in place, so
+    arrays handed out earlier stay consistent.
+    """
+
+    def __init__(self, by_price):
+        self.by_price = by_price
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.prices = np.zeros(0, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _sorted(self, rows, prices):
+        order = np.lexsort((rows, prices)) if self.by_price else np.argsort(rows)
+        return rows[order], prices[order]
+
+    def _positions(self, rows, prices):
+        """Where each ``(price, row)`` pair, in sorted order, is or would be in the index."""
+        if not self.by_price:
+            return np.searchsorted(self.rows, rows)
+        positions = np.searchsorted(self.prices, prices)
+        ends = np.searchsorted(self.prices, prices, side="right")
+        # Among products with the same price, order by row
+        for i in np.flatnonzero(ends > positions):
+            positions[i] += np.searchsorted(self.rows[positions[i]:ends[i]], rows[i])
+        return positions
+
+    def insert(self, rows, prices):
+        rows, prices = self._sorted(rows, prices)
+        if len(rows) > max(_MERGE_THRESHOLD, len(self) // 8):
+            self.rows, self.prices = self._sorted(np.concatenate((self.rows, rows)),
+                                                  np.concatenate((self.prices, prices)))
+            return
+        positions = self._positions(rows, prices)
+        self.rows = np.insert(self.rows, positions, rows)
+        self.prices = np.insert(self.prices, positions, prices)
+
+    def remove(self, rows, prices):
+        """Remove ``rows`` (which must be in the index, with their indexed prices)."""
+        positions = self._positions(*self._sorted(rows, prices))
+        self.rows = np.delete(self.rows, positions)
+        self.prices = np.delete(self.prices, positions)
+
+    def shift(self, row):
+        """Renumber after ``row`` was deleted from the catalog."""
+        self.rows = self.rows - (self.rows > row)
+
+    def price_range(self, low=None, high=None):
+        """Rows with ``low <= price <= high`` (``None`` is open), cheapest first."""
+        start = 0 if low is None else np.searchsorted(self.prices, low)
+        stop = len(self) if high is None else np.searchsorted(self.prices, high, side="right")
+        return self.rows[start:stop]
+
+
+class ProductCatalog:
+    """Struct-of-arrays container for products, with sorted indexes.
+
+    ``version`` increases on every mutation and ``token`` is unique per
+    catalog instance, so ``(token, version)`` identifies the catalog for
+    cache keys. Public methods hold ``lock`` (an RLock, which callers may
+    also hold to group several reads, e.g. ranking then reading records).
+    """
+
+    def __init__(self, capacity=1024):
+        capacity = max(int(capacity), 1)
+        self._size = 0
+        self._capacity = capacity
+        self._row_of = {}
+        self._max_id = 0
+        self.lock = threading.RLock()
+        self.token = uuid.uuid4().hex
+        self.version = 0
+
+        self.categories = Vocabulary([category for category in PRODUCT_CATEGORIES if category != ALL_CATEGORIES])
+
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._names = np.empty(capacity, dtype=object)
+        self._category = np.empty(capacity, dtype=np.int32)
+        self._prices = np.empty(capacity, dtype=np.float64)
+        self._eco = np.empty(capacity, dtype=bool)
+        # (category code or None for all, eco-friendly only, by price) -> _SortedIndex
+        self._indexes = {}
+
+    @classmethod
+    def from_records(cls, records):
+        records = list(records)
+        catalog = cls(capacity=len(records) or 1024)
+        catalog.extend(records)
+        return catalog
+
+    # ------------------------------------------------------------------
+    # Size and lookup
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, product_id):
+        return product_id in self._row_of
+
+    @property
+    def max_id(self):
+        """Largest id ever stored, including ids of since-deleted products."""
+        return self._max_id
+
+    def row_of(self, product_id):
+        return self._row_of[product_id]
+
+    @_synchronized
+    def get(self, product_id, default=None):
+        row = self._row_of.get(product_id)
+        if row is None:
+            return default
+        return self.record(row)
+
+    @_synchronized
+    def record(self, row):
+        return {
+            "id": int(self._ids[row]),
+            "name": self._names[row],
+            "category": self.categories.labels[self._category[row]],
+            "price": float(self._prices[row]),
+            "eco_friendly": bool(self._eco[row]),
+        }
+
+    @_synchronized
+    def records(self, rows=None):
+        """Return product dicts for ``rows`` (default: all rows), as a list."""
+        if rows is None:
+            rows = range(self._size)
+        return [self.record(int(row)) for row in rows]
+
+    @_synchronized
+    def frame(self, rows=None):
+        """``DataFrame`` of ``rows`` (default: all rows) with one column per product field."""
+        rows = np.arange(self._size) if rows is None else np.asarray(rows, dtype=np.int64)
+        labels = np.array(self.categories.labels, dtype=object)
+        return pd.DataFrame({
+            "id": self._ids[rows],
+            "name": self._names[rows],
+            "category": labels[self._category[rows]],
+            "price": self._prices[rows],
+            "eco_friendly": self._eco[rows],
+        }, columns=PRODUCT_FIELDS)
+
+    # ------------------------------------------------------------------
+    # Indexes
+    # ------------------------------------------------------------------
+    def _index(self, code, eco_only, by_price):
+        key = (code, eco_only, by_price)
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = _SortedIndex(by_price)
+        return index
+
+    def _update_indexes(self, rows, insert):
+        """Add ``rows`` to (or remove them from) every index they belong to."""
+        rows = np.asarray(rows, dtype=np.int64)
+        codes, eco, prices = self._category[rows], self._eco[rows], self._prices[rows]
+        for code in np.unique(codes).tolist() + [None]:
+            members = np.ones(len(rows), dtype=bool) if code is None else codes == code
+            for eco_only in (False, True):
+                selected = np.flatnonzero(members & eco if eco_only else members)
+                if not len(selected):
+                    continue
+                for by_price in (False, True):
+                    index = self._index(code, eco_only, by_price)
+                    if insert:
+                        index.insert(rows[selected], prices[selected])
+                    else:
+                        index.remove(rows[selected], prices[selected])
+
+    @_synchronized
+    def sorted_rows(self, code=None, eco_only=False, by_price=False):
+        """Return ``(rows, prices)`` of one index: rows of category ``code`` (``None``: all).
+
+        Ordered by price (ties in catalog order) or in catalog order. The
+        arrays are never modified afterwards; later updates replace them.
+        """
+        index = self._indexes.get((code, eco_only, by_price))
+        if index is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        return index.rows, index.prices
+
+    @_synchronized
+    def price_range(self, low=None, high=None, category=None, eco_only=False):
+        """Rows of the products priced between ``low`` and ``high`` (inclusive), cheapest first.
+
+        ``category`` is a category label (``None`` or ``ALL_CATEGORIES``: all);
+        ``eco_only`` keeps eco-friendly products only.
+        """
+        code = None
+        if category is not None and category != ALL_CATEGORIES:
+            code = self.categories.find(category)
+            if code < 0:
+                return np.zeros(0, dtype=np.int64)
+        index = self._indexes.get((code, eco_only, True))
+        if index is None:
+            return np.zeros(0, dtype=np.int64)
+        return index.price_range(low, high)
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+    def _reserve(self, size):
+        if size <= self._capacity:
+            return
+        capacity = max(size, self._capacity * 2)
+        n = self._size
+        for name in ("_ids", "_names", "_category", "_prices", "_eco"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:n] = old[:n]
+            setattr(self, name, new)
+        self._capacity = capacity
+
+    def _encode(self, product):
+        """Column values of ``product``; raises on bad values before anything is written."""
+        return (int(product["id"]), product.get("name", ""), self.categories.code(product.get("category", "")),
+                float(product.get("price", 0.0)), bool(product.get("eco_friendly", False)))
+
+    def _write(self, row, values):
+        product_id, self._names[row], self._category[row], self._prices[row], self._eco[row] = values
+        self._ids[row] = product_id
+        self._max_id = max(self._max_id, product_id)
+
+    def _write_block(self, start, products):
+        """Write new products to rows ``start:start + len(products)`` column by column."""
+        rows = slice(start, start + len(products))
+        ids = np.fromiter((product["id"] for product in products), dtype=np.int64, count=len(products))
+        self._ids[rows] = ids
+        self._names[rows] = [product.get("name", "") for product in products]
+        self._category[rows] = self.categories.codes([product.get("category", "") for product in products])
+        self._prices[rows] = [float(product.get("price", 0.0)) for product in products]
+        self._eco[rows] = [bool(product.get("eco_friendly", False)) for product in products]
+        self._max_id = max(self._max_id, int(ids.max()))
+
+    @_synchronized
+    def upsert(self, product):
+        """Insert a product or replace the one with the same id; returns its row."""
+        values = self._encode(product)
+        row = self._row_of.get(product["id"])
+        if row is None:
+            self._reserve(self._size + 1)
+            row = self._size
+            self._size += 1
+            self._row_of[product["id"]] = row
+        else:
+            self._update_indexes([row], insert=False)
+        self._write(row, values)
+        self._update_indexes([row], insert=True)
+        self.version += 1
+        return row
+
+    @_synchronized
+    def extend(self, products):
+        """Bulk insert or replace products with a single version bump.
+
+        New products are written column by column in one block and merged
+        into each index once; products whose id is already stored (or
+        repeated within ``products``) replace that row, last one wins.
+        Nothing changes if a product has a bad value.
+        """
+        products = list(products)
+        self._reserve(self._size + len(products))
+        start = self._size
+        new, updates = [], []
+        rows = {}
+        for product in products:
+            if product["id"] in self._row_of or product["id"] in rows:
+                updates.append(product)
+            else:
+                rows[product["id"]] = start + len(new)
+                new.append(product)
+
+        # Write the new rows past the end and encode the updates before any index or row changes
+        if new:
+            self._write_block(start, new)
+        updates = [(self._row_of.get(product["id"], rows.get(product["id"])), self._encode(product))
+                   for product in updates]
+
+        replaced = np.array(sorted({row for row, _ in updates if row < start}), dtype=np.int64)
+        if len(replaced):
+            self._update_indexes(replaced, insert=False)
+        self._row_of.update(rows)
+        self._size += len(new)
+        for row, values in updates:
+            self._write(row, values)
+        self._update_indexes(np.concatenate((replaced, np.arange(start, self._size))), insert=True)
+        self.version += 1
+
+    @_synchronized
+    def delete(self, product_id):
+        """Remove a product, keeping the remaining rows in insertion order."""
+        row = self._row_of.pop(product_id)
+        self._update_indexes([row], insert=False)
+        n = self._size
+        for arr in (self._ids, self._names, self._category, self._prices, self._eco):
+            arr[row:n - 1] = arr[row + 1:n]
+        self._size = n - 1
+        self._row_of.update(zip(self._ids[row:self._size].tolist(), range(row, self._size)))
+        for index in self._indexes.values():
+            index.shift(row)
+        self.version += 1
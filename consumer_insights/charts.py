@@ -0,0 +1,75 @@
+"""Chart rendering for the Dashboard and Insights pages.
+
+Figures are rendered once into PNG/SVG bytes and kept in a ``FigureCache``
+(see ``consumer_insights.figure_cache``) keyed on the profile data version
+plus chart parameters.
+"""
+
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+
+def interests_column_chart(interest_counts):
+    fig, ax = plt.subplots(figsize=(8, 5))
+    sns.barplot(x=interest_counts.index, y=interest_counts.values, ax=ax)
+    ax.tick_params(axis="x", labelrotation=45)
+    fig.tight_layout()
+    return fig
+
+
+def age_histogram(ages, counts=None):
+    """Histogram of ages; ``counts`` weights each age when data is pre-aggregated."""
+    fig, ax = plt.subplots(figsize=(8, 5))
+    sns.histplot(x=ages, weights=counts, bins=5, kde=True, ax=ax)
+    ax.set_xlabel("age")
+    return fig
+
+
+def location_pie(location_counts):
+    fig, ax = plt.subplots(figsize=(8, 5))
+    ax.pie(location_counts, labels=location_counts.index, autopct='%1.1f%%', startangle=90)
+    ax.axis('equal')
+    return fig
+
+
+def horizontal_bar(counts):
+    fig, ax = plt.subplots(figsize=(8, 5))
+    sns.barplot(x=counts.values, y=counts.index, ax=ax)
+    fig.tight_layout()
+    return fig
+
+
+def stage_bar(stage_counts):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.barplot(x=stage_counts.index, y=stage_counts.values, ax=ax)
+    ax.set_ylabel("Number of Consumers")
+    ax.set_xlabel("Buying Stage")
+    return fig
+
+
+def stage_funnel(stages, stage_counts):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.bar(stages, stage_counts, width=0.6)
+
+    # Add conversion rate arrows between consecutive stages
+    for i in range(len(stages) - 1):
+        if stage_counts[i] > 0 and stage_counts[i + 1] > 0:
+            rate = f"{(stage_counts[i + 1] / stage_counts[i]) * 100:.1f}%"
+            y = min(stage_counts[i], stage_counts[i + 1]) + 0.1
+            ax.annotate(f"→ {rate}", xy=(i + 0.5, y), xytext=(i + 0.5, y),
+                        arrowprops=dict(arrowstyle="->"))
+
+    ax.set_ylabel("Number of Consumers")
+    ax.set_title("Consumer Journey Stage Conversion")
+    return fig
+
+
+def heatmap(table, title=None):
+    """Annotated heatmap of a count table such as a segment cross-tab."""
+    fig, ax = plt.subplots(figsize=(10, max(3, 0.5 * len(table) + 1.5)))
+    sns.heatmap(table, annot=True, fmt="d", cmap="Blues", cbar=False, ax=ax)
+    ax.set_ylabel("")
+    if title:
+        ax.set_title(title)
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,312 @@
+"""Process-wide dataset shared by every Streamlit session.
+
+One ``SharedDataset`` holds the profile store, the product catalog and the
+recommendation engine for the whole server process, so memory scales with
+the data rather than with the number of connected sessions. Writes go
+through the dataset so the in-memory store, the repository and the advice
+cache stay in step, and edits become visible to every session on its next
+rerun. Single-profile edits are recorded in the edit journal
+(``consumer_insights.journal``), which persists them and notifies the
+derived structures subscribed to it, and makes them undoable. While
+journey tracking is on, every buying-stage change (from edits and
+imports) is also recorded as a transition event (``consumer_insights.journeys``).
+
+The profile store, the id allocator, the product catalog and the
+recommendation engine are built on first use (together with their numpy/pandas imports), so pages
+that only need the repository or the advice cache start quickly.
+"""
+
+import threading
+import time
+from functools import partial
+
+from .advice import generate_advice
+from .advice_cache import AdviceCache, advice_key
+from .ids import IdAllocator
+from .journal import EditJournal
+from .schema import ALL_CATEGORIES
+
+
+def _stage(profile):
+    return None if profile is None else profile["buying_stage"]
+
+
+class SharedDataset:
+    """Profiles and products loaded once and shared across sessions."""
+
+    def __init__(self, repository, journey_directory=None):
+        self.repository = repository
+        self.journey_directory = journey_directory
+        self.advice_cache = AdviceCache()
+        self._write_lock = threading.Lock()
+        self._load_lock = threading.RLock()
+        self._profiles = None
+        self._ids = None
+        self._catalog = None
+        self._engine = None
+        self._journal = None
+        self._journeys = None
+        self._journey_tracking = None
+
+    def _lazy(self, name, build):
+        value = getattr(self, name)
+        if value is None:
+            with self._load_lock:
+                value = getattr(self, name)
+                if value is None:
+                    value = build()
+                    setattr(self, name, value)
+        return value
+
+    @property
+    def profiles(self):
+        """The ``ProfileStore``, loaded from the repository on first access."""
+        def load():
+            from .profile_store import ProfileStore
+
+            store = ProfileStore(capacity=max(self.repository.count_profiles(), 1024))
+            for chunk in self.repository.iter_profiles():
+                store.extend(chunk)
+            return store
+        return self._lazy("_profiles", load)
+
+    @property
+    def ids(self):
+        return self._lazy("_ids", lambda: IdAllocator(
+            max(self.repository.get_counter("next_profile_id", 1), self.profiles.max_id + 1),
+            on_allocate=partial(self.repository.set_counter, "next_profile_id"),
+        ))
+
+    @property
+    def catalog(self):
+        """The ``ProductCatalog``, loaded from the repository on first access."""
+        def load():
+            from .catalog import ProductCatalog
+
+            catalog = ProductCatalog(capacity=max(self.repository.count_products(), 1024))
+            for chunk in self.repository.iter_products():
+                catalog.extend(chunk)
+            return catalog
+        return self._lazy("_catalog", load)
+
+    @property
+    def engine(self):
+        """The ``RecommendationEngine`` over the product catalog, built on first access."""
+        def build():
+            from .recommendations import RecommendationEngine
+
+            return RecommendationEngine(self.catalog)
+        return self._lazy("_engine", build)
+
+    @property
+    def journal(self):
+        """The ``EditJournal``.
+
+        On each edit the advice cache drops the profile's advice and the
+        store's derived indexes apply it (``ProfileStore.update_derived``).
+        """
+        def load():
+            journal = EditJournal(self.repository)
+            journal.subscribe(lambda edit: self.profiles.update_derived(edit))
+            journal.subscribe(lambda edit: self.advice_cache.invalidate_profile(edit.profile_id))
+            journal.subscribe(self._track_edit)
+            return journal
+        return self._lazy("_journal", load)
+
+    @property
+    def journeys(self):
+        """The ``StageEventStore`` of buying-stage transitions, opened on first access.
+
+        Kept in ``journey_directory``, or in memory only when it is ``None``.
+        """
+        def load():
+            from .journeys import StageEventStore
+
+            return StageEventStore(self.journey_directory)
+        return self._lazy("_journeys", load)
+
+    @property
+    def journey_tracking(self):
+        """Whether stage changes are recorded; a persisted, process-wide setting (default on)."""
+        if self._journey_tracking is None:
+            self._journey_tracking = bool(self.repository.get_counter("journey_tracking", 1))
+        return self._journey_tracking
+
+    @journey_tracking.setter
+    def journey_tracking(self, enabled):
+        self.repository.set_counter("journey_tracking", int(enabled))
+        self._journey_tracking = bool(enabled)
+
+    def _track_stages(self, profile_ids, before, after, at):
+        """Record the stage changes among ``(profile id, stage before, stage after)`` triples."""
+        journeys = self.journeys
+        changes = [(profile_id, journeys.code(old), journeys.code(new))
+                   for profile_id, old, new in zip(profile_ids, before, after) if old != new]
+        changes = [change for change in changes if change[1] is not None and change[2] is not None]
+        if changes:
+            profile_ids, from_stages, to_stages = zip(*changes)
+            journeys.append([int(at * 1000)] * len(changes), profile_ids, from_stages, to_stages)
+
+    def _track_edit(self, edit):
+        if self.journey_tracking:
+            self._track_stages([edit.profile_id], [_stage(edit.before)], [_stage(edit.after)], edit.created_at)
+
+    def allocate_profile_id(self):
+        """Return a fresh id for a new profile; ids are never reused."""
+        return self.ids.allocate()
+
+    def advice_key(self, profile, advice_type, category=ALL_CATEGORIES):
+        """Cache key of the advice for ``profile``: equal keys mean identical advice.
+
+        Product recommendations are also keyed on the catalog version, so
+        catalog changes are reflected without clearing the cache.
+        """
+        key = advice_key(profile, advice_type, category)
+        if advice_type == "Product Recommendations":
+            key += (self.catalog.token, self.catalog.version)
+        return key
+
+    def generate_advice(self, profile, advice_type, category=ALL_CATEGORIES, progress=None):
+        """Return advice for ``profile``, reusing cached advice for unchanged profiles.
+
+        See ``consumer_insights.advice.generate_advice``; ``progress`` is
+        only called when the advice is actually generated.
+        """
+        return self.advice_cache.get_or_create(
+            self.advice_key(profile, advice_type, category),
+            lambda: generate_advice(profile, advice_type, category, self.engine, progress=progress))
+
+    def save_profile(self, profile, expected_revision=None):
+        """Store a new or edited profile.
+
+        ``expected_revision`` is the revision the editor started from (see
+        ``ProfileStore.revision``); ``ProfileConflictError`` is raised if
+        another session saved the profile in the meantime. Like every
+        profile write, the repository is written first, so a failed write
+        leaves the store unchanged. Returns the journaled ``ProfileEdit``.
+        """
+        from .profile_store import ProfileConflictError
+
+        store = self.profiles
+        # Hold the store lock until the journal has updated the derived indexes, so no reader rebuilds them
+        with self._write_lock, store.lock:
+            before = store.get(profile["id"])
+            if (expected_revision is not None and before is not None
+                    and store.revision(profile["id"]) != expected_revision):
+                raise ProfileConflictError(f"Profile {profile['id']} was changed by someone else")
+            after = store.normalize(profile)
+            edit = self.journal.record(before, after, apply=lambda: store.upsert(after))
+            self.ids.observe(profile["id"])
+            return edit
+
+    def delete_profile(self, profile_id):
+        """Delete a profile (``KeyError`` if unknown); returns the journaled ``ProfileEdit``."""
+        store = self.profiles
+        with self._write_lock, store.lock:
+            before = store.get(profile_id)
+            if before is None:
+                raise KeyError(f"No profile with id {profile_id}")
+            return self.journal.record(before, None, apply=lambda: store.delete(profile_id))
+
+    def undo(self, seq):
+        """Revert the journaled edit ``seq`` by recording its inverse; returns the new edit.
+
+        ``KeyError`` if the edit was compacted away; ``ProfileConflictError``
+        if the profile changed after that edit.
+        """
+        from .profile_store import ProfileConflictError
+
+        store = self.profiles
+        with self._write_lock, store.lock:
+            edit = self.journal.get(seq)
+            current = store.get(edit.profile_id)
+            if current != edit.after:
+                raise ProfileConflictError(f"Profile {edit.profile_id} was changed after edit {seq}")
+            if edit.before is None:
+                apply = partial(store.delete, edit.profile_id)
+            else:
+                apply = partial(store.upsert, store.normalize(edit.before))
+            return self.journal.record(current, edit.before, undoes=seq, apply=apply)
+
+    def snapshot(self, seq):
+        """Return a ``ProfileStore`` with the profiles as they were right after edit ``seq``.
+
+        Copies the current store and reverts the newer edits, newest first;
+        ``ValueError`` if some of them were compacted. Restored profiles
+        may come back in a different row order.
+        """
+        with self._write_lock:
+            newer = self.journal.since(seq)
+            snapshot = self.profiles.copy()
+        for edit in reversed(newer):
+            if edit.before is None:
+                snapshot.delete(edit.profile_id)
+            else:
+                snapshot.upsert(edit.before)
+        return snapshot
+
+    def save_product(self, product):
+        """Store a new or edited product; the catalog indexes are updated in place.
+
+        Like every product write, the repository is written first, so a
+        failed write leaves the catalog unchanged.
+        """
+        with self._write_lock:
+            self.repository.save_products([product])
+            self.catalog.upsert(product)
+
+    def delete_product(self, product_id):
+        """Delete a product (``KeyError`` if unknown)."""
+        with self._write_lock:
+            catalog = self.catalog
+            if product_id not in catalog:
+                raise KeyError(f"No product with id {product_id}")
+            self.repository.delete_product(product_id)
+            catalog.delete(product_id)
+
+    def import_products(self, source, file_format="csv", on_progress=None):
+        """Validate and bulk load a product file into the repository and the catalog.
+
+        Products with a known id replace it. Returns the ``IngestReport``.
+        """
+        from .ingest import ingest_products
+
+        catalog = self.catalog
+
+        def write(products):
+            self.repository.save_products(products)
+            catalog.extend(products)
+
+        with self._write_lock:
+            return ingest_products(source, write, file_format, on_progress=on_progress)
+
+    def import_profiles(self, source, file_format="csv", on_progress=None):
+        """Validate and bulk import a file into both the repository and the store.
+
+        Returns the ``IngestReport`` (see ``consumer_insights.ingest``).
+        """
+        from .ingest import ingest_profiles
+
+        # Load the store before the repository changes, so new rows are added once
+        store = self.profiles
+        track = self.journey_tracking
+
+        def write(profiles):
+            if track:
+                with store.lock:
+                    stages, labels = store.codes("buying_stage"), store.labels("buying_stage")
+                    before = [labels[stages[store.row_of(profile["id"])]] if profile["id"] in store else None
+                              for profile in profiles]
+            self.repository.save_profiles(profiles)
+            store.extend(profiles)
+            if track:
+                self._track_stages([profile["id"] for profile in profiles], before,
+                                   [profile["buying_stage"] for profile in profiles], time.time())
+
+        with self._write_lock:
+            report = ingest_profiles(source, write, file_format, on_progress=on_progress)
+            self.ids.observe(store.max_id)
+            self.advice_cache.clear()
+            # Imports are not journaled, so earlier edits can no longer be undone or replayed
+            self.journal.compact()
+            return report
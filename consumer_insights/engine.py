@@ -0,0 +1,331 @@
+"""Headless advice and analytics engine.
+
+``InsightsEngine`` is the importable entry point to everything the app
+does: it opens the profile repository, loads the shared dataset and
+exposes profile queries, advice generation and analytics as plain method
+calls. The Streamlit app and the HTTP API (``consumer_insights.server``)
+are both thin clients of it, so pipelines can use the same code without a
+browser.
+
+Opening the engine only connects to the database; the profile store and
+the numpy/pandas based query and analytics modules are loaded by the
+first call that needs them.
+
+Advice and batch advice can also be submitted as jobs to the engine's
+``JobQueue`` (``consumer_insights.jobs``), which runs them in the
+background, shares identical in-flight requests between users and limits
+how much each user can queue; callers poll the returned ``Job``.
+"""
+
+import itertools
+import os
+import time
+
+from .advice import SUPPORTED_ADVICE_TYPES
+from .dataset import SharedDataset
+from .jobs import JobQueue
+from .sample_data import SAMPLE_PRODUCTS, SAMPLE_PROFILES
+from .schema import ALL_CATEGORIES, PRODUCT_CATEGORIES, PROFILE_FIELDS
+from .storage import SQLiteRepository
+
+# Most advice records generated by one batch call
+MAX_BATCH_SIZE = 10_000
+
+# Segments smaller than this are advised in-process rather than in a worker pool
+_POOL_THRESHOLD = 5000
+
+# Fields whose label counts can be queried
+COUNT_FIELDS = ("location", "buying_stage", "interests", "pain_points")
+
+# Longest journey analytics window, in days
+MAX_WINDOW_DAYS = 3650
+
+
+def _check_choice(name, value, choices):
+    if value not in choices:
+        raise ValueError(f"Unknown {name}: {value!r}")
+
+
+class InsightsEngine:
+    """Profiles, advice and analytics behind one object.
+
+    All methods are safe to call from several threads; reads go through
+    the profile store's lock and writes through the dataset.
+    """
+
+    def __init__(self, dataset, jobs=None):
+        self.dataset = dataset
+        self.jobs = jobs if jobs is not None else JobQueue()
+
+    @classmethod
+    def open(cls, db_path, products=SAMPLE_PRODUCTS, sample_profiles=SAMPLE_PROFILES):
+        """Open (or create) the SQLite database at ``db_path`` and load it.
+
+        An empty database is seeded with ``sample_profiles`` and an empty
+        catalog with ``products``. Journey events are kept in a
+        ``<db name>_journeys`` directory next to the database.
+        """
+        repository = SQLiteRepository(db_path)
+        if repository.count_profiles() == 0:
+            repository.save_profiles(sample_profiles)
+        if repository.count_products() == 0:
+            repository.save_products(products)
+        journey_directory = os.path.splitext(db_path)[0] + "_journeys"
+        return cls(SharedDataset(repository, journey_directory=journey_directory))
+
+    @property
+    def profiles(self):
+        return self.dataset.profiles
+
+    @property
+    def repository(self):
+        return self.dataset.repository
+
+    def status(self):
+        store = self.profiles
+        return {
+            "profiles": len(store),
+            "products": len(self.dataset.catalog),
+            "version": store.version,
+            "advice_cache": self.dataset.advice_cache.stats(),
+            "jobs": self.jobs.stats(),
+        }
+
+    # ------------------------------------------------------------------
+    # Profiles
+    # ------------------------------------------------------------------
+    def get_profile(self, profile_id):
+        """Return the profile record for ``profile_id``; ``KeyError`` if unknown."""
+        profile = self.profiles.get(profile_id)
+        if profile is None:
+            raise KeyError(f"No profile with id {profile_id}")
+        return profile
+
+    def query_profiles(self, search="", locations=None, stages=None, interests=None,
+                       sort_by="id", descending=False, page=1, page_size=12):
+        """Return one ``ProfilePage`` (see ``consumer_insights.profile_query``)."""
+        from .profile_query import SORT_FIELDS, query_page
+
+        _check_choice("sort field", sort_by, SORT_FIELDS.values())
+        if page_size < 1:
+            raise ValueError("page_size must be positive")
+        return query_page(self.profiles, search, locations, stages, interests,
+                          sort_by=sort_by, descending=descending, page=page, page_size=page_size)
+
+    def similar_profiles(self, profile_id, k=5, approximate=False):
+        """Return ``[(record, similarity)]`` for the profiles most like ``profile_id``."""
+        from .similarity import similar_profiles
+
+        if profile_id not in self.profiles:
+            raise KeyError(f"No profile with id {profile_id}")
+        return similar_profiles(self.profiles, profile_id, k=k, approximate=approximate)
+
+    def edits(self, since=None, limit=100):
+        """Return the newest ``limit`` journaled profile edits after ``since``, oldest first."""
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        return self.dataset.journal.entries(since=since, limit=limit)
+
+    def undo(self, seq):
+        """Revert the journaled edit ``seq`` (see ``SharedDataset.undo``)."""
+        return self.dataset.undo(seq)
+
+    def snapshot(self, seq):
+        """Return a ``ProfileStore`` of the profiles as of edit ``seq`` (see ``SharedDataset.snapshot``)."""
+        return self.dataset.snapshot(seq)
+
+    # ------------------------------------------------------------------
+    # Products
+    # ------------------------------------------------------------------
+    def get_product(self, product_id):
+        """Return the product record for ``product_id``; ``KeyError`` if unknown."""
+        product = self.dataset.catalog.get(product_id)
+        if product is None:
+            raise KeyError(f"No product with id {product_id}")
+        return product
+
+    def products(self, category=ALL_CATEGORIES, min_price=None, max_price=None, eco_only=False, limit=None):
+        """Return the products in a category and price band, cheapest first (at most ``limit``)."""
+        _check_choice("category", category, PRODUCT_CATEGORIES)
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise ValueError("min_price must not exceed max_price")
+        catalog = self.dataset.catalog
+        with catalog.lock:
+            rows = catalog.price_range(min_price, max_price, category, eco_only)
+            return catalog.records(rows[:limit])
+
+    # ------------------------------------------------------------------
+    # Advice
+    # ------------------------------------------------------------------
+    def advise(self, profile, advice_type, category=ALL_CATEGORIES, progress=None):
+        """Return an advice record for ``profile`` (a record dict or a profile id).
+
+        Advice for unchanged profiles comes from the dataset's advice cache.
+        """
+        profile = self._advice_profile(profile, advice_type, category)
+        return self.dataset.generate_advice(profile, advice_type, category, progress=progress)
+
+    def _advice_profile(self, profile, advice_type, category):
+        """Validate an advice request; returns the profile record."""
+        if not isinstance(profile, dict):
+            profile = self.get_profile(profile)
+        missing = [field for field in PROFILE_FIELDS if field not in profile]
+        if missing:
+            raise ValueError(f"Profile is missing fields: {', '.join(missing)}")
+        _check_choice("advice type", advice_type, SUPPORTED_ADVICE_TYPES)
+        _check_choice("category", category, PRODUCT_CATEGORIES)
+        return profile
+
+    def advise_batch(self, profile_ids, advice_types, category=ALL_CATEGORIES):
+        """Return advice records for every profile id and advice type.
+
+        Each record carries the ``profile_id`` it was generated for. Unknown
+        ids raise ``KeyError`` before any advice is generated.
+        """
+        advice_types = list(advice_types)
+        profile_ids = list(profile_ids)
+        if len(profile_ids) * len(advice_types) > MAX_BATCH_SIZE:
+            raise ValueError(f"Batch is limited to {MAX_BATCH_SIZE} advice records")
+        profiles = [self.get_profile(profile_id) for profile_id in profile_ids]
+        results = []
+        for profile in profiles:
+            for advice_type in advice_types:
+                advice = self.advise(profile, advice_type, category)
+                advice["profile_id"] = profile["id"]
+                results.append(advice)
+        return results
+
+    def segment_rows(self, locations=None, stages=None, interests=None):
+        """Return the store rows of the profiles matching every given filter."""
+        return self.profiles.filter(locations=locations, stages=stages, interests=interests)
+
+    def iter_segment_advice(self, rows, advice_types, category=ALL_CATEGORIES, progress=None):
+        """Yield lists of advice records for the profiles at ``rows``.
+
+        Rule-based advice types are evaluated in-process over the store's
+        columns (see ``consumer_insights.batch.iter_rule_advice``); product
+        recommendations go through ``iter_batch_advice``, which fans large
+        segments out to a process pool. Results are not cached.
+        """
+        from .advice import DECISION_TABLES
+        from .batch import iter_batch_advice, iter_rule_advice
+
+        rule_types = [advice_type for advice_type in advice_types if advice_type in DECISION_TABLES]
+        other_types = [advice_type for advice_type in advice_types if advice_type not in DECISION_TABLES]
+        expected = len(rows) * (len(rule_types) + len(other_types))
+        completed = 0
+        chunks = iter_rule_advice(self.profiles, rows, rule_types, category) if rule_types else iter(())
+        if other_types:
+            workers = 1 if len(rows) < _POOL_THRESHOLD else None
+            chunks = itertools.chain(chunks, iter_batch_advice(
+                self.profiles.records(rows), other_types, self.dataset.catalog,
+                category=category, workers=workers, total=len(rows)))
+        for results in chunks:
+            completed += len(results)
+            if progress is not None and expected:
+                progress("rendering", min(completed / expected, 1.0))
+            yield results
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+    def submit_advice(self, user, profile, advice_type, category=ALL_CATEGORIES):
+        """Queue ``advise`` as a job of ``user``; returns the ``Job``, whose result is the advice.
+
+        The request is validated right away. While advice with the same
+        cache key is queued or running, further requests share its job.
+        Raises ``QueueFullError`` when ``user`` or the queue is at its limit.
+        """
+        profile = self._advice_profile(profile, advice_type, category)
+        key = ("advice",) + self.dataset.advice_key(profile, advice_type, category)
+        return self.jobs.submit(user, "advice", key=key, func=lambda progress: self.dataset.generate_advice(
+            profile, advice_type, category, progress=progress))
+
+    def submit_segment_advice(self, user, rows, advice_types, category=ALL_CATEGORIES):
+        """Queue ``iter_segment_advice`` for the profiles at ``rows`` as a job of ``user``.
+
+        The job's result is the list of advice records. Profiles deleted
+        before the job runs are skipped. Identical requests against the
+        same profile data share one job. Segments of ``_POOL_THRESHOLD``
+        profiles or more use the batch process pool from the job's worker
+        thread; its workers start from a fork server, not by forking this
+        multithreaded process (see ``consumer_insights.batch``).
+        """
+        import hashlib
+
+        import numpy as np
+
+        advice_types = list(advice_types)
+        for advice_type in advice_types:
+            _check_choice("advice type", advice_type, SUPPORTED_ADVICE_TYPES)
+        _check_choice("category", category, PRODUCT_CATEGORIES)
+        store = self.profiles
+        with store.lock:
+            ids = store.column("id")[rows]
+            version = (store.token, store.version)
+        digest = hashlib.blake2b(ids.tobytes(), digest_size=16).hexdigest()
+        key = ("segment_advice", version, digest, tuple(advice_types), category)
+
+        def run(progress):
+            with store.lock:
+                current = np.array([store.row_of(profile_id) for profile_id in ids.tolist() if profile_id in store],
+                                   dtype=np.int64)
+            results = []
+            for chunk in self.iter_segment_advice(current, advice_types, category, progress=progress):
+                results.extend(chunk)
+            return results
+
+        return self.jobs.submit(user, "segment_advice", run, key=key)
+
+    def job(self, job_id):
+        """Return the ``Job`` with ``job_id``; ``KeyError`` if unknown or expired."""
+        return self.jobs.get(job_id)
+
+    # ------------------------------------------------------------------
+    # Analytics
+    # ------------------------------------------------------------------
+    def value_counts(self, field):
+        """Return a ``pd.Series`` of profile counts per label, most frequent first."""
+        _check_choice("field", field, COUNT_FIELDS)
+        return self.profiles.value_counts(field)
+
+    def age_histogram(self):
+        return self.profiles.age_histogram()
+
+    def _window(self, days):
+        if not 0 < days <= MAX_WINDOW_DAYS:
+            raise ValueError(f"days must be between 1 and {MAX_WINDOW_DAYS}")
+        end = time.time()
+        # Start at a UTC midnight, so that cohort periods begin on calendar days
+        return (end - days * 86400) // 86400 * 86400, end
+
+    def cohort_conversion(self, days=90, period_days=7, horizon_days=None):
+        """Stage conversion of the cohorts entering the journey in the last ``days`` days.
+
+        See ``consumer_insights.journeys.cohort_conversion``.
+        """
+        from .journeys import cohort_conversion
+
+        if period_days <= 0 or (horizon_days is not None and horizon_days <= 0):
+            raise ValueError("period_days and horizon_days must be positive")
+        start, end = self._window(days)
+        return cohort_conversion(self.dataset.journeys, start, end, period_days, horizon_days)
+
+    def time_in_stage(self, days=90):
+        """Per-stage summary of the stays completed in the last ``days`` days."""
+        from .journeys import time_in_stage
+
+        return time_in_stage(self.dataset.journeys, *self._window(days))
+
+    def transition_counts(self, days=90):
+        """From-stage x to-stage counts of the transitions in the last ``days`` days."""
+        from .journeys import transition_counts
+
+        return transition_counts(self.dataset.journeys, *self._window(days))
+
+    def segment_report(self, segment_field):
+        """Return the segment tables for ``segment_field`` (see ``consumer_insights.segments``)."""
+        from .segments import SEGMENT_FIELDS, segment_report
+
+        _check_choice("segment field", segment_field, SEGMENT_FIELDS.values())
+        return segment_report(self.profiles, segment_field)
@@ -0,0 +1,63 @@
+"""Cache of rendered chart images.
+
+Figures are rendered once into PNG/SVG bytes and kept keyed on the profile
+data version plus chart parameters. Every figure is closed right after it
+is serialized so pyplot does not accumulate them across reruns. matplotlib
+is only imported once something is rendered, so the cache (and its hit
+counts) can be created on pages without charts.
+"""
+
+import io
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    """Thread-safe LRU cache of rendered figure bytes."""
+
+    def __init__(self, max_entries=64, image_format="png", dpi=100):
+        self.max_entries = max_entries
+        self.image_format = image_format
+        self.dpi = dpi
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_render(self, key, render):
+        """Return cached bytes for ``key``, calling ``render()`` on a miss.
+
+        ``render`` must return a matplotlib figure; it is serialized and
+        closed here.
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        import matplotlib.pyplot as plt
+
+        fig = render()
+        try:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format=self.image_format, dpi=self.dpi)
+            data = buffer.getvalue()
+        finally:
+            plt.close(fig)
+
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,37 @@
+"""Monotonic profile id allocation."""
+
+import threading
+
+
+class IdAllocator:
+    """Thread-safe source of new profile ids.
+
+    Ids only ever increase, so an id is never handed out again after its
+    profile is deleted. ``on_allocate(next_id)`` is called with the new
+    high-water mark so callers can persist it across restarts.
+    """
+
+    def __init__(self, next_id=1, on_allocate=None):
+        self._next_id = next_id
+        self._on_allocate = on_allocate
+        self._lock = threading.Lock()
+
+    @property
+    def next_id(self):
+        return self._next_id
+
+    def allocate(self):
+        with self._lock:
+            profile_id = self._next_id
+            self._next_id += 1
+            if self._on_allocate is not None:
+                self._on_allocate(self._next_id)
+            return profile_id
+
+    def observe(self, profile_id):
+        """Make sure ids handed out later are greater than ``profile_id``."""
+        with self._lock:
+            if profile_id >= self._next_id:
+                self._next_id = profile_id + 1
+                if self._on_allocate is not None:
+                    self._on_allocate(self._next_id)
@@ -0,0 +1,311 @@
+"""Streaming bulk ingestion of consumer profiles.
+
+The pipeline is a chain of generators so only one chunk of the input is
+in memory at a time:
+
+    read_frames -> validate_frames -> writer(chunk)
+
+``read_frames`` yields raw ``DataFrame`` chunks from a CSV or Parquet
+file, ``validate_frames`` checks each chunk with vectorized rules
+(id, name, age range, location/stage/interest/pain-point vocabularies,
+income), normalizes income to a number and drops duplicate ids, and
+``ingest_profiles`` hands every clean chunk to a writer and reports
+throughput and rejected rows. ``ingest_products`` is the same pipeline for
+product catalog files (id, name, category, price, eco-friendly flag).
+"""
+
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from .schema import AGE_RANGE, ALL_CATEGORIES, PRODUCT_CATEGORIES, PRODUCT_FIELDS, PROFILE_FIELDS
+from .storage import CSV_LIST_SEPARATOR, DEFAULT_CHUNK_SIZE, LIST_FIELDS, _require_pyarrow
+from .validation import VOCABULARIES, format_income, parse_incomes
+
+DEFAULT_AVATAR = "👤"
+
+# Largest profile or product id. Numeric columns may be parsed as floats, which are exact up to
+# here; a larger id could round onto this limit and pass the check
+MAX_ID = 2 ** 53 - 1
+
+# Spellings of the eco-friendly flag accepted in product files (an empty cell means no)
+ECO_FLAGS = {"true": True, "yes": True, "y": True, "1": True, "false": False, "no": False, "n": False, "0": False,
+             "": False}
+
+# The duplicate-id bitmap (1 byte per id) may use up to this many bytes per id seen
+_DENSE_BYTES_PER_ID = 8
+
+
+class IngestReport:
+    """Counts and timing for one ingestion run."""
+
+    def __init__(self, kind="profiles"):
+        self.kind = kind
+        self.read = 0
+        self.accepted = 0
+        self.rejections = Counter()
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rejected(self):
+        return sum(self.rejections.values())
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        text = (f"Imported {self.accepted:,} of {self.read:,} {self.kind} in {self.elapsed:.1f}s "
+                f"({self.rows_per_second:,.0f} rows/s)")
+        if self.rejected:
+            text += f"; rejected {self.rejected:,}"
+        return text
+
+
+class _SeenIds:
+    """Set of ids: a bitmap (1 byte per id) while the ids are dense, plus a set for the rest.
+
+    The bitmap covers ids below its length and only doubles while it stays
+    within ``_DENSE_BYTES_PER_ID`` bytes per id seen, so memory grows with
+    the number of ids rather than with the largest one. Ids at or above
+    the bitmap's length are kept in the set.
+    """
+
+    def __init__(self):
+        self._dense = np.zeros(1024, dtype=bool)
+        self._sparse = set()
+        self._count = 0
+
+    def contains(self, ids):
+        dense = ids < len(self._dense)
+        found = np.zeros(len(ids), dtype=bool)
+        found[dense] = self._dense[ids[dense]]
+        if self._sparse:
+            found[~dense] = [i in self._sparse for i in ids[~dense].tolist()]
+        return found
+
+    def add(self, ids):
+        """Add ids that are not in the set yet."""
+        if not len(ids):
+            return
+        self._count += len(ids)
+        needed = int(ids.max()) + 1
+        size = len(self._dense)
+        while size < needed and 2 * size <= _DENSE_BYTES_PER_ID * self._count:
+            size *= 2
+        if size > len(self._dense):
+            grown = np.zeros(size, dtype=bool)
+            grown[:len(self._dense)] = self._dense
+            moved = [i for i in self._sparse if i < size]
+            grown[moved] = True
+            self._sparse.difference_update(moved)
+            self._dense = grown
+        dense = ids < size
+        self._dense[ids[dense]] = True
+        self._sparse.update(ids[~dense].tolist())
+
+
+def read_frames(source, file_format="csv", chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield raw ``DataFrame`` chunks of at most ``chunk_size`` rows.
+
+    ``source`` is a path or a binary file-like object (e.g. a Streamlit
+    upload). CSV cells are read as strings.
+    """
+    if file_format == "csv":
+        yield from pd.read_csv(source, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    elif file_format == "parquet":
+        pa = _require_pyarrow()
+        for batch in pa.parquet.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported file format: {file_format}")
+
+
+def _label_list(value):
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(CSV_LIST_SEPARATOR.strip()) if item.strip()]
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    return [str(item) for item in value]
+
+
+def _map_distinct(values, func):
+    """``values.map(func)`` evaluating ``func`` once per distinct value."""
+    inverse, uniques = pd.factorize(values, use_na_sentinel=False)
+    results = np.empty(len(uniques), dtype=object)
+    results[:] = [func(value) for value in uniques]
+    return results[inverse]
+
+
+def _label_lists(values, vocabulary):
+    """Parse a column of label lists; return ``(lists, known)`` arrays.
+
+    CSV strings are split and checked once per distinct value.
+    """
+    if pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty"):
+        lists = _map_distinct(values, _label_list)
+    else:
+        lists = values.map(_label_list).to_numpy()
+    known = _map_distinct(pd.Series(lists).map(tuple), vocabulary.issuperset).astype(bool)
+    return lists, known
+
+
+def _text(frame, field, default=""):
+    return frame[field].where(frame[field].notna(), default).astype(str).str.strip()
+
+
+def validate_frame(frame, seen):
+    """Validate one raw chunk; return ``(profiles, rejections)``.
+
+    ``seen`` tracks ids accepted from earlier chunks: the first row with an
+    id wins and later ones are rejected as duplicates. Rows are rejected
+    for the first rule they break.
+    """
+    frame = frame.reindex(columns=PROFILE_FIELDS).reset_index(drop=True)
+    reasons = pd.Series(None, index=frame.index, dtype=object)
+
+    def reject(mask, reason):
+        reasons[mask & reasons.isna()] = reason
+
+    ids = pd.to_numeric(frame["id"], errors="coerce")
+    reject(ids.isna() | (ids % 1 != 0) | ~ids.between(1, MAX_ID), "invalid id")
+    names = _text(frame, "name")
+    reject(names == "", "missing name")
+    ages = pd.to_numeric(frame["age"], errors="coerce")
+    reject(ages.isna() | (ages % 1 != 0) | ~ages.between(*AGE_RANGE), "age out of range")
+    for field in ("location", "buying_stage"):
+        values = _text(frame, field)
+        frame[field] = values
+        reject(~values.isin(VOCABULARIES[field]), f"unknown {field.replace('_', ' ')}")
+    for field in LIST_FIELDS:
+        lists, known = _label_lists(frame[field], VOCABULARIES[field])
+        frame[field] = lists
+        reject(pd.Series(~known), f"unknown {field.replace('_', ' ')}")
+    raw_income = _text(frame, "income")
+    incomes = parse_incomes(raw_income)
+    reject(pd.Series(np.isnan(incomes)) & (raw_income != ""), "invalid income")
+
+    valid = reasons.isna().to_numpy().copy()
+    ids = ids.fillna(0).to_numpy(dtype=np.int64)
+    duplicate = pd.Series(ids).duplicated().to_numpy() | seen.contains(ids)
+    reject(pd.Series(valid & duplicate), "duplicate id")
+    valid &= ~duplicate
+    seen.add(ids[valid])
+
+    rows = np.flatnonzero(valid)
+    columns = {
+        "id": ids[rows].tolist(),
+        "name": names.to_numpy()[rows].tolist(),
+        "age": ages.to_numpy()[rows].astype(np.int64).tolist(),
+        "occupation": _text(frame, "occupation").to_numpy()[rows].tolist(),
+        "income": _map_distinct(incomes[rows], format_income).tolist(),
+        "location": frame["location"].to_numpy()[rows].tolist(),
+        # Copies: parsed label lists are shared between rows with equal input
+        "interests": list(map(list, frame["interests"].to_numpy()[rows])),
+        "pain_points": list(map(list, frame["pain_points"].to_numpy()[rows])),
+        "spending_habits": _text(frame, "spending_habits").to_numpy()[rows].tolist(),
+        "avatar": _text(frame, "avatar").replace("", DEFAULT_AVATAR).to_numpy()[rows].tolist(),
+        "buying_stage": frame["buying_stage"].to_numpy()[rows].tolist(),
+    }
+    profiles = [dict(zip(PROFILE_FIELDS, values)) for values in zip(*(columns[f] for f in PROFILE_FIELDS))]
+    return profiles, Counter(reasons.dropna())
+
+
+def validate_frames(frames, report):
+    """Yield lists of valid profiles for each raw chunk, updating ``report``."""
+    seen = _SeenIds()
+    for frame in frames:
+        profiles, rejections = validate_frame(frame, seen)
+        report.read += len(frame)
+        report.rejections.update(rejections)
+        yield profiles
+
+
+def ingest_profiles(source, writer, file_format="csv", chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+    """Stream a CSV/Parquet file through validation into ``writer``.
+
+    ``writer(profiles)`` is called once per chunk with the accepted
+    profiles (e.g. to save them to the repository and the profile store).
+    ``on_progress(report)`` is called after every chunk. Returns the
+    ``IngestReport``.
+    """
+    report = IngestReport()
+    for profiles in validate_frames(read_frames(source, file_format, chunk_size), report):
+        if profiles:
+            writer(profiles)
+        report.accepted += len(profiles)
+        report.elapsed = time.perf_counter() - report.started
+        if on_progress is not None:
+            on_progress(report)
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+def validate_product_frame(frame, seen):
+    """Validate one raw chunk of a product file; return ``(products, rejections)``.
+
+    Same conventions as ``validate_frame``: the first row with an id wins
+    and rows are rejected for the first rule they break.
+    """
+    frame = frame.reindex(columns=PRODUCT_FIELDS).reset_index(drop=True)
+    reasons = pd.Series(None, index=frame.index, dtype=object)
+
+    def reject(mask, reason):
+        reasons[mask & reasons.isna()] = reason
+
+    ids = pd.to_numeric(frame["id"], errors="coerce")
+    reject(ids.isna() | (ids % 1 != 0) | ~ids.between(1, MAX_ID), "invalid id")
+    names = _text(frame, "name")
+    reject(names == "", "missing name")
+    categories = _text(frame, "category")
+    reject(~categories.isin([category for category in PRODUCT_CATEGORIES if category != ALL_CATEGORIES]),
+           "unknown category")
+    prices = pd.to_numeric(frame["price"], errors="coerce")
+    reject(prices.isna() | ~np.isfinite(prices) | (prices < 0), "invalid price")
+    eco = frame["eco_friendly"]
+    if not pd.api.types.is_bool_dtype(eco):
+        eco = _text(frame, "eco_friendly").str.lower().map(ECO_FLAGS)
+    reject(eco.isna(), "invalid eco-friendly flag")
+
+    valid = reasons.isna().to_numpy().copy()
+    ids = ids.fillna(0).to_numpy(dtype=np.int64)
+    duplicate = pd.Series(ids).duplicated().to_numpy() | seen.contains(ids)
+    reject(pd.Series(valid & duplicate), "duplicate id")
+    valid &= ~duplicate
+    seen.add(ids[valid])
+
+    rows = np.flatnonzero(valid)
+    columns = {
+        "id": ids[rows].tolist(),
+        "name": names.to_numpy()[rows].tolist(),
+        "category": categories.to_numpy()[rows].tolist(),
+        "price": prices.to_numpy(dtype=np.float64)[rows].tolist(),
+        "eco_friendly": eco.to_numpy()[rows].astype(bool).tolist(),
+    }
+    products = [dict(zip(PRODUCT_FIELDS, values)) for values in zip(*(columns[f] for f in PRODUCT_FIELDS))]
+    return products, Counter(reasons.dropna())
+
+
+def ingest_products(source, writer, file_format="csv", chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+    """Stream a CSV/Parquet product file through validation into ``writer``.
+
+    ``writer(products)`` is called once per chunk with the accepted
+    products; see ``ingest_profiles``. Returns the ``IngestReport``.
+    """
+    report = IngestReport(kind="products")
+    seen = _SeenIds()
+    for frame in read_frames(source, file_format, chunk_size):
+        products, rejections = validate_product_frame(frame, seen)
+        report.read += len(frame)
+        report.rejections.update(rejections)
+        if products:
+            writer(products)
+        report.accepted += len(products)
+        report.elapsed = time.perf_counter() - report.started
+        if on_progress is not None:
+            on_progress(report)
+    report.elapsed = time.perf_counter() - report.started
+    return report
@@ -0,0 +1,248 @@
+"""In-process job queue for advice and batch analytics.
+
+Slow work requested from the app (advice generation, segment batch
+advice) is submitted as a ``Job`` and run on a small pool of worker
+threads, so a session's script run only submits and later polls the job
+instead of blocking until the work is done. The queue is shared by every
+session of the server process:
+
+- Single-flight: a job submitted with the ``key`` of a job that is still
+  queued or running joins that job instead of running the same work
+  again, so concurrent users asking for the same advice share one result.
+- Fairness: each user has their own queue and workers take jobs from the
+  users in turn, so one user's batch of requests cannot starve the others.
+- Backpressure: a user may have at most ``max_pending_per_user`` jobs
+  queued or running, and the queue at most ``max_queued`` waiting jobs;
+  beyond that ``submit`` raises ``QueueFullError`` rather than letting the
+  backlog grow.
+
+Finished jobs are kept (the newest ``keep_finished`` of them, for at most
+``finished_ttl`` seconds) so their users can still read the result.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a user, or the whole queue, has too many jobs waiting."""
+
+
+class Job:
+    """One unit of work and its status, polled by the users who submitted it.
+
+    ``func(progress)`` does the work; ``progress(stage, fraction)`` (see
+    ``consumer_insights.progress``) updates ``stage`` and ``fraction``.
+    """
+
+    def __init__(self, job_id, kind, key, func, user, clock=time.time):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.users = [user]
+        self.status = QUEUED
+        self.stage = None
+        self.fraction = 0.0
+        self.result = None
+        self.error = None
+        self.submitted_at = clock()
+        self.started_at = None
+        self.finished_at = None
+        self._func = func
+        self._finished = threading.Event()
+
+    @property
+    def owner(self):
+        return self.users[0]
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED)
+
+    def report(self, stage, fraction):
+        self.stage = stage
+        self.fraction = fraction
+
+    def wait(self, timeout=None):
+        """Block until the job has finished or ``timeout`` seconds passed; returns ``done``."""
+        return self._finished.wait(timeout)
+
+    def to_dict(self):
+        return {"id": self.id, "kind": self.kind, "status": self.status, "stage": self.stage,
+                "fraction": self.fraction, "users": len(self.users), "submitted_at": self.submitted_at,
+                "started_at": self.started_at, "finished_at": self.finished_at, "error": self.error}
+
+
+class JobQueue:
+    """Thread pool running jobs round-robin across users, with single-flight keys.
+
+    Worker threads are started on the first submit.
+    """
+
+    def __init__(self, workers=2, max_pending_per_user=4, max_queued=256, keep_finished=1024,
+                 finished_ttl=15 * 60, clock=time.time):
+        self.workers = workers
+        self.max_pending_per_user = max_pending_per_user
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self.finished_ttl = finished_ttl
+        self.coalesced = 0
+        self.rejected = 0
+        self._clock = clock
+        self._ids = itertools.count(1)
+        self._condition = threading.Condition()
+        # user -> jobs waiting to run, users in the order they are served next
+        self._queues = OrderedDict()
+        self._queued = 0
+        self._running = 0
+        # key -> queued or running job, for single-flight
+        self._in_flight = {}
+        # user -> number of their own jobs queued or running
+        self._pending = {}
+        # id -> job, in submission order, for polling
+        self._jobs = OrderedDict()
+        self._finished = deque()
+        self._threads = []
+        self._closed = False
+
+    def submit(self, user, kind, func, key=None):
+        """Queue ``func(progress)`` for ``user`` and return its ``Job``.
+
+        If a queued or running job has the same ``key`` (``None``: never
+        shared), that job is returned instead, with ``user`` added to its
+        users. Raises ``QueueFullError`` when ``user`` already has
+        ``max_pending_per_user`` jobs pending or ``max_queued`` jobs wait.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The job queue is closed")
+            job = self._in_flight.get(key) if key is not None else None
+            if job is not None:
+                if user not in job.users:
+                    job.users.append(user)
+                self.coalesced += 1
+                return job
+            if self._pending.get(user, 0) >= self.max_pending_per_user:
+                self.rejected += 1
+                raise QueueFullError(f"You already have {self.max_pending_per_user} jobs in progress; "
+                                     f"wait for one to finish")
+            if self._queued >= self.max_queued:
+                self.rejected += 1
+                raise QueueFullError("The server is busy; try again shortly")
+
+            job = Job(next(self._ids), kind, key, func, user, clock=self._clock)
+            self._queues.setdefault(user, deque()).append(job)
+            self._queued += 1
+            self._pending[user] = self._pending.get(user, 0) + 1
+            self._jobs[job.id] = job
+            if key is not None:
+                self._in_flight[key] = job
+            self._expire()
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"insights-jobs-{len(self._threads) + 1}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._condition.notify()
+            return job
+
+    def get(self, job_id):
+        """Return the job ``job_id``; ``KeyError`` if unknown or expired."""
+        with self._condition:
+            self._expire()
+            return self._jobs[job_id]
+
+    def position(self, job):
+        """Jobs that will start before ``job`` (0 once it is running or done)."""
+        with self._condition:
+            if job.status != QUEUED:
+                return 0
+            # Workers take one job per user in turn, starting with the first user in _queues
+            owner = list(self._queues).index(job.owner)
+            place = self._queues[job.owner].index(job)
+            return sum(min(len(queue), place + (i < owner)) for i, queue in enumerate(self._queues.values()))
+
+    def stats(self):
+        with self._condition:
+            return {
+                "queued": self._queued,
+                "running": self._running,
+                "finished": len(self._finished),
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+            }
+
+    def close(self, wait=True):
+        """Stop accepting jobs; workers exit once the queued jobs have run."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+    def _next(self):
+        """Take the first job of the user served longest ago (call with the lock held)."""
+        user, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+        if queue:
+            self._queues.move_to_end(user)
+        else:
+            del self._queues[user]
+        self._queued -= 1
+        return job
+
+    def _expire(self):
+        cutoff = self._clock() - self.finished_ttl
+        while self._finished and (len(self._finished) > self.keep_finished
+                                  or self._finished[0].finished_at < cutoff):
+            del self._jobs[self._finished.popleft().id]
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queues and not self._closed:
+                    self._condition.wait()
+                if not self._queues:
+                    return
+                job = self._next()
+                job.status = RUNNING
+                job.started_at = self._clock()
+                self._running += 1
+
+            try:
+                result = job._func(job.report)
+            except Exception as error:
+                logger.exception("Job %s (%s) failed", job.id, job.kind)
+                job.error = str(error) or type(error).__name__
+                status = FAILED
+            else:
+                job.result = result
+                status = DONE
+
+            with self._condition:
+                job.status = status
+                job.finished_at = self._clock()
+                job._func = None
+                self._running -= 1
+                self._pending[job.owner] -= 1
+                if not self._pending[job.owner]:
+                    del self._pending[job.owner]
+                if self._in_flight.get(job.key) is job:
+                    del self._in_flight[job.key]
+                self._finished.append(job)
+                self._expire()
+            job._finished.set()
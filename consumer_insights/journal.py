@@ -0,0 +1,140 @@
+"""Append-only journal of profile edits.
+
+Every create, update and delete made through the shared dataset is
+recorded as a ``ProfileEdit`` holding the profile before and after the
+change. The repository writes the profile row and its journal entry in
+one transaction, so a single edit persists one row instead of rewriting
+the profile list, and the journal can never disagree with the data.
+
+Derived structures subscribe to the journal and update from each edit
+(e.g. the advice cache drops only the edited profile's advice and the
+profile store's search, sort and segment indexes apply it). Because
+every entry carries both states, an edit can be undone by journaling its
+inverse, and the profiles as they were after any retained edit can be
+rebuilt by reverting the newer edits (see ``SharedDataset.snapshot``).
+
+The newest ``max_entries`` edits are kept in memory; older ones are
+compacted away, from memory and from the repository, and can no longer
+be undone or snapshotted. Bulk imports are not journaled and compact the
+whole journal.
+"""
+
+import threading
+import time
+from collections import deque
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+
+
+class ProfileEdit:
+    """One journaled change; ``before``/``after`` are ``None`` when the profile did not exist."""
+
+    def __init__(self, seq, profile_id, before, after, created_at, undoes=None):
+        self.seq = seq
+        self.profile_id = profile_id
+        self.before = before
+        self.after = after
+        self.created_at = created_at
+        self.undoes = undoes
+
+    @property
+    def op(self):
+        if self.before is None:
+            return CREATE
+        return DELETE if self.after is None else UPDATE
+
+    def to_dict(self):
+        return {"seq": self.seq, "op": self.op, "profile_id": self.profile_id, "before": self.before,
+                "after": self.after, "created_at": self.created_at, "undoes": self.undoes}
+
+
+class EditJournal:
+    """Persisted edit journal with subscribers, undo lookup and compaction.
+
+    Thread-safe; callers serialize the edits themselves (the dataset
+    records each edit under its write lock, right after applying it to
+    the profile store).
+    """
+
+    def __init__(self, repository, max_entries=10_000, clock=time.time):
+        self.repository = repository
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._entries = deque(ProfileEdit(**record) for record in repository.recent_edits(max_entries))
+        # Edits up to and including ``horizon`` are no longer available
+        self.horizon = self._entries[0].seq - 1 if self._entries else repository.get_counter("edit_horizon", 0)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def last_seq(self):
+        with self._lock:
+            return self._entries[-1].seq if self._entries else self.horizon
+
+    def subscribe(self, callback):
+        """Call ``callback(edit)`` after every recorded edit; returns an unsubscribe function."""
+        with self._lock:
+            self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def record(self, before, after, undoes=None, apply=None):
+        """Persist an edit (profile row and journal entry) and notify subscribers.
+
+        ``apply()``, if given, makes the change in memory once it is
+        persisted and before subscribers see it; it should not fail, so
+        callers validate the change first. If persisting fails, nothing
+        is applied or recorded.
+        """
+        profile_id = (after if after is not None else before)["id"]
+        created_at = self._clock()
+        with self._lock:
+            seq = self.repository.apply_edit(profile_id, before, after, created_at, undoes)
+            if apply is not None:
+                apply()
+            edit = ProfileEdit(seq, profile_id, before, after, created_at, undoes)
+            self._entries.append(edit)
+            if len(self._entries) > 2 * self.max_entries:
+                self.compact(keep=self.max_entries)
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(edit)
+        return edit
+
+    def get(self, seq):
+        """Return the edit ``seq``; ``KeyError`` if it is unknown or was compacted."""
+        with self._lock:
+            if self._entries:
+                # Sequence numbers are consecutive unless another process wrote to the same database
+                index = seq - self._entries[0].seq
+                if 0 <= index < len(self._entries) and self._entries[index].seq == seq:
+                    return self._entries[index]
+                for edit in self._entries:
+                    if edit.seq == seq:
+                        return edit
+        raise KeyError(f"No edit {seq} in the journal")
+
+    def entries(self, since=None, limit=None):
+        """Edits after ``since`` (default: all retained), oldest first; the newest ``limit`` of them."""
+        with self._lock:
+            edits = [edit for edit in self._entries if since is None or edit.seq > since]
+        return edits[-limit:] if limit else edits
+
+    def since(self, seq):
+        """Edits after ``seq``, for rebuilding the state at ``seq``; ``ValueError`` if compacted."""
+        with self._lock:
+            if seq < self.horizon:
+                raise ValueError(f"Edits before {self.horizon + 1} were compacted")
+            return self.entries(since=seq)
+
+    def compact(self, keep=0):
+        """Drop all but the newest ``keep`` edits, in memory and in the repository."""
+        with self._lock:
+            while len(self._entries) > keep:
+                self.horizon = self._entries.popleft().seq
+            self.repository.compact_edits(self.horizon)
+            self.repository.set_counter("edit_horizon", self.horizon)
@@ -0,0 +1,338 @@
+"""Buying-stage transition events and journey analytics.
+
+Every time a profile enters, changes or leaves a buying stage, a fixed-size
+event is appended to ``StageEventStore``: time (ms), profile id, the stage
+left and the stage entered (codes into ``stages``, -1 for none) and the
+seconds spent in the stage left. Events are partitioned by UTC day; with
+a directory each day is one append-only file of packed records, loaded
+with a single ``np.fromfile`` the first time a query touches that day and
+then kept as one contiguous array per field, so a windowed query gathers
+only the fields it reads from the days it covers.
+
+Because each event carries the time spent in the stage it leaves, the
+analytics below are filters, scatters into per-profile lookup tables and
+``bincount`` passes over the events of the queried window, with no sort by
+profile or per-profile replay:
+
+- ``cohort_conversion``: of the profiles that entered a stage within a
+  window, the share that reached each later stage (optionally within a
+  horizon), per cohort period;
+- ``time_in_stage``: distribution of completed stays per stage;
+- ``transition_counts``: from-stage x to-stage counts.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .schema import BUYING_STAGES
+
+NO_STAGE = -1
+
+EVENT_DTYPE = np.dtype([
+    ("time", "<i8"),        # Unix time in milliseconds
+    ("profile_id", "<i8"),
+    ("from_stage", "i1"),   # NO_STAGE when the profile was created
+    ("to_stage", "i1"),     # NO_STAGE when the profile was deleted
+    ("dwell", "<i4"),       # seconds spent in from_stage, -1 when unknown
+])
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+_EMPTY = np.zeros(0, dtype=EVENT_DTYPE)
+
+
+class _Partition:
+    """The events of one day: an append-only file of packed records, held in memory as columns.
+
+    The file is read the first time the day is queried; in memory each field
+    is a contiguous array, so queries read only the fields they use.
+    """
+
+    def __init__(self, day, path=None):
+        self.day = day
+        self.path = path
+        self._columns = None
+        self._pending = [] if path is None or not os.path.exists(path) else None
+        self._sorted = True
+
+    def __len__(self):
+        if self._pending is None:
+            return os.path.getsize(self.path) // EVENT_DTYPE.itemsize
+        return sum(len(chunk) for chunk in self._pending) + (len(self._columns["time"]) if self._columns else 0)
+
+    def append(self, events):
+        if self.path is not None:
+            with open(self.path, "ab") as file:
+                file.write(events.tobytes())
+        if self._pending is not None:
+            last = self._last_time()
+            if last is not None and events["time"][0] < last:
+                self._sorted = False
+            self._pending.append(events)
+
+    def _last_time(self):
+        if self._pending:
+            return self._pending[-1]["time"][-1]
+        if self._columns and len(self._columns["time"]):
+            return self._columns["time"][-1]
+        return None
+
+    def columns(self):
+        """All events of the day as ``{field: array}``, ordered by time."""
+        if self._pending is None:
+            self._pending = [np.fromfile(self.path, dtype=EVENT_DTYPE)]
+            times = self._pending[0]["time"]
+            self._sorted = bool(np.all(times[1:] >= times[:-1]))
+        if self._pending or self._columns is None:
+            chunks = ([] if self._columns is None else [self._columns]) + \
+                     [{name: chunk[name] for name in EVENT_DTYPE.names} for chunk in self._pending]
+            self._columns = {name: np.concatenate([chunk[name] for chunk in chunks]) if chunks
+                             else np.zeros(0, dtype=EVENT_DTYPE[name]) for name in EVENT_DTYPE.names}
+            self._pending = []
+        if not self._sorted:
+            order = np.argsort(self._columns["time"], kind="stable")
+            self._columns = {name: column[order] for name, column in self._columns.items()}
+            self._sorted = True
+        return self._columns
+
+
+class StageEventStore:
+    """Append-only, day-partitioned store of buying-stage transition events.
+
+    Without ``directory`` the events are kept in memory only. ``version``
+    increases with every append, for cache keys. Thread-safe.
+    """
+
+    def __init__(self, directory=None, stages=BUYING_STAGES, clock=time.time):
+        self.directory = directory
+        self.stages = list(stages)
+        self.version = 0
+        self._codes = {stage: code for code, stage in enumerate(self.stages)}
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._partitions = {}
+        self._last_event = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            for name in os.listdir(directory):
+                if name.endswith(".events"):
+                    day = int(np.datetime64(name[:-len(".events")], "D").astype(np.int64))
+                    self._partitions[day] = _Partition(day, os.path.join(directory, name))
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(partition) for partition in self._partitions.values())
+
+    def code(self, stage):
+        """Stage label -> code; ``None`` -> ``NO_STAGE``; unknown labels -> ``None``."""
+        return NO_STAGE if stage is None else self._codes.get(stage)
+
+    def _partition(self, day):
+        partition = self._partitions.get(day)
+        if partition is None:
+            path = None
+            if self.directory is not None:
+                path = os.path.join(self.directory, f"{np.datetime64(int(day), 'D')}.events")
+            partition = self._partitions[day] = _Partition(day, path)
+        return partition
+
+    def _last_event_times(self):
+        # profile id -> time of its latest event, built from the stored events on first use
+        if self._last_event is None:
+            events = self.columns(fields=("time", "profile_id"))
+            ids, first = np.unique(events["profile_id"][::-1], return_index=True)
+            self._last_event = dict(zip(ids.tolist(), events["time"][::-1][first].tolist()))
+        return self._last_event
+
+    def record(self, profile_id, from_stage, to_stage, at=None):
+        """Record one transition between stage labels (``None`` for none).
+
+        Transitions to or from stages outside ``stages`` are ignored.
+        """
+        from_code, to_code = self.code(from_stage), self.code(to_stage)
+        if from_code is None or to_code is None or from_code == to_code:
+            return
+        at = self._clock() if at is None else at
+        self.append([int(at * 1000)], [profile_id], [from_code], [to_code])
+
+    def append(self, times, profile_ids, from_stages, to_stages):
+        """Record many transitions given as arrays of ms times, ids and stage codes."""
+        times = np.asarray(times, dtype=np.int64)
+        profile_ids = np.asarray(profile_ids, dtype=np.int64)
+        if not len(times):
+            return
+        # Sort plain columns rather than packed records; input already in time order needs one stable sort
+        if np.all(times[1:] >= times[:-1]):
+            by_time = None
+            by_profile = np.argsort(profile_ids, kind="stable")
+        else:
+            by_time = np.argsort(times, kind="stable")
+            by_profile = np.lexsort((times, profile_ids))
+        with self._lock:
+            last_event = self._last_event_times()
+            # Time of each profile's previous event: earlier in this batch, else already stored
+            ids, ordered = profile_ids[by_profile], times[by_profile]
+            previous = np.full(len(ids), -1, dtype=np.int64)
+            same = ids[1:] == ids[:-1]
+            previous[1:][same] = ordered[:-1][same]
+            first = np.flatnonzero(np.concatenate(([True], ~same)))
+            previous[first] = [last_event.get(profile_id, -1) for profile_id in ids[first].tolist()]
+            last = np.concatenate((~same, [True]))
+            last_event.update(zip(ids[last].tolist(), ordered[last].tolist()))
+            dwell = np.empty(len(ids), dtype=np.int64)
+            dwell[by_profile] = np.where(previous >= 0, (ordered - previous) // 1000, -1)
+
+            events = np.zeros(len(times), dtype=EVENT_DTYPE)
+            order = slice(None) if by_time is None else by_time
+            events["time"] = times[order]
+            events["profile_id"] = profile_ids[order]
+            events["from_stage"] = np.asarray(from_stages)[order]
+            events["to_stage"] = np.asarray(to_stages)[order]
+            events["dwell"] = np.where(events["from_stage"] != NO_STAGE, dwell[order], -1)
+
+            days = events["time"] // DAY_MS
+            bounds = np.flatnonzero(np.diff(days)) + 1
+            for chunk in np.split(events, bounds):
+                self._partition(int(chunk["time"][0] // DAY_MS)).append(chunk)
+            self.version += 1
+
+    def columns(self, start=None, end=None, fields=EVENT_DTYPE.names):
+        """``{field: array}`` of the events with ``start <= time < end``, ordered by time.
+
+        ``start``/``end`` are Unix seconds (``None`` is open). Only the
+        requested ``fields`` are gathered.
+        """
+        start_ms = None if start is None else int(start * 1000)
+        end_ms = None if end is None else int(end * 1000)
+        with self._lock:
+            days = sorted(day for day in self._partitions
+                          if (start_ms is None or day >= start_ms // DAY_MS)
+                          and (end_ms is None or day <= (end_ms - 1) // DAY_MS))
+            partitions = [self._partitions[day].columns() for day in days]
+        chunks = {name: [] for name in fields}
+        for columns in partitions:
+            # Only the first and last day of the window can need trimming
+            times = columns["time"]
+            low, high = 0, len(times)
+            if start_ms is not None and high and times[0] < start_ms:
+                low = np.searchsorted(times, start_ms)
+            if end_ms is not None and high and times[-1] >= end_ms:
+                high = np.searchsorted(times, end_ms)
+            for name in fields:
+                chunks[name].append(columns[name][low:high])
+        return {name: np.concatenate(chunks[name]) if chunks[name] else np.zeros(0, dtype=EVENT_DTYPE[name])
+                for name in fields}
+
+    def events(self, start=None, end=None):
+        """Events with ``start <= time < end`` as packed records (see ``columns``)."""
+        columns = self.columns(start, end)
+        events = np.zeros(len(columns["time"]), dtype=EVENT_DTYPE)
+        for name, column in columns.items():
+            events[name] = column
+        return events
+
+
+def _dense_ids(ids):
+    """Map profile ids to ``0..size-1`` for lookup tables; returns ``(codes, size)``."""
+    if not len(ids):
+        return ids, 0
+    low, high = ids.min(), ids.max()
+    if high - low < 8 * len(ids):
+        # Ids are dense in practice (autoincrement): offsetting beats sorting
+        return ids - low, int(high - low + 1)
+    unique, codes = np.unique(ids, return_inverse=True)
+    return codes, len(unique)
+
+
+def cohort_conversion(store, start, end, period_days=7, horizon_days=None, cohort_stage=None):
+    """Conversion of the cohorts that entered ``cohort_stage`` between ``start`` and ``end``.
+
+    A profile belongs to the cohort of the period (``period_days`` long,
+    counted from ``start``) in which it first entered ``cohort_stage``
+    (default: the first stage) within the window. It converts to a later
+    stage when it reaches that stage or any after it, after entering the
+    cohort and within ``horizon_days`` if given (events up to ``end`` plus
+    the horizon are considered; without a horizon, up to now). Returns a
+    DataFrame indexed by cohort start with the cohort size in
+    ``profiles`` and one conversion-rate column per later stage. Raises
+    ``ValueError`` if ``cohort_stage`` is not one of the store's stages.
+    """
+    cohort_code = 0 if cohort_stage is None else store.code(cohort_stage)
+    if cohort_code is None:
+        raise ValueError(f"Unknown cohort stage: {cohort_stage!r}")
+    later = store.stages[cohort_code + 1:]
+    events = store.columns(start, None if horizon_days is None else end + horizon_days * DAY_MS / 1000,
+                           fields=("time", "profile_id", "to_stage"))
+    start_ms, end_ms = int(start * 1000), int(end * 1000)
+    period_ms = int(period_days * DAY_MS)
+    period_count = -(-(end_ms - start_ms) // period_ms) if end_ms > start_ms else 0
+    times, to_stages = events["time"], events["to_stage"]
+    ids, size = _dense_ids(events["profile_id"])
+
+    # Time each profile first entered the cohort stage in the window (events are in time order,
+    # so scattering them in reverse leaves the first one)
+    never = np.iinfo(np.int64).max
+    entered = np.full(size, never, dtype=np.int64)
+    entries = np.flatnonzero((to_stages == cohort_code) & (times < end_ms))[::-1]
+    entered[ids[entries]] = times[entries]
+    members = np.flatnonzero(entered != never)
+    periods = (entered[members] - start_ms) // period_ms
+    sizes = np.bincount(periods, minlength=period_count)[:period_count]
+
+    # The furthest stage each member reached after entering counts for every stage up to it
+    furthest = np.full(size, cohort_code, dtype=np.int8)
+    candidates = np.flatnonzero(to_stages > cohort_code)
+    elapsed = times[candidates] - entered[ids[candidates]]
+    valid = elapsed >= 0  # also drops non-members, whose entry time is ``never``
+    if horizon_days is not None:
+        valid &= elapsed <= int(horizon_days * DAY_MS)
+    candidates = candidates[valid]
+    np.maximum.at(furthest, ids[candidates], to_stages[candidates])
+    reached = furthest[members]
+    rates = {stage: np.bincount(periods[reached >= code], minlength=period_count)[:period_count]
+             for code, stage in enumerate(store.stages) if code > cohort_code}
+
+    cohorts = pd.to_datetime(start_ms + np.arange(period_count) * period_ms, unit="ms")
+    table = pd.DataFrame({"profiles": sizes}, index=pd.Index(cohorts, name="cohort"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for stage in later:
+            table[stage] = np.where(sizes > 0, rates[stage] / sizes, np.nan)
+    return table
+
+
+def stay_durations(store, start=None, end=None):
+    """Return ``{stage: days}`` arrays of completed stays ending in the window."""
+    events = store.columns(start, end, fields=("from_stage", "dwell"))
+    known = events["dwell"] >= 0  # dwell is unknown (-1) for creations
+    stages, dwell = events["from_stage"][known], events["dwell"][known]
+    # Group by stage with one (radix) sort of the small stage codes instead of a mask per stage
+    order = np.argsort(stages, kind="stable")
+    bounds = np.searchsorted(stages[order], np.arange(len(store.stages) + 1))
+    dwell = dwell[order]
+    return {stage: dwell[bounds[code]:bounds[code + 1]] / 86400 for code, stage in enumerate(store.stages)}
+
+
+def time_in_stage(store, start=None, end=None, quantiles=(0.25, 0.5, 0.75, 0.9)):
+    """Summary of completed stays per stage (days): count, mean and quantiles."""
+    rows = {}
+    for stage, days in stay_durations(store, start, end).items():
+        row = {"stays": len(days), "mean_days": days.mean() if len(days) else np.nan}
+        values = np.quantile(days, quantiles) if len(days) else [np.nan] * len(quantiles)
+        row.update({f"p{round(q * 100)}_days": value for q, value in zip(quantiles, values)})
+        rows[stage] = row
+    return pd.DataFrame.from_dict(rows, orient="index").rename_axis("stage")
+
+
+def transition_counts(store, start=None, end=None):
+    """From-stage x to-stage event counts in the window; ``"(none)"`` marks creation and deletion."""
+    events = store.columns(start, end, fields=("from_stage", "to_stage"))
+    labels = ["(none)"] + store.stages
+    size = len(labels)
+    counts = np.bincount((events["from_stage"].astype(np.int64) + 1) * size + events["to_stage"] + 1,
+                         minlength=size * size)
+    return pd.DataFrame(counts.reshape(size, size), index=pd.Index(labels, name="from"),
+                        columns=pd.Index(labels, name="to"))
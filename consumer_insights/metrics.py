@@ -0,0 +1,166 @@
+"""Lightweight timing instrumentation for the app's hot paths.
+
+``Metrics`` keeps one fixed-bucket histogram per ``(page, stage)`` pair
+(e.g. ``("Dashboard", "chart")``) plus gauges read at export time, such as
+cache hit rates. Observing a duration is a bisect and two additions under
+a lock; when instrumentation is off, ``timer`` returns a shared no-op
+context manager so the hot paths pay nothing.
+
+Snapshots can be exported as Prometheus text exposition format or as
+JSON lines, and every observation can also be appended to a JSON lines
+log file. The file is opened by the first observation, closed by
+``close_log`` (reopened by the next observation) and at process exit.
+"""
+
+import atexit
+import bisect
+import contextlib
+import json
+import math
+import threading
+import time
+
+# Histogram bucket upper bounds in seconds (plus an implicit +Inf bucket)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_NAME = "consumer_insights_stage_seconds"
+
+NO_TIMER = contextlib.nullcontext()
+
+
+class Histogram:
+    """Counts of observed durations per bucket, plus their sum and maximum."""
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile by interpolating inside its bucket."""
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = self.bounds[i - 1] if i > 0 else 0.0
+                high = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(low + (high - low) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+
+class _Timer:
+    def __init__(self, metrics, page, stage):
+        self.metrics = metrics
+        self.page = page
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.page, self.stage, time.perf_counter() - self.started)
+
+
+class Metrics:
+    """Thread-safe registry of per-(page, stage) timing histograms.
+
+    ``gauges`` maps gauge names to zero-argument callables returning a
+    number; they are evaluated at export time. With ``log_path`` every
+    observation is also appended to that file as a JSON line.
+    """
+
+    def __init__(self, gauges=None, log_path=None, clock=time.time):
+        self.gauges = dict(gauges or {})
+        self.log_path = log_path
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._log = None
+        if log_path:
+            atexit.register(self.close_log)
+
+    def timer(self, page, stage, enabled=True):
+        """Context manager timing its block into the ``(page, stage)`` histogram."""
+        return _Timer(self, page, stage) if enabled else NO_TIMER
+
+    def observe(self, page, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get((page, stage))
+            if histogram is None:
+                histogram = self._histograms[page, stage] = Histogram()
+            histogram.observe(seconds)
+            if self.log_path:
+                if self._log is None:
+                    self._log = open(self.log_path, "a", encoding="utf-8", buffering=1)
+                self._log.write(json.dumps({"time": self._clock(), "page": page, "stage": stage,
+                                            "seconds": seconds}, ensure_ascii=False) + "\n")
+
+    def close_log(self):
+        """Flush and close the log file, if open; the next observation reopens it."""
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Return one summary dict per series, sorted by page and stage (times in ms)."""
+        with self._lock:
+            return [
+                {
+                    "page": page,
+                    "stage": stage,
+                    "count": histogram.count,
+                    "mean_ms": histogram.sum / histogram.count * 1000,
+                    "p50_ms": histogram.quantile(0.5) * 1000,
+                    "p95_ms": histogram.quantile(0.95) * 1000,
+                    "max_ms": histogram.max * 1000,
+                }
+                for (page, stage), histogram in sorted(self._histograms.items())
+            ]
+
+    def gauge_values(self):
+        return {name: float(read()) for name, read in self.gauges.items()}
+
+    def to_json_lines(self):
+        """Snapshot as JSON lines: one line per series, then one per gauge."""
+        lines = [json.dumps(series, ensure_ascii=False) for series in self.snapshot()]
+        lines += [json.dumps({"gauge": name, "value": value}) for name, value in self.gauge_values().items()]
+        return "".join(line + "\n" for line in lines)
+
+    def to_prometheus(self):
+        """Histograms and gauges in the Prometheus text exposition format."""
+        lines = [f"# HELP {METRIC_NAME} Time spent per page and stage.", f"# TYPE {METRIC_NAME} histogram"]
+        with self._lock:
+            series = sorted(self._histograms.items())
+            for (page, stage), histogram in series:
+                labels = f'page="{_escape(page)}",stage="{_escape(stage)}"'
+                cumulative = 0
+                for bound, count in zip(list(histogram.bounds) + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{METRIC_NAME}_sum{{{labels}}} {histogram.sum!r}")
+                lines.append(f"{METRIC_NAME}_count{{{labels}}} {histogram.count}")
+        for name, value in self.gauge_values().items():
+            lines += [f"# TYPE consumer_insights_{name} gauge", f"consumer_insights_{name} {value!r}"]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,223 @@
+"""Server-side search, sort and pagination over a ``ProfileStore``.
+
+The Consumer Profiles grid only builds the cards of the visible page. Name
+search uses a sorted word index (case-insensitive prefix match on any word
+of the name) and sorting uses cached argsort orders; both are built on
+first use and then follow each journaled edit with a binary search,
+instead of being rebuilt.
+"""
+
+import bisect
+import math
+
+import numpy as np
+
+SORT_FIELDS = {"Id": "id", "Name": "name", "Age": "age"}
+
+PAGE_SIZES = [6, 12, 24, 48]
+
+
+class ProfilePage:
+    """One page of profile records plus the totals needed for navigation."""
+
+    def __init__(self, records, total, page, page_count):
+        self.records = records
+        self.total = total
+        self.page = page
+        self.page_count = page_count
+
+
+# Entries added or removed since an index was built, as a fraction of its size, before it is compacted
+_COMPACT_FRACTION = 1 / 64
+_COMPACT_MIN = 1024
+
+
+def _searchsorted(keys, needles, side):
+    """``np.searchsorted`` for a list of needles, without recasting string ``keys`` for long needles."""
+    needles = np.asarray(needles, dtype=keys.dtype if not len(needles) else None)
+    if keys.dtype.kind != "U" or needles.dtype.itemsize <= keys.dtype.itemsize:
+        return np.searchsorted(keys, needles, side=side)
+    # A needle longer than every key sorts right after its prefix of key width
+    cut = needles.astype(keys.dtype)
+    positions = np.searchsorted(keys, cut, side=side)
+    long = np.char.str_len(needles) > np.char.str_len(cut)
+    positions[long] = np.searchsorted(keys, cut[long], side="right")
+    return positions
+
+
+class _SortedIndex:
+    """Sorted ``(key, value)`` pairs that take single-entry edits without copying the arrays.
+
+    Built entries stay in the sorted arrays ``keys``/``values``: removed
+    ones are only flagged dead and added ones are kept in small sorted
+    lists, until the edits reach ``_COMPACT_FRACTION`` of the entries and
+    everything is merged into new arrays.
+    """
+
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+        self.alive = np.ones(len(keys), dtype=bool)
+        self.dead = 0
+        self.added_keys = []
+        self.added_values = []
+        self._ordered = None
+
+    def _positions(self, key, value):
+        lo, = _searchsorted(self.keys, [key], "left")
+        hi, = _searchsorted(self.keys, [key], "right")
+        return lo + np.flatnonzero((self.values[lo:hi] == value) & self.alive[lo:hi])
+
+    def _added(self, key, value):
+        lo = bisect.bisect_left(self.added_keys, key)
+        hi = bisect.bisect_right(self.added_keys, key)
+        return [i for i in range(lo, hi) if self.added_values[i] == value]
+
+    def add(self, key, value):
+        i = bisect.bisect_right(self.added_keys, key)
+        self.added_keys.insert(i, key)
+        self.added_values.insert(i, value)
+        self._changed()
+
+    def remove(self, key, value):
+        positions = self._positions(key, value)
+        self.alive[positions] = False
+        self.dead += len(positions)
+        for i in reversed(self._added(key, value)):
+            del self.added_keys[i], self.added_values[i]
+        self._changed()
+
+    def relabel(self, key, value, new_value):
+        """Change the value of the entries ``(key, value)``."""
+        self.values[self._positions(key, value)] = new_value
+        for i in self._added(key, value):
+            self.added_values[i] = new_value
+        self._changed()
+
+    def _changed(self):
+        self._ordered = None
+        if len(self.added_keys) + self.dead > max(_COMPACT_MIN, len(self.keys) * _COMPACT_FRACTION):
+            added = np.asarray(self.added_keys) if self.added_keys else self.keys[:0]
+            keys = self.keys.astype(np.promote_types(self.keys.dtype, added.dtype), copy=False)
+            positions = _searchsorted(keys, added, "right")
+            alive = np.insert(self.alive, positions, True)
+            self.keys = np.insert(keys, positions, added)[alive]
+            self.values = np.insert(self.values, positions, self.added_values)[alive]
+            self.__init__(self.keys, self.values)
+
+    def ordered_values(self):
+        """All values in key order (a new array, cached until the next edit)."""
+        if self._ordered is None:
+            positions = _searchsorted(self.keys, self.added_keys, "right")
+            alive = np.insert(self.alive, positions, True)
+            self._ordered = np.insert(self.values, positions, self.added_values)[alive]
+        return self._ordered
+
+    def values_between(self, low, high):
+        """Values of the entries with ``low <= key < high``."""
+        lo, hi = _searchsorted(self.keys, [low, high], "left")
+        found = self.values[lo:hi][self.alive[lo:hi]]
+        lo = bisect.bisect_left(self.added_keys, low)
+        hi = bisect.bisect_left(self.added_keys, high)
+        return np.concatenate([found, np.array(self.added_values[lo:hi], dtype=found.dtype)])
+
+
+def _build_word_index(store):
+    words = []
+    rows = []
+    for row, name in enumerate(store.column("name")):
+        for word in str(name).lower().split():
+            words.append(word)
+            rows.append(row)
+    words = np.array(words, dtype=str)
+    rows = np.array(rows, dtype=np.int64)
+    order = np.argsort(words, kind="stable")
+    return _SortedIndex(words[order], rows[order])
+
+
+def _name_words(name):
+    return set(str(name).lower().split())
+
+
+def _update_word_index(store, index, edit, row):
+    if edit.before is not None:
+        for word in _name_words(edit.before["name"]):
+            index.remove(word, row)
+    if edit.after is None:
+        # The former last row now lives in the deleted one
+        moved = len(store)
+        if row != moved:
+            for word in _name_words(store.column("name")[row]):
+                index.relabel(word, moved, row)
+    else:
+        for word in _name_words(edit.after["name"]):
+            index.add(word, row)
+    return index
+
+
+def search_rows(store, text):
+    """Return sorted rows whose name has a word starting with every search token."""
+    index = store.cached("name_word_index", lambda: _build_word_index(store),
+                         lambda index, edit, row: _update_word_index(store, index, edit, row))
+    result = None
+    for token in text.lower().split():
+        matches = np.unique(index.values_between(token, token + "\U0010ffff"))
+        result = matches if result is None else np.intersect1d(result, matches, assume_unique=True)
+    return np.arange(len(store)) if result is None else result
+
+
+def _sort_key(field, value):
+    return str(value).lower() if field == "name" else value
+
+
+def _update_sort_order(store, field, index, edit, row):
+    if edit.before is not None:
+        index.remove(_sort_key(field, edit.before[field]), row)
+    if edit.after is None:
+        # The former last row now lives in the deleted one
+        moved = len(store)
+        if row != moved:
+            index.relabel(_sort_key(field, store.column(field)[row]), moved, row)
+    else:
+        index.add(_sort_key(field, edit.after[field]), row)
+    return index
+
+
+def sort_order(store, field):
+    """Return row indices ordered by ``field`` (ascending; stable until the first edit)."""
+    def build():
+        values = store.column(field)
+        if field == "name":
+            values = np.array([_sort_key(field, v) for v in values], dtype=str)
+        order = np.argsort(values, kind="stable")
+        return _SortedIndex(values[order], order)
+    index = store.cached(("sort_order", field), build,
+                         lambda index, edit, row: _update_sort_order(store, field, index, edit, row))
+    return index.ordered_values()
+
+
+def query_page(store, search="", locations=None, stages=None, interests=None,
+               sort_by="id", descending=False, page=1, page_size=12):
+    """Return the ``ProfilePage`` for the given filters, sort and page number.
+
+    Filtering is vectorized over the store's columns and only the records
+    of the requested page are materialized. Out-of-range page numbers are
+    clamped.
+    """
+    with store.lock:
+        mask = store.filter_mask(locations=locations, stages=stages, interests=interests)
+        if search.strip():
+            name_mask = np.zeros(len(mask), dtype=bool)
+            name_mask[search_rows(store, search)] = True
+            mask &= name_mask
+        order = sort_order(store, sort_by)
+        if descending:
+            order = order[::-1]
+        ordered = order[mask[order]]
+
+        total = len(ordered)
+        page_count = max(1, math.ceil(total / page_size))
+        page = min(max(1, page), page_count)
+        start = (page - 1) * page_size
+        records = [store.record(int(row)) for row in ordered[start:start + page_size]]
+    return ProfilePage(records, total, page, page_count)
@@ -0,0 +1,719 @@
+"""Columnar, array-backed storage for consumer profiles.
+
+Profiles are held as one NumPy array per attribute instead of a list of
+dicts. Single-valued categorical attributes (location, buying stage) are
+stored as small integer codes, multi-valued ones (interests, pain points)
+as a padded code matrix that keeps the entered order plus a 64-bit bitset
+per row for fast membership filtering.
+"""
+
+import copy
+import functools
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import ProfileAggregates
+from .schema import BUYING_STAGES, INTERESTS, LOCATIONS, PAIN_POINTS
+from .validation import parse_income, parse_incomes
+
+TEXT_FIELDS = ["name", "occupation", "income", "spending_habits", "avatar"]
+
+_BITSET_WIDTH = 64
+
+
+class ProfileConflictError(Exception):
+    """Raised when saving a profile that another session changed meanwhile."""
+
+
+def _synchronized(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class Vocabulary:
+    """Bidirectional mapping between category labels and integer codes.
+
+    Unknown labels are appended on first use so that imported data with
+    extra categories is kept rather than dropped.
+    """
+
+    def __init__(self, labels=(), limit=None):
+        self.labels = []
+        self.limit = limit
+        self._codes = {}
+        for label in labels:
+            self.code(label)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def code(self, label):
+        code = self._codes.get(label)
+        if code is None:
+            if self.limit is not None and len(self.labels) >= self.limit:
+                raise ValueError(f"Vocabulary is limited to {self.limit} labels, cannot add {label!r}")
+            code = len(self.labels)
+            self.labels.append(label)
+            self._codes[label] = code
+        return code
+
+    def codes(self, labels):
+        """Vectorized ``code`` for a sequence of labels; returns an int64 array."""
+        find = self._codes.get
+        codes = [find(label, -1) for label in labels]
+        if -1 in codes:
+            codes = [self.code(label) if code < 0 else code for label, code in zip(labels, codes)]
+        return np.array(codes, dtype=np.int64)
+
+    def find(self, label):
+        """Return the code for ``label`` or -1 without growing the vocabulary."""
+        return self._codes.get(label, -1)
+
+    def check(self, labels):
+        """Raise ``ValueError`` if ``code`` would fail for any of ``labels``."""
+        new = {label for label in labels if label not in self._codes}
+        if self.limit is not None and len(self.labels) + len(new) > self.limit:
+            raise ValueError(f"Vocabulary is limited to {self.limit} labels, cannot add {sorted(new)!r}")
+
+
+class _MultiValueColumn:
+    """Ordered multi-valued categorical column.
+
+    ``codes`` is a ``(capacity, width)`` int8 matrix padded with -1 and
+    ``bits`` holds one bit per vocabulary entry for every row.
+    """
+
+    def __init__(self, vocabulary, capacity, width=4):
+        self.vocabulary = vocabulary
+        self.codes = np.full((capacity, width), -1, dtype=np.int8)
+        self.bits = np.zeros(capacity, dtype=np.uint64)
+
+    def resize(self, capacity, size):
+        codes = np.full((capacity, self.codes.shape[1]), -1, dtype=np.int8)
+        codes[:size] = self.codes[:size]
+        bits = np.zeros(capacity, dtype=np.uint64)
+        bits[:size] = self.bits[:size]
+        self.codes, self.bits = codes, bits
+
+    def _widen(self, width):
+        codes = np.full((self.codes.shape[0], width), -1, dtype=np.int8)
+        codes[:, :self.codes.shape[1]] = self.codes
+        self.codes = codes
+
+    def set(self, row, labels):
+        labels = list(dict.fromkeys(labels))
+        if len(labels) > self.codes.shape[1]:
+            self._widen(max(len(labels), self.codes.shape[1] * 2))
+        codes = [self.vocabulary.code(label) for label in labels]
+        self.codes[row] = -1
+        self.codes[row, :len(codes)] = codes
+        bits = 0
+        for code in codes:
+            bits |= 1 << code
+        self.bits[row] = bits
+
+    def set_block(self, start, label_lists):
+        """Set consecutive rows from ``start`` to the given label lists."""
+        count = len(label_lists)
+        lengths = np.fromiter(map(len, label_lists), dtype=np.int64, count=count)
+        flat = self.vocabulary.codes([label for labels in label_lists for label in labels])
+        row_index = np.repeat(np.arange(count), lengths)
+
+        # Drop repeated labels within a row, keeping the first occurrence
+        _, first = np.unique(row_index * _BITSET_WIDTH + flat, return_index=True)
+        if len(first) < len(flat):
+            first.sort()
+            flat, row_index = flat[first], row_index[first]
+            lengths = np.bincount(row_index, minlength=count)
+
+        width = int(lengths.max(initial=0))
+        if width > self.codes.shape[1]:
+            self._widen(max(width, self.codes.shape[1] * 2))
+        rows = slice(start, start + count)
+        self.codes[rows] = -1
+        slot_index = np.arange(len(flat)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        self.codes[start + row_index, slot_index] = flat
+        bits = np.zeros(count, dtype=np.uint64)
+        np.bitwise_or.at(bits, row_index, np.left_shift(np.uint64(1), flat.astype(np.uint64)))
+        self.bits[rows] = bits
+
+    def get(self, row):
+        labels = self.vocabulary.labels
+        return [labels[code] for code in self.codes[row] if code >= 0]
+
+    def mask(self, labels):
+        """Return ``(bitmask, all_known)`` for a collection of labels."""
+        bits = 0
+        all_known = True
+        for label in labels:
+            code = self.vocabulary.find(label)
+            if code < 0:
+                all_known = False
+            else:
+                bits |= 1 << code
+        return np.uint64(bits), all_known
+
+    def counts(self, codes):
+        codes = codes[codes >= 0]
+        return np.bincount(codes, minlength=len(self.vocabulary))
+
+    def lengths(self, codes):
+        return (codes >= 0).sum(axis=1)
+
+
+class ProfileStore:
+    """Struct-of-arrays container for consumer profiles.
+
+    Rows are appended in insertion order; a delete moves the last row into
+    the freed one. ``version`` increases on every mutation and ``token`` is
+    unique per store instance, so ``(token, version)`` identifies the data
+    for cache keys. ``aggregates`` is kept up to date with a delta on every
+    mutation.
+
+    A store may be shared by many sessions: public methods hold ``lock`` (an
+    RLock, which callers may also hold to group several reads) so readers
+    never observe a half-applied mutation, and every row
+    records the store version of its last write (``revision``) so editors
+    can detect concurrent changes.
+    """
+
+    def __init__(self, capacity=1024):
+        capacity = max(int(capacity), 1)
+        self._size = 0
+        self._capacity = capacity
+        self._row_of = {}
+        self._max_id = 0
+        self.lock = threading.RLock()
+        self.token = uuid.uuid4().hex
+        self.version = 0
+
+        self.locations = Vocabulary(LOCATIONS, limit=127)
+        self.stages = Vocabulary(BUYING_STAGES, limit=127)
+        self.occupations = Vocabulary()
+
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._age = np.empty(capacity, dtype=np.int16)
+        self._location = np.empty(capacity, dtype=np.int8)
+        self._stage = np.empty(capacity, dtype=np.int8)
+        self._occupation = np.empty(capacity, dtype=np.int32)
+        self._income = np.empty(capacity, dtype=np.float64)
+        self._revision = np.empty(capacity, dtype=np.int64)
+        self._text = {field: np.empty(capacity, dtype=object) for field in TEXT_FIELDS}
+        self._interests = _MultiValueColumn(Vocabulary(INTERESTS, limit=_BITSET_WIDTH), capacity)
+        self._pain_points = _MultiValueColumn(Vocabulary(PAIN_POINTS, limit=_BITSET_WIDTH), capacity)
+        self.aggregates = ProfileAggregates()
+        # key -> (version, value, update) for the values of ``cached``
+        self._derived = {}
+        # (profile id, row) of the last single-profile mutation, None after a bulk one
+        self._last_write = None
+
+    @classmethod
+    def from_records(cls, records):
+        records = list(records)
+        store = cls(capacity=len(records) or 1024)
+        store.extend(records)
+        return store
+
+    @_synchronized
+    def copy(self):
+        """Return an independent copy of the store (new ``token``, same ``version``).
+
+        Costs one copy of the column arrays; derived caches are not copied.
+        """
+        clone = copy.copy(self)
+        clone.lock = threading.RLock()
+        clone.token = uuid.uuid4().hex
+        for name in ("_ids", "_age", "_location", "_stage", "_occupation", "_income", "_revision"):
+            setattr(clone, name, getattr(self, name).copy())
+        clone._text = {field: values.copy() for field, values in self._text.items()}
+        clone._row_of = dict(self._row_of)
+        clone.locations = copy.deepcopy(self.locations)
+        clone.stages = copy.deepcopy(self.stages)
+        clone.occupations = copy.deepcopy(self.occupations)
+        clone._interests = copy.deepcopy(self._interests)
+        clone._pain_points = copy.deepcopy(self._pain_points)
+        clone.aggregates = copy.deepcopy(self.aggregates)
+        clone._derived = {}
+        return clone
+
+    # ------------------------------------------------------------------
+    # Size and lookup
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, profile_id):
+        return profile_id in self._row_of
+
+    @property
+    @_synchronized
+    def ids(self):
+        return self._ids[:self._size].copy()
+
+    @property
+    def interests(self):
+        return self._interests.vocabulary
+
+    @property
+    def pain_points(self):
+        return self._pain_points.vocabulary
+
+    @property
+    def max_id(self):
+        """Largest id ever stored, including ids of since-deleted profiles."""
+        return self._max_id
+
+    def row_of(self, profile_id):
+        return self._row_of[profile_id]
+
+    @_synchronized
+    def name_of(self, profile_id, default=""):
+        """Return a profile's name via the id index without building a record."""
+        row = self._row_of.get(profile_id)
+        return default if row is None else self._text["name"][row]
+
+    @_synchronized
+    def revision(self, profile_id):
+        """Return the store version at which ``profile_id`` was last written."""
+        return int(self._revision[self._row_of[profile_id]])
+
+    @_synchronized
+    def get(self, profile_id, default=None):
+        row = self._row_of.get(profile_id)
+        if row is None:
+            return default
+        return self.record(row)
+
+    @_synchronized
+    def record(self, row):
+        record = {
+            "id": int(self._ids[row]),
+            "name": self._text["name"][row],
+            "age": int(self._age[row]),
+            "occupation": self._text["occupation"][row],
+            "income": self._text["income"][row],
+            "location": self.locations.labels[self._location[row]],
+            "interests": self._interests.get(row),
+            "pain_points": self._pain_points.get(row),
+            "spending_habits": self._text["spending_habits"][row],
+            "avatar": self._text["avatar"][row],
+            "buying_stage": self.stages.labels[self._stage[row]],
+        }
+        return record
+
+    def records(self, rows=None):
+        """Yield profile dicts for ``rows`` (default: all rows), one at a time.
+
+        Each record is read under the lock, but a concurrent delete between
+        two records can move the last row into a freed one.
+        """
+        if rows is None:
+            rows = range(len(self))
+        for row in rows:
+            with self.lock:
+                if row < self._size:
+                    yield self.record(int(row))
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+    def _reserve(self, size):
+        if size <= self._capacity:
+            return
+        capacity = max(size, self._capacity * 2)
+        n = self._size
+        for name in ("_ids", "_age", "_location", "_stage", "_occupation", "_income", "_revision"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:n] = old[:n]
+            setattr(self, name, new)
+        for field, old in self._text.items():
+            new = np.empty(capacity, dtype=object)
+            new[:n] = old[:n]
+            self._text[field] = new
+        self._interests.resize(capacity, n)
+        self._pain_points.resize(capacity, n)
+        self._capacity = capacity
+
+    def _write(self, row, profile):
+        self._ids[row] = profile["id"]
+        self._max_id = max(self._max_id, profile["id"])
+        self._revision[row] = self.version + 1
+        self._age[row] = profile.get("age", 0)
+        self._location[row] = self.locations.code(profile.get("location", ""))
+        self._stage[row] = self.stages.code(profile.get("buying_stage", "Awareness"))
+        for field in TEXT_FIELDS:
+            self._text[field][row] = profile.get(field, "")
+        self._occupation[row] = self.occupations.code(self._text["occupation"][row])
+        income = parse_income(self._text["income"][row])
+        self._income[row] = np.nan if income is None else income
+        self._interests.set(row, profile.get("interests", []))
+        self._pain_points.set(row, profile.get("pain_points", []))
+
+    def _write_block(self, start, profiles):
+        """Write new profiles to rows ``start:start + len(profiles)`` column by column."""
+        rows = slice(start, start + len(profiles))
+        ids = np.fromiter((profile["id"] for profile in profiles), dtype=np.int64, count=len(profiles))
+        self._ids[rows] = ids
+        self._max_id = max(self._max_id, int(ids.max()))
+        self._revision[rows] = self.version + 1
+        self._age[rows] = [profile.get("age", 0) for profile in profiles]
+        self._location[rows] = self.locations.codes([profile.get("location", "") for profile in profiles])
+        self._stage[rows] = self.stages.codes([profile.get("buying_stage", "Awareness") for profile in profiles])
+        for field in TEXT_FIELDS:
+            self._text[field][rows] = [profile.get(field, "") for profile in profiles]
+        self._occupation[rows] = self.occupations.codes(self._text["occupation"][rows])
+        self._income[rows] = parse_incomes(self._text["income"][rows])
+        self._interests.set_block(start, [profile.get("interests", []) for profile in profiles])
+        self._pain_points.set_block(start, [profile.get("pain_points", []) for profile in profiles])
+
+    def _aggregate(self, rows, sign):
+        self.aggregates.apply(self._location[rows], self._stage[rows], self._interests.codes[rows],
+                              self._pain_points.codes[rows], self._age[rows], sign)
+
+    def _touch(self, profile_id=None, row=None):
+        """Bump the version after writing or deleting ``row``, or after a bulk change.
+
+        Derived values that can follow a single-profile edit are kept for
+        ``update_derived``; the others are dropped.
+        """
+        self.version += 1
+        self._last_write = None if row is None else (profile_id, row)
+        for key, (_, _, update) in list(self._derived.items()):
+            if update is None or row is None:
+                del self._derived[key]
+
+    @_synchronized
+    def normalize(self, profile):
+        """Return ``profile`` as ``get`` would after ``upsert``, without changing the store.
+
+        Raises the errors ``upsert`` would raise for values the columns
+        cannot hold, so callers can validate an edit before persisting it.
+        """
+        record = {
+            "id": int(profile["id"]),
+            "name": profile.get("name", ""),
+            "age": int(np.int16(profile.get("age", 0))),
+            "occupation": profile.get("occupation", ""),
+            "income": profile.get("income", ""),
+            "location": profile.get("location", ""),
+            "interests": list(dict.fromkeys(profile.get("interests", []))),
+            "pain_points": list(dict.fromkeys(profile.get("pain_points", []))),
+            "spending_habits": profile.get("spending_habits", ""),
+            "avatar": profile.get("avatar", ""),
+            "buying_stage": profile.get("buying_stage", "Awareness"),
+        }
+        self.locations.check([record["location"]])
+        self.stages.check([record["buying_stage"]])
+        self._interests.vocabulary.check(record["interests"])
+        self._pain_points.vocabulary.check(record["pain_points"])
+        return record
+
+    @_synchronized
+    def upsert(self, profile, expected_revision=None):
+        """Insert a profile or replace the one with the same id; returns its row.
+
+        With ``expected_revision`` the save only succeeds if the stored
+        profile is still at that revision (or absent), otherwise
+        ``ProfileConflictError`` is raised.
+        """
+        row = self._row_of.get(profile["id"])
+        if expected_revision is not None and row is not None and self._revision[row] != expected_revision:
+            raise ProfileConflictError(f"Profile {profile['id']} was changed by someone else")
+        if row is None:
+            self._reserve(self._size + 1)
+            row = self._size
+            self._size += 1
+            self._row_of[profile["id"]] = row
+        else:
+            self._aggregate(slice(row, row + 1), -1)
+        self._write(row, profile)
+        self._aggregate(slice(row, row + 1), 1)
+        self._touch(profile["id"], row)
+        return row
+
+    @_synchronized
+    def extend(self, profiles):
+        """Bulk insert or replace profiles with a single version bump.
+
+        New profiles are written column by column in one block; profiles
+        whose id is already stored (or repeated within ``profiles``) replace
+        that row, last one wins.
+        """
+        profiles = list(profiles)
+        self._reserve(self._size + len(profiles))
+        start = self._size
+        new, updates = [], []
+        rows = {}
+        for profile in profiles:
+            if profile["id"] in self._row_of or profile["id"] in rows:
+                updates.append(profile)
+            else:
+                rows[profile["id"]] = start + len(new)
+                new.append(profile)
+        if new:
+            # Index the new rows only once they are written, so a rejected block leaves no ids behind
+            self._write_block(start, new)
+            self._row_of.update(rows)
+            self._size += len(new)
+
+        replaced = set()
+        for profile in updates:
+            row = self._row_of[profile["id"]]
+            if row < start and row not in replaced:
+                self._aggregate(slice(row, row + 1), -1)
+                replaced.add(row)
+            self._write(row, profile)
+        self._aggregate(slice(start, self._size), 1)
+        if replaced:
+            self._aggregate(np.fromiter(replaced, dtype=np.int64), 1)
+        self._touch()
+
+    @_synchronized
+    def delete(self, profile_id):
+        """Remove a profile in constant time by moving the last row into its row."""
+        row = self._row_of.pop(profile_id)
+        self._aggregate(slice(row, row + 1), -1)
+        last = self._size - 1
+        if row != last:
+            for arr in (self._ids, self._age, self._location, self._stage, self._occupation, self._income,
+                        self._revision, *self._text.values()):
+                arr[row] = arr[last]
+            for column in (self._interests, self._pain_points):
+                column.codes[row] = column.codes[last]
+                column.bits[row] = column.bits[last]
+            self._row_of[int(self._ids[row])] = row
+        self._size = last
+        self._touch(profile_id, row)
+
+    # ------------------------------------------------------------------
+    # Filtering
+    # ------------------------------------------------------------------
+    @_synchronized
+    def filter(self, locations=None, stages=None, interests=None, pain_points=None,
+               min_age=None, max_age=None, match_all=False):
+        """Return the row indices matching every given criterion.
+
+        ``interests`` and ``pain_points`` match rows having any of the given
+        labels, or all of them when ``match_all`` is set.
+        """
+        return np.flatnonzero(self.filter_mask(locations, stages, interests, pain_points,
+                                               min_age, max_age, match_all))
+
+    @_synchronized
+    def filter_mask(self, locations=None, stages=None, interests=None, pain_points=None,
+                    min_age=None, max_age=None, match_all=False):
+        """Boolean row mask for the criteria of ``filter``."""
+        n = self._size
+        mask = np.ones(n, dtype=bool)
+        if locations:
+            codes = [self.locations.find(label) for label in locations]
+            mask &= np.isin(self._location[:n], codes)
+        if stages:
+            codes = [self.stages.find(label) for label in stages]
+            mask &= np.isin(self._stage[:n], codes)
+        if min_age is not None:
+            mask &= self._age[:n] >= min_age
+        if max_age is not None:
+            mask &= self._age[:n] <= max_age
+        for column, labels in ((self._interests, interests), (self._pain_points, pain_points)):
+            if not labels:
+                continue
+            bits, all_known = column.mask(labels)
+            hits = column.bits[:n] & bits
+            if match_all:
+                mask &= (hits == bits) if all_known else False
+            else:
+                mask &= hits != 0
+        return mask
+
+    # ------------------------------------------------------------------
+    # Aggregation
+    # ------------------------------------------------------------------
+    def _select(self, arr, rows):
+        return arr[:self._size] if rows is None else arr[rows]
+
+    @_synchronized
+    def ages(self, rows=None):
+        return self._select(self._age, rows).copy()
+
+    @_synchronized
+    def age_histogram(self):
+        """Return ``(ages, counts)`` for all profiles from the running aggregates."""
+        return self.aggregates.age_histogram()
+
+    @_synchronized
+    def value_counts(self, field, rows=None, sort=True):
+        """Count profiles per label of a categorical field.
+
+        Counts over all profiles come from the running aggregates; counts
+        over a subset of ``rows`` are computed from the columns. With
+        ``sort`` the result mirrors ``pd.Series.value_counts`` (non-zero
+        labels, most frequent first); otherwise every label is returned in
+        vocabulary order.
+        """
+        labels = self.labels(field)
+        if rows is None:
+            counts = self.aggregates.counts(field, len(labels))
+        elif field == "location":
+            counts = np.bincount(self._location[rows], minlength=len(labels))
+        elif field == "buying_stage":
+            counts = np.bincount(self._stage[rows], minlength=len(labels))
+        else:
+            column = self._interests if field == "interests" else self._pain_points
+            counts = column.counts(column.codes[rows])
+        series = pd.Series(counts, index=list(labels), name="count")
+        if sort:
+            series = series[series > 0].sort_values(ascending=False, kind="stable")
+        return series
+
+    def labels(self, field):
+        """Return the vocabulary labels of a categorical field, in code order."""
+        if field == "location":
+            return self.locations.labels
+        if field == "buying_stage":
+            return self.stages.labels
+        if field == "interests":
+            return self._interests.vocabulary.labels
+        if field == "pain_points":
+            return self._pain_points.vocabulary.labels
+        if field == "occupation":
+            return self.occupations.labels
+        raise KeyError(f"No categorical field named {field!r}")
+
+    @_synchronized
+    def column(self, field):
+        """Return a read-only view of a scalar column for the current rows.
+
+        Besides the text fields, ``id``, ``age`` and ``revision`` there is
+        ``income_value``, the income parsed to a number (NaN when unknown).
+        Views are only valid until the next mutation; hold ``lock`` while
+        using them on a shared store.
+        """
+        n = self._size
+        if field in self._text:
+            array = self._text[field][:n]
+        else:
+            array = {"id": self._ids, "age": self._age, "income_value": self._income,
+                     "revision": self._revision}[field][:n]
+        return self._read_only(array)
+
+    @staticmethod
+    def _read_only(array):
+        array = array.view()
+        array.flags.writeable = False
+        return array
+
+    @_synchronized
+    def codes(self, field):
+        """Return a read-only view of a categorical field's integer codes.
+
+        Single-valued fields (location, buying stage, occupation) give one
+        code per row; multi-valued fields (interests, pain points) give the
+        padded ``(rows, width)`` code matrix with -1 for empty slots. Codes
+        index ``labels(field)``. Occupation labels are never removed, so
+        some may have no rows.
+        """
+        n = self._size
+        single = {"location": self._location, "buying_stage": self._stage, "occupation": self._occupation}
+        if field in single:
+            return self._read_only(single[field][:n])
+        if field in ("interests", "pain_points"):
+            return self._read_only(self._multi_value(field).codes[:n])
+        raise KeyError(f"No categorical field named {field!r}")
+
+    @_synchronized
+    def bitsets(self, field):
+        """Return a read-only view of a multi-valued field's per-row bitsets.
+
+        Bit ``i`` is set when the row has the label with code ``i``.
+        """
+        return self._read_only(self._multi_value(field).bits[:self._size])
+
+    def _multi_value(self, field):
+        if field == "interests":
+            return self._interests
+        if field == "pain_points":
+            return self._pain_points
+        raise KeyError(f"No multi-valued field named {field!r}")
+
+    @_synchronized
+    def cached(self, key, build, update=None):
+        """Return ``build()`` memoized until the data changes.
+
+        Used for derived indexes (sort orders, search indexes, frames) that
+        are cheap to keep while the data is unchanged. With ``update`` the
+        value follows single-profile edits instead of being rebuilt:
+        ``update_derived`` calls ``update(value, edit, row)`` after each
+        journaled edit (see ``consumer_insights.journal``), which returns
+        the value updated for it, or ``None`` to rebuild on next use. Store
+        ``row`` was written for a create or update (a create appends the
+        last row) and, for a delete, freed and filled with the former last
+        row (unless it was the last row).
+        """
+        entry = self._derived.get(key)
+        if entry is not None and entry[0] == self.version:
+            return entry[1]
+        value = build()
+        self._derived[key] = (self.version, value, update)
+        return value
+
+    @_synchronized
+    def update_derived(self, edit):
+        """Apply ``edit``, the mutation just made to this store, to the cached values.
+
+        Values that were not up to date before the edit are dropped.
+        """
+        if self._last_write is None or self._last_write[0] != edit.profile_id:
+            return
+        row = self._last_write[1]
+        for key, (version, value, update) in list(self._derived.items()):
+            if version == self.version:
+                continue
+            if version == self.version - 1:
+                value = update(value, edit, row)
+                if value is not None:
+                    self._derived[key] = (self.version, value, update)
+                    continue
+            del self._derived[key]
+
+    def frame(self):
+        """Per-profile summary DataFrame with one row per profile.
+
+        Built directly from the column arrays and cached. Journaled edits of
+        existing profiles update their row in place, so hold ``lock`` while
+        reading the frame of a shared store.
+        """
+        return self.cached("frame", self._build_frame, self._update_frame)
+
+    def _build_frame(self):
+        n = self._size
+        return pd.DataFrame({
+            "id": self._ids[:n],
+            "name": self._text["name"][:n],
+            "age": self._age[:n],
+            "location": pd.Categorical.from_codes(self._location[:n], categories=self.locations.labels),
+            "buying_stage": pd.Categorical.from_codes(self._stage[:n], categories=self.stages.labels),
+            "interests_count": self._interests.lengths(self._interests.codes[:n]),
+            "pain_points_count": self._pain_points.lengths(self._pain_points.codes[:n]),
+        })
+
+    def _update_frame(self, frame, edit, row):
+        # Adding or removing a row copies the whole frame, so only updates are applied
+        if edit.before is None or edit.after is None:
+            return None
+        values = self.record(row)
+        for name in ("location", "buying_stage"):
+            if values[name] not in frame[name].cat.categories:
+                return None
+        for name in ("id", "name", "age", "location", "buying_stage"):
+            frame.at[row, name] = values[name]
+        frame.at[row, "interests_count"] = len(values["interests"])
+        frame.at[row, "pain_points_count"] = len(values["pain_points"])
+        return frame
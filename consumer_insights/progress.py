@@ -0,0 +1,22 @@
+"""Progress reporting for advice generation.
+
+A progress callback has the signature ``callback(stage, fraction)`` where
+``stage`` names the pipeline stage that just finished (``"filtering"``,
+``"ranking"`` or ``"rendering"``) and ``fraction`` is the overall share of
+work completed, between 0 and 1. Both the single-profile and the batch
+paths report through it, so the UI only moves when real work is done.
+"""
+
+ADVICE_STAGES = ("filtering", "ranking", "rendering")
+
+
+class StageProgress:
+    """Reports completion of a fixed sequence of stages to an optional callback."""
+
+    def __init__(self, callback, stages=ADVICE_STAGES):
+        self.callback = callback
+        self.stages = list(stages)
+
+    def done(self, stage):
+        if self.callback is not None:
+            self.callback(stage, (self.stages.index(stage) + 1) / len(self.stages))
@@ -0,0 +1,84 @@
+"""Indexed product recommendations.
+
+Queries run against the sorted indexes of a ``ProductCatalog``
+(``consumer_insights.catalog``): per category and for eco-friendly
+products, each in catalog order and by price. A query only touches the
+heads of the few indexes it merges instead of scanning or sorting
+products, and since the catalog keeps its indexes up to date
+incrementally, the engine never needs rebuilding when products change.
+"""
+
+import heapq
+
+SUSTAINABLE_INTEREST = "Sustainable products"
+
+
+class RecommendationEngine:
+    """Answers top-k product queries for a consumer profile."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def __len__(self):
+        return len(self.catalog)
+
+    @property
+    def categories(self):
+        return self.catalog.categories
+
+    @staticmethod
+    def _stream(rows, prices, by_price):
+        for i in range(len(rows)):
+            yield (prices[i], rows[i]) if by_price else (rows[i],)
+
+    def candidate_lists(self, interests, category=None):
+        """Return the ``(category_code, eco_only)`` posting keys a query merges.
+
+        A product matches when it is in the requested category (if any) and
+        either its category is one of the consumer's interests or it is
+        eco-friendly and the consumer is interested in sustainable products.
+        """
+        wants_eco = SUSTAINABLE_INTEREST in interests
+        if category is not None:
+            code = self.categories.find(category)
+            if code < 0:
+                return []
+            if category in interests:
+                return [(code, False)]
+            return [(code, True)] if wants_eco else []
+        keys = [(code, False) for code in {self.categories.find(i) for i in interests} if code >= 0]
+        if wants_eco:
+            keys.append((None, True))
+        return keys
+
+    def rank(self, candidate_lists, price_sensitive=False, k=3):
+        """Merge the given posting lists and return the first ``k`` distinct catalog rows.
+
+        Results are ordered by price (ties in catalog order) for
+        price-sensitive consumers and by catalog order otherwise. Rows are
+        only meaningful until the catalog changes; hold ``catalog.lock``
+        to read their records consistently.
+        """
+        with self.catalog.lock:
+            streams = [self._stream(*self.catalog.sorted_rows(code, eco, price_sensitive), price_sensitive)
+                       for code, eco in candidate_lists]
+        seen = set()
+        result = []
+        for item in heapq.merge(*streams):
+            row = int(item[-1])
+            if row in seen:
+                continue
+            seen.add(row)
+            result.append(row)
+            if len(result) == k:
+                break
+        return result
+
+    def recommend_rows(self, interests, category=None, price_sensitive=False, k=3):
+        """Return up to ``k`` matching catalog rows; see ``rank`` for ordering."""
+        return self.rank(self.candidate_lists(interests, category), price_sensitive, k)
+
+    def recommend(self, interests, category=None, price_sensitive=False, k=3):
+        """Return up to ``k`` matching product dicts; see ``recommend_rows``."""
+        with self.catalog.lock:
+            return self.catalog.records(self.recommend_rows(interests, category, price_sensitive, k))
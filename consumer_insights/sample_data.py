@@ -0,0 +1,52 @@
+"""Example personas and products the app starts with on an empty database."""
+
+SAMPLE_PROFILES = [
+    {
+        "id": 1,
+        "name": "Emily Chen",
+        "age": 28,
+        "occupation": "Marketing Manager",
+        "income": "$75,000",
+        "location": "Urban",
+        "interests": ["Fitness", "Sustainable products", "Travel"],
+        "pain_points": ["Lack of time", "Price sensitivity", "Wants eco-friendly options"],
+        "spending_habits": "Prefers quality over quantity, researches before purchasing",
+        "avatar": "👩‍💼",
+        "buying_stage": "Consideration"
+    },
+    {
+        "id": 2,
+        "name": "James Wilson",
+        "age": 42,
+        "occupation": "IT Professional",
+        "income": "$95,000",
+        "location": "Suburban",
+        "interests": ["Technology", "Home improvement", "Gaming"],
+        "pain_points": ["Feature complexity", "Technical support", "Value for money"],
+        "spending_habits": "Early adopter, willing to pay premium for latest tech",
+        "avatar": "👨‍💻",
+        "buying_stage": "Awareness"
+    },
+    {
+        "id": 3,
+        "name": "Maria Rodriguez",
+        "age": 35,
+        "occupation": "Healthcare Worker",
+        "income": "$62,000",
+        "location": "Urban",
+        "interests": ["Cooking", "Family activities", "Health & wellness"],
+        "pain_points": ["Limited free time", "Product reliability", "Family budget constraints"],
+        "spending_habits": "Practical buyer, looks for deals and family-oriented products",
+        "avatar": "👩‍⚕️",
+        "buying_stage": "Decision"
+    }
+]
+
+SAMPLE_PRODUCTS = [
+    {"id": 1, "name": "Premium Fitness Tracker", "category": "Fitness", "price": 129.99, "eco_friendly": True},
+    {"id": 2, "name": "Smart Home Hub", "category": "Technology", "price": 199.99, "eco_friendly": False},
+    {"id": 3, "name": "Organic Meal Kit Subscription", "category": "Cooking", "price": 12.99, "eco_friendly": True},
+    {"id": 4, "name": "Professional Laptop", "category": "Technology", "price": 1299.99, "eco_friendly": False},
+    {"id": 5, "name": "Eco-Friendly Water Bottle", "category": "Sustainable products", "price": 24.99, "eco_friendly": True},
+    {"id": 6, "name": "Family Board Game Set", "category": "Family activities", "price": 34.99, "eco_friendly": True}
+]
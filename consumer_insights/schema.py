@@ -0,0 +1,39 @@
+"""Shared vocabularies for consumer profiles and advice options."""
+
+LOCATIONS = ["Urban", "Suburban", "Rural"]
+
+BUYING_STAGES = ["Awareness", "Consideration", "Decision"]
+
+INTERESTS = [
+    "Fitness", "Technology", "Cooking", "Travel", "Family activities", "Gaming",
+    "Reading", "Music", "Sustainable products", "Health & wellness", "Home improvement",
+]
+
+PAIN_POINTS = [
+    "Lack of time", "Price sensitivity", "Feature complexity", "Technical support",
+    "Product reliability", "Family budget constraints", "Value for money",
+    "Wants eco-friendly options", "Limited free time",
+]
+
+# Ages accepted by the profile editor and by bulk imports
+AGE_RANGE = (18, 100)
+
+AVATARS = ["👤", "👩‍💼", "👨‍💼", "👩‍⚕️", "👨‍⚕️", "👩‍🏫", "👨‍🏫", "👩‍💻", "👨‍💻", "👩‍🍳", "👨‍🍳"]
+
+PROFILE_FIELDS = [
+    "id", "name", "age", "occupation", "income", "location", "interests",
+    "pain_points", "spending_habits", "avatar", "buying_stage",
+]
+
+PRODUCT_FIELDS = ["id", "name", "category", "price", "eco_friendly"]
+
+ADVICE_TYPES = [
+    "Product Recommendations", "Marketing Messaging", "Pricing Strategy",
+    "Customer Experience", "Feature Prioritization",
+]
+
+ALL_CATEGORIES = "All Categories"
+
+PRODUCT_CATEGORIES = [
+    ALL_CATEGORIES, "Fitness", "Technology", "Cooking", "Family activities", "Sustainable products",
+]
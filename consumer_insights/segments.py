@@ -0,0 +1,199 @@
+"""Vectorized segment analytics over a ``ProfileStore``.
+
+Profiles are grouped by a segment dimension (age band, location,
+occupation or buying stage) and counted against another categorical
+field with a single ``np.bincount`` over combined codes, so every table
+is one pass over the column arrays regardless of the number of segments.
+
+Multi-valued fields (interests, pain points) are counted through their
+per-row bitsets: rows are first counted per (segment, label combination)
+and the combination counts are then expanded to per-label counts with a
+small matrix product, which avoids touching every label of every row.
+
+Cached reports follow journaled edits: each edit subtracts the profile's
+old counts and adds its new ones.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import MAX_AGE
+
+AGE_BAND_EDGES = [25, 35, 45, 55, 65]
+AGE_BANDS = ["Under 25", "25-34", "35-44", "45-54", "55-64", "65+"]
+
+# Age -> band code for every representable age
+_AGE_BAND_OF = np.searchsorted(AGE_BAND_EDGES, np.arange(MAX_AGE + 1), side="right")
+
+# Segment dimensions offered on the Insights page
+SEGMENT_FIELDS = {
+    "Age Band": "age_band",
+    "Location": "location",
+    "Occupation": "occupation",
+    "Buying Stage": "buying_stage",
+}
+
+MULTI_VALUED_FIELDS = ("interests", "pain_points")
+
+# Largest (segments x label combinations) table counted in one bincount
+_COMBINATION_LIMIT = 1 << 22
+
+
+def segment_codes(store, field):
+    """Return ``(codes, labels)`` assigning every row to one segment of ``field``."""
+    if field == "age_band":
+        return _AGE_BAND_OF[np.clip(store.column("age"), 0, MAX_AGE)], AGE_BANDS
+    return store.codes(field).astype(np.intp), list(store.labels(field))
+
+
+def _select(values, rows):
+    return values if rows is None else values[rows]
+
+
+def _combination_labels(size):
+    """``(2**size, size)`` matrix: row ``b`` flags the labels set in bitset ``b``."""
+    return (np.arange(1 << size)[:, None] >> np.arange(size)) & 1
+
+
+def _multi_value_counts(store, field, segments, segment_count, rows):
+    labels = list(store.labels(field))
+    size = len(labels)
+    if segment_count << size <= _COMBINATION_LIMIT:
+        bits = _select(store.bitsets(field), rows).astype(np.intp)
+        combined = (segments << size) | bits
+        counts = np.bincount(combined, minlength=segment_count << size).reshape(segment_count, 1 << size)
+        return counts @ _combination_labels(size), labels
+
+    # Too many segments or labels for a combination table: count per code slot
+    codes = _select(store.codes(field), rows)
+    counts = np.zeros(segment_count * size, dtype=np.int64)
+    for slot in range(codes.shape[1]):
+        values = codes[:, slot]
+        present = values >= 0
+        counts += np.bincount(segments[present] * size + values[present], minlength=segment_count * size)
+    return counts.reshape(segment_count, size), labels
+
+
+def cross_tab(store, segment_field, field, rows=None):
+    """Count profiles per ``segment_field`` segment and ``field`` label.
+
+    ``field`` may be single- or multi-valued; a profile with several
+    interests is counted once under each of them. ``rows`` restricts the
+    table to a subset of rows. Returns a DataFrame indexed by segment with
+    one column per label; segments without profiles are omitted.
+    """
+    with store.lock:
+        segments, segment_labels = segment_codes(store, segment_field)
+        segments = _select(segments, rows)
+        segment_count = len(segment_labels)
+        if field in MULTI_VALUED_FIELDS:
+            counts, labels = _multi_value_counts(store, field, segments, segment_count, rows)
+        else:
+            values, labels = segment_codes(store, field)
+            combined = segments * len(labels) + _select(values, rows)
+            counts = np.bincount(combined, minlength=segment_count * len(labels))
+            counts = counts.reshape(segment_count, len(labels))
+        sizes = np.bincount(segments, minlength=segment_count)
+    table = pd.DataFrame(counts, index=pd.Index(segment_labels, name=segment_field), columns=labels)
+    return table[sizes > 0]
+
+
+def co_occurrence(store, field="pain_points", rows=None):
+    """Return a label × label matrix counting profiles that share both labels.
+
+    The diagonal holds the number of profiles with each label.
+    """
+    with store.lock:
+        labels = list(store.labels(field))
+        size = len(labels)
+        if 1 << size <= _COMBINATION_LIMIT:
+            bits = _select(store.bitsets(field), rows).astype(np.intp)
+            combinations = np.bincount(bits, minlength=1 << size)
+            flags = _combination_labels(size)
+            counts = flags.T @ (combinations[:, None] * flags)
+        else:
+            codes = _select(store.codes(field), rows)
+            flags = np.zeros((len(codes), size), dtype=np.float32)
+            present = codes >= 0
+            flags[np.nonzero(present)[0], codes[present]] = 1.0
+            counts = (flags.T @ flags).round().astype(np.int64)
+    return pd.DataFrame(counts, index=labels, columns=labels)
+
+
+def stage_funnel(store, segment_field, rows=None):
+    """Return profile counts per segment (rows) and buying stage (columns)."""
+    return cross_tab(store, segment_field, "buying_stage", rows)
+
+
+def conversion_rates(funnel):
+    """Return stage-to-stage conversion rates for a ``stage_funnel`` table.
+
+    Each column ``"A → B"`` is the count at stage B divided by the count at
+    the preceding stage A, as in the journey funnel chart; segments without
+    profiles at stage A get NaN.
+    """
+    counts = funnel.to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(counts[:, :-1] > 0, counts[:, 1:] / counts[:, :-1], np.nan)
+    columns = [f"{a} → {b}" for a, b in zip(funnel.columns[:-1], funnel.columns[1:])]
+    return pd.DataFrame(rates, index=funnel.index, columns=columns)
+
+
+def segment_report(store, segment_field, rows=None):
+    """Compute every segment table for ``segment_field`` in one call.
+
+    Returns a dict with ``funnel``, ``conversion``, ``interests`` and
+    ``pain_points`` (cross-tabs by segment) and ``pain_point_pairs``
+    (pain-point co-occurrence). Without ``rows`` the report is cached on
+    the store and updated by each journaled edit.
+    """
+    def build():
+        funnel = stage_funnel(store, segment_field, rows)
+        return {
+            "funnel": funnel,
+            "conversion": conversion_rates(funnel),
+            "interests": cross_tab(store, segment_field, "interests", rows),
+            "pain_points": cross_tab(store, segment_field, "pain_points", rows),
+            "pain_point_pairs": co_occurrence(store, "pain_points", rows),
+        }
+    if rows is not None:
+        return build()
+    return store.cached(("segment_report", segment_field), build,
+                        lambda report, edit, row: _update_report(segment_field, report, edit))
+
+
+def _segment_label(field, profile):
+    if field == "age_band":
+        return AGE_BANDS[_AGE_BAND_OF[min(max(profile["age"], 0), MAX_AGE)]]
+    return profile[field]
+
+
+def _update_report(segment_field, report, edit):
+    """Move one edited profile's counts in ``report``; ``None`` when a segment or label appears."""
+    names = ("funnel", "interests", "pain_points", "pain_point_pairs")
+    counts = {name: report[name].to_numpy(copy=True) for name in names}
+    for profile, sign in ((edit.before, -1), (edit.after, 1)):
+        if profile is None:
+            continue
+        segment = _segment_label(segment_field, profile)
+        cells = [("funnel", segment, [profile["buying_stage"]]),
+                 ("interests", segment, profile["interests"]),
+                 ("pain_points", segment, profile["pain_points"])]
+        cells += [("pain_point_pairs", label, profile["pain_points"]) for label in profile["pain_points"]]
+        for name, index, columns in cells:
+            table = report[name]
+            row = table.index.get_indexer([index])[0]
+            columns = table.columns.get_indexer(columns)
+            if row < 0 or (columns < 0).any():
+                return None
+            counts[name][row, columns] += sign
+
+    # Segments left without profiles are omitted, as in a rebuilt report
+    present = counts["funnel"].sum(axis=1) > 0
+    tables = {name: pd.DataFrame(counts[name], index=report[name].index, columns=report[name].columns)
+              for name in names}
+    if not present.all():
+        for name in ("funnel", "interests", "pain_points"):
+            tables[name] = tables[name][present]
+    tables["conversion"] = conversion_rates(tables["funnel"])
+    return tables
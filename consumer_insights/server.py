@@ -0,0 +1,406 @@
+"""Local HTTP/JSON API over ``InsightsEngine``.
+
+A small HTTP/1.1 server on ``asyncio`` streams (standard library only,
+keep-alive connections, ``Content-Length`` bodies). Requests are parsed on
+the event loop and the engine calls run on a thread pool, so a slow
+analytics query does not hold up other connections.
+
+    python -m consumer_insights.server --db consumer_insights.db --port 8765
+
+Routes (all responses are JSON; errors are ``{"error": message}``)::
+
+    GET  /health                       profile count, data version, cache stats
+    GET  /profiles                     ?search=&location=&stage=&interest=&sort=&descending=&page=&page_size=
+    GET  /profiles/{id}
+    GET  /profiles/{id}/similar        ?k=&approximate=
+    GET  /edits                        ?since=&limit=  journaled profile edits, oldest first
+    GET  /products                     ?category=&min_price=&max_price=&eco=&limit=  cheapest first
+    GET  /products/{id}
+    POST /advice                       {"profile_id" or "profile", "advice_type", "category"}
+    POST /advice/batch                 {"profile_ids", "advice_types", "category"}
+    GET  /analytics/counts/{field}     location, buying_stage, interests, pain_points
+    GET  /analytics/ages
+    GET  /analytics/segments/{field}   age_band, location, occupation, buying_stage
+    GET  /analytics/journeys/cohorts   ?days=&period=&horizon=  cohort conversion rates
+    GET  /analytics/journeys/stays     ?days=  time-in-stage summary
+    GET  /analytics/journeys/transitions  ?days=
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from .advice import SUPPORTED_ADVICE_TYPES
+from .engine import InsightsEngine
+from .profile_query import ProfilePage
+from .schema import ALL_CATEGORIES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Largest accepted request body and page of profiles
+MAX_BODY_SIZE = 8 * 1024 * 1024
+MAX_PAGE_SIZE = 500
+MAX_SIMILAR = 100
+
+logger = logging.getLogger(__name__)
+
+
+class _BadRequest(Exception):
+    pass
+
+
+# ----------------------------------------------------------------------
+# JSON encoding
+# ----------------------------------------------------------------------
+def _table(frame):
+    """``DataFrame`` -> ``{"index", "columns", "data"}`` with NaN as null."""
+    values = frame.astype(object).where(frame.notna(), None)
+    return {"index": frame.index.tolist(), "columns": frame.columns.tolist(), "data": values.values.tolist()}
+
+
+def _encode(value):
+    if isinstance(value, pd.DataFrame):
+        return _table(value)
+    if isinstance(value, pd.Series):
+        return value.to_dict()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, ProfilePage):
+        return {"profiles": value.records, "total": value.total,
+                "page": value.page, "page_count": value.page_count}
+    raise TypeError(f"Cannot encode {type(value).__name__} as JSON")
+
+
+def encode_json(payload):
+    return json.dumps(payload, default=_encode, ensure_ascii=False, allow_nan=False).encode("utf-8")
+
+
+# ----------------------------------------------------------------------
+# Request parameters
+# ----------------------------------------------------------------------
+def _integer(value, name, low=None, high=None):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer") from None
+    if (low is not None and number < low) or (high is not None and number > high):
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return number
+
+
+def _number(value, name, low=None):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number") from None
+    if number != number or (low is not None and number < low):
+        raise ValueError(f"{name} must be at least {low}")
+    return number
+
+
+def _flag(query, name):
+    return query.get(name, ["false"])[-1].lower() in ("1", "true", "yes")
+
+
+def _first(query, name, default):
+    return query.get(name, [default])[-1]
+
+
+def _object(body):
+    if not isinstance(body, dict):
+        raise ValueError("Request body must be a JSON object")
+    return body
+
+
+# ----------------------------------------------------------------------
+# Handlers: (engine, path parameters, query, body) -> JSON-encodable result
+# ----------------------------------------------------------------------
+def _health(engine, params, query, body):
+    return engine.status()
+
+
+def _list_profiles(engine, params, query, body):
+    return engine.query_profiles(
+        search=_first(query, "search", ""),
+        locations=query.get("location"),
+        stages=query.get("stage"),
+        interests=query.get("interest"),
+        sort_by=_first(query, "sort", "id"),
+        descending=_flag(query, "descending"),
+        page=_integer(_first(query, "page", 1), "page", 1),
+        page_size=_integer(_first(query, "page_size", 12), "page_size", 1, MAX_PAGE_SIZE),
+    )
+
+
+def _get_profile(engine, params, query, body):
+    return engine.get_profile(int(params["id"]))
+
+
+def _similar_profiles(engine, params, query, body):
+    matches = engine.similar_profiles(
+        int(params["id"]),
+        k=_integer(_first(query, "k", 5), "k", 1, MAX_SIMILAR),
+        approximate=_flag(query, "approximate"),
+    )
+    return [{"profile": record, "similarity": similarity} for record, similarity in matches]
+
+
+def _edits(engine, params, query, body):
+    since = _first(query, "since", None)
+    edits = engine.edits(
+        since=None if since is None else _integer(since, "since"),
+        limit=_integer(_first(query, "limit", 100), "limit", 1, MAX_PAGE_SIZE),
+    )
+    return [edit.to_dict() for edit in edits]
+
+
+def _list_products(engine, params, query, body):
+    min_price, max_price = _first(query, "min_price", None), _first(query, "max_price", None)
+    return engine.products(
+        category=_first(query, "category", ALL_CATEGORIES),
+        min_price=None if min_price is None else _number(min_price, "min_price", 0),
+        max_price=None if max_price is None else _number(max_price, "max_price", 0),
+        eco_only=_flag(query, "eco"),
+        limit=_integer(_first(query, "limit", 100), "limit", 1, MAX_PAGE_SIZE),
+    )
+
+
+def _get_product(engine, params, query, body):
+    return engine.get_product(int(params["id"]))
+
+
+def _advice(engine, params, query, body):
+    body = _object(body)
+    if "profile" in body:
+        profile = _object(body["profile"])
+    else:
+        profile = _integer(body.get("profile_id"), "profile_id")
+    return engine.advise(profile, body.get("advice_type"), body.get("category", ALL_CATEGORIES))
+
+
+def _batch_advice(engine, params, query, body):
+    body = _object(body)
+    profile_ids = body.get("profile_ids")
+    if not isinstance(profile_ids, list):
+        raise ValueError("profile_ids must be a list")
+    return engine.advise_batch(
+        [_integer(profile_id, "profile_ids") for profile_id in profile_ids],
+        body.get("advice_types", SUPPORTED_ADVICE_TYPES),
+        body.get("category", ALL_CATEGORIES),
+    )
+
+
+def _value_counts(engine, params, query, body):
+    return engine.value_counts(params["field"])
+
+
+def _age_histogram(engine, params, query, body):
+    ages, counts = engine.age_histogram()
+    return {"ages": ages, "counts": counts}
+
+
+def _segment_report(engine, params, query, body):
+    return engine.segment_report(params["field"])
+
+
+def _journey_cohorts(engine, params, query, body):
+    horizon = _first(query, "horizon", None)
+    return engine.cohort_conversion(
+        days=_integer(_first(query, "days", 90), "days", 1),
+        period_days=_integer(_first(query, "period", 7), "period", 1),
+        horizon_days=None if horizon is None else _integer(horizon, "horizon", 1),
+    )
+
+
+def _journey_stays(engine, params, query, body):
+    return engine.time_in_stage(days=_integer(_first(query, "days", 90), "days", 1))
+
+
+def _journey_transitions(engine, params, query, body):
+    return engine.transition_counts(days=_integer(_first(query, "days", 90), "days", 1))
+
+
+ROUTES = [
+    ("GET", r"/health", _health),
+    ("GET", r"/profiles", _list_profiles),
+    ("GET", r"/profiles/(?P<id>\d+)", _get_profile),
+    ("GET", r"/profiles/(?P<id>\d+)/similar", _similar_profiles),
+    ("GET", r"/edits", _edits),
+    ("GET", r"/products", _list_products),
+    ("GET", r"/products/(?P<id>\d+)", _get_product),
+    ("POST", r"/advice", _advice),
+    ("POST", r"/advice/batch", _batch_advice),
+    ("GET", r"/analytics/counts/(?P<field>\w+)", _value_counts),
+    ("GET", r"/analytics/ages", _age_histogram),
+    ("GET", r"/analytics/segments/(?P<field>\w+)", _segment_report),
+    ("GET", r"/analytics/journeys/cohorts", _journey_cohorts),
+    ("GET", r"/analytics/journeys/stays", _journey_stays),
+    ("GET", r"/analytics/journeys/transitions", _journey_transitions),
+]
+
+_COMPILED_ROUTES = [(method, re.compile(pattern + "/?"), handler) for method, pattern, handler in ROUTES]
+
+
+def _route(method, path):
+    """Return ``(handler, params)``; raise ``LookupError`` with the HTTP status if none matches."""
+    allowed = False
+    for route_method, pattern, handler in _COMPILED_ROUTES:
+        match = pattern.fullmatch(path)
+        if match:
+            if route_method == method:
+                return handler, match.groupdict()
+            allowed = True
+    raise LookupError(HTTPStatus.METHOD_NOT_ALLOWED if allowed else HTTPStatus.NOT_FOUND)
+
+
+# ----------------------------------------------------------------------
+# HTTP server
+# ----------------------------------------------------------------------
+class ApiServer:
+    """Serve ``engine`` over HTTP; engine calls run on ``threads`` worker threads."""
+
+    def __init__(self, engine, threads=None):
+        self.engine = engine
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="insights-api")
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start listening and return the ``asyncio.Server``."""
+        return await asyncio.start_server(self._serve_connection, host, port)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    async def handle(self, method, target, body=b""):
+        """Dispatch one request; return ``(status, payload)``."""
+        url = urlsplit(target)
+        try:
+            handler, params = _route(method, url.path)
+        except LookupError as error:
+            status = error.args[0]
+            return status, {"error": status.phrase}
+        try:
+            payload = json.loads(body) if body else None
+            query = parse_qs(url.query)
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, handler, self.engine, params, query, payload)
+            return HTTPStatus.OK, result
+        except KeyError as error:
+            return HTTPStatus.NOT_FOUND, {"error": str(error.args[0]) if error.args else "Not found"}
+        except (ValueError, TypeError) as error:
+            return HTTPStatus.BAD_REQUEST, {"error": str(error)}
+        except Exception:
+            logger.exception("Error handling %s %s", method, target)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}
+
+    async def _read_request(self, reader):
+        """Return ``(method, target, keep_alive, body)``, or None at end of stream."""
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise _BadRequest("Malformed request line") from None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+            if len(headers) > 100:
+                raise _BadRequest("Too many headers")
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise _BadRequest("Chunked request bodies are not supported")
+        length = int(headers.get("content-length", 0) or 0)
+        if not 0 <= length <= MAX_BODY_SIZE:
+            raise _BadRequest("Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        if version == "HTTP/1.0":
+            keep_alive = headers.get("connection", "").lower() == "keep-alive"
+        else:
+            keep_alive = headers.get("connection", "").lower() != "close"
+        return method.upper(), target, keep_alive, body
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        try:
+            body = encode_json(payload)
+        except (TypeError, ValueError):
+            logger.exception("Cannot encode response")
+            status, body = HTTPStatus.INTERNAL_SERVER_ERROR, encode_json({"error": "Internal server error"})
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (_BadRequest, ValueError) as error:
+                    self._write_response(writer, HTTPStatus.BAD_REQUEST, {"error": str(error)}, False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, keep_alive, body = request
+                status, payload = await self.handle(method, target, body)
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(engine, host=DEFAULT_HOST, port=DEFAULT_PORT, threads=None):
+    """Run the API until cancelled."""
+    api = ApiServer(engine, threads)
+    server = await api.start(host, port)
+    logger.info("Serving on %s", ", ".join(str(sock.getsockname()) for sock in server.sockets))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        api.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.environ.get("CONSUMER_INSIGHTS_DB", "consumer_insights.db"))
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--threads", type=int, default=None, help="engine worker threads")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    engine = InsightsEngine.open(args.db)
+    try:
+        asyncio.run(serve(engine, args.host, args.port, args.threads))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""Persona similarity search ("find profiles like this one").
+
+Every profile is encoded as a fixed-length float32 feature vector:
+
+- multi-hot interests and pain points (each block scaled to unit length),
+- age and log income as angle pairs ``(cos, sin)`` so the dot product of
+  two values depends only on their distance,
+- one-hot location and buying stage.
+
+Blocks are weighted by ``FEATURE_WEIGHTS`` and rows normalized to unit
+length, so the dot product of two rows is their cosine similarity.
+``ExactIndex`` searches the matrix by brute force with batched matrix
+products; ``IVFIndex`` is an optional approximate index (spherical k-means
+cells, only the ``nprobe`` closest cells are searched).
+
+The index cached on a store follows journaled edits: an edited profile's
+row is re-encoded and replaced (and reassigned to its closest cell), so
+saving a profile does not rebuild the index. It is rebuilt when the
+feature layout changes (a new label) and after bulk imports; IVF cells
+are not retrained in between.
+"""
+
+import math
+
+import numpy as np
+
+from .schema import AGE_RANGE
+
+FEATURE_WEIGHTS = {
+    "interests": 1.0,
+    "pain_points": 1.0,
+    "age": 0.7,
+    "income": 0.5,
+    "location": 0.5,
+    "buying_stage": 0.5,
+}
+
+# Incomes are compared on a log scale between these bounds
+INCOME_RANGE = (10_000, 1_000_000)
+
+# Rows per block in brute-force search, so the score matrix stays small
+_BLOCK_ELEMENTS = 1 << 24
+
+
+def _angle_pair(values, low, high):
+    """Encode scalars in ``[low, high]`` as unit vectors on a quarter circle."""
+    angle = np.clip((values - low) / (high - low), 0.0, 1.0) * (math.pi / 2)
+    return np.stack([np.cos(angle), np.sin(angle)], axis=1)
+
+
+def _multi_hot(bits, size):
+    flags = ((bits[:, None] >> np.arange(size, dtype=np.uint64)) & np.uint64(1)).astype(np.float32)
+    counts = flags.sum(axis=1, keepdims=True)
+    return flags / np.sqrt(np.maximum(counts, 1.0))
+
+
+def _one_hot(codes, size):
+    flags = np.zeros((len(codes), size), dtype=np.float32)
+    flags[np.arange(len(codes)), codes] = 1.0
+    return flags
+
+
+def feature_matrix(store):
+    """Return ``(vectors, feature_names)`` for every row of ``store``.
+
+    ``vectors`` is an ``(rows, features)`` float32 matrix with unit-length
+    rows, in store row order.
+    """
+    vectors, names, _ = _encode(store)
+    return vectors, names
+
+
+def _encode(store, rows=slice(None), income_fill=None):
+    """Return ``(vectors, feature_names, income_fill)`` for ``rows`` of ``store``.
+
+    Unknown incomes are encoded as ``income_fill`` (a log income; default:
+    the median of the known ones among ``rows``).
+    """
+    with store.lock:
+        income = np.log10(np.clip(store.column("income_value")[rows], 1.0, None))
+        known = ~np.isnan(income)
+        if income_fill is None:
+            income_fill = np.median(income[known]) if known.any() else math.log10(INCOME_RANGE[0])
+        income[~known] = income_fill
+        blocks = {
+            "interests": _multi_hot(store.bitsets("interests")[rows], len(store.labels("interests"))),
+            "pain_points": _multi_hot(store.bitsets("pain_points")[rows], len(store.labels("pain_points"))),
+            "age": _angle_pair(store.column("age")[rows].astype(np.float32), *AGE_RANGE),
+            "income": _angle_pair(income, *np.log10(INCOME_RANGE)),
+            "location": _one_hot(store.codes("location")[rows], len(store.labels("location"))),
+            "buying_stage": _one_hot(store.codes("buying_stage")[rows], len(store.labels("buying_stage"))),
+        }
+        names = (
+            [f"interest:{label}" for label in store.labels("interests")]
+            + [f"pain_point:{label}" for label in store.labels("pain_points")]
+            + ["age:cos", "age:sin", "income:cos", "income:sin"]
+            + [f"location:{label}" for label in store.labels("location")]
+            + [f"buying_stage:{label}" for label in store.labels("buying_stage")]
+        )
+    vectors = np.hstack([block * FEATURE_WEIGHTS[name] for name, block in blocks.items()]).astype(np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors, names, income_fill
+
+
+def _reserve(array, size):
+    """Return ``array``, or a copy with room for ``size`` rows (same memory order)."""
+    if size <= len(array):
+        return array
+    grown = np.empty((max(size, 2 * len(array)),) + array.shape[1:], dtype=array.dtype,
+                     order="F" if array.ndim > 1 and not array.flags.c_contiguous else "C")
+    grown[:len(array)] = array
+    return grown
+
+
+def _top_k(scores, k):
+    """Column indices of the ``k`` largest entries of each row, best first."""
+    size = scores.shape[1]
+    k = min(k, size)
+    if k < size:
+        candidates = np.argpartition(scores, size - k, axis=1)[:, size - k:]
+    else:
+        candidates = np.broadcast_to(np.arange(size), scores.shape)
+    picked = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-picked, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(picked, order, axis=1)
+
+
+def _cell_sums(vectors, assignment, cells):
+    order = np.argsort(assignment, kind="stable")
+    offsets = np.searchsorted(assignment[order], np.arange(cells))
+    sums = np.add.reduceat(vectors[order], np.minimum(offsets, len(order) - 1), axis=0)
+    sums[np.bincount(assignment, minlength=cells) == 0] = 0
+    return sums
+
+
+class ExactIndex:
+    """Brute-force cosine k-nearest-neighbour search over unit vectors.
+
+    Vectors are kept feature-major (``vectors.T`` is contiguous), which
+    makes scoring every row against a query one fast matrix product.
+    ``set`` and ``remove`` edit single rows the way ``ProfileStore`` does.
+    """
+
+    def __init__(self, vectors):
+        self._vectors = np.asfortranarray(vectors, dtype=np.float32)
+        self._size = len(self._vectors)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vectors(self):
+        return self._vectors[:self._size]
+
+    def vector(self, row):
+        """Feature vector of store row ``row``."""
+        return np.ascontiguousarray(self._vectors[row])
+
+    def set(self, row, vector):
+        """Replace the vector of ``row``, or append it when ``row`` is ``len(self)``."""
+        if row == self._size:
+            self._vectors = _reserve(self._vectors, row + 1)
+            self._size += 1
+        self._vectors[row] = vector
+
+    def remove(self, row):
+        """Remove ``row``, moving the last row into it."""
+        last = self._size - 1
+        self._vectors[row] = self._vectors[last]
+        self._size = last
+
+    def search(self, queries, k=5):
+        """Return ``(rows, scores)``, each ``(len(queries), k)``, best match first.
+
+        The database is scanned in blocks; each block is scored against all
+        queries with one matrix product and only its top ``k`` are kept.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        columns = self.vectors.T
+        block = max(1024, _BLOCK_ELEMENTS // len(queries))
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self.vectors), block):
+            rows, scores = _top_k(queries @ columns[:, start:start + block], k)
+            best_rows = np.hstack([best_rows, rows + start])
+            best_scores = np.hstack([best_scores, scores])
+            if best_rows.shape[1] > k:
+                keep, best_scores = _top_k(best_scores, k)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+        return best_rows, best_scores
+
+
+class IVFIndex:
+    """Approximate search over an inverted file of spherical k-means cells.
+
+    Vectors are grouped into ``cells`` clusters (default ``sqrt(rows)``),
+    each holding the rows assigned to it; a query is only compared with
+    the vectors of its ``nprobe`` closest cells. Recall grows with
+    ``nprobe``. Same search and edit API as ``ExactIndex``.
+    """
+
+    def __init__(self, vectors, cells=None, nprobe=8, iterations=10, sample_size=50_000, seed=0):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        cells = max(1, min(len(vectors), cells or int(math.sqrt(len(vectors)))))
+        sample = vectors[rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=cells, replace=False)]
+        for _ in range(iterations):
+            sums = _cell_sums(sample, np.argmax(sample @ centroids.T, axis=1), cells)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        self.centroids = centroids.astype(np.float32)
+        self.nprobe = nprobe
+
+        assignment = np.concatenate([
+            np.argmax(vectors[start:start + 65536] @ self.centroids.T, axis=1)
+            for start in range(0, len(vectors), 65536)
+        ])
+        members = np.argsort(assignment, kind="stable")
+        offsets = np.searchsorted(assignment[members], np.arange(cells + 1))
+        # Rows of each cell (with spare room at the end) and, per row, its cell and slot in it
+        self._members = [members[offsets[c]:offsets[c + 1]].copy() for c in range(cells)]
+        self._counts = np.diff(offsets)
+        self._cell = assignment
+        self._slot = np.empty_like(members)
+        self._slot[members] = np.arange(len(members)) - offsets[assignment[members]]
+        self._vectors = vectors
+        self._size = len(vectors)
+
+    def __len__(self):
+        return self._size
+
+    def vector(self, row):
+        """Feature vector of store row ``row``."""
+        return self._vectors[row]
+
+    def set(self, row, vector):
+        """Replace the vector of ``row`` and move it to its closest cell, or append it."""
+        if row == self._size:
+            for name in ("_vectors", "_cell", "_slot"):
+                setattr(self, name, _reserve(getattr(self, name), row + 1))
+            self._size += 1
+        else:
+            self._unassign(row)
+        self._vectors[row] = vector
+        cell = int(np.argmax(self.centroids @ vector))
+        slot = self._counts[cell]
+        self._members[cell] = _reserve(self._members[cell], slot + 1)
+        self._members[cell][slot] = row
+        self._counts[cell] += 1
+        self._cell[row], self._slot[row] = cell, slot
+
+    def remove(self, row):
+        """Remove ``row``, moving the last row into it."""
+        self._unassign(row)
+        last = self._size - 1
+        if row != last:
+            cell, slot = self._cell[last], self._slot[last]
+            self._members[cell][slot] = row
+            self._vectors[row] = self._vectors[last]
+            self._cell[row], self._slot[row] = cell, slot
+        self._size = last
+
+    def _unassign(self, row):
+        # Fill the row's slot with the last member of its cell
+        cell, slot = self._cell[row], self._slot[row]
+        self._counts[cell] -= 1
+        moved = self._members[cell][self._counts[cell]]
+        self._members[cell][slot] = moved
+        self._slot[moved] = slot
+
+    def search(self, queries, k=5):
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for i, (query, cells) in enumerate(zip(queries, probes)):
+            members = np.concatenate([self._members[c][:self._counts[c]] for c in cells])
+            if not len(members):
+                continue
+            top, top_scores = _top_k((self._vectors[members] @ query)[None, :], k)
+            rows[i, :top.shape[1]] = members[top[0]]
+            scores[i, :top.shape[1]] = top_scores[0]
+        return rows, scores
+
+
+def build_index(store, approximate=False, **options):
+    """Encode ``store`` and return an ``ExactIndex`` or ``IVFIndex`` over it."""
+    vectors, _ = feature_matrix(store)
+    return IVFIndex(vectors, **options) if approximate else ExactIndex(vectors)
+
+
+def _build_cached_index(store, approximate):
+    vectors, names, income_fill = _encode(store)
+    index = IVFIndex(vectors) if approximate else ExactIndex(vectors)
+    return index, (names, income_fill)
+
+
+def _update_index(store, cached, edit, row):
+    """Apply one journaled edit to a cached index; ``None`` when the feature layout changed."""
+    index, (names, income_fill) = cached
+    if edit.after is None:
+        index.remove(row)
+        return cached
+    vectors, row_names, _ = _encode(store, [row], income_fill)
+    if row_names != names:
+        return None
+    index.set(row, vectors[0])
+    return cached
+
+
+def similar_profiles(store, profile_id, k=5, approximate=False):
+    """Return ``[(record, similarity)]`` for the ``k`` profiles most like ``profile_id``.
+
+    The index is built on first use, cached on the store and updated by
+    each journaled edit. The profile itself is never part of the result.
+    """
+    with store.lock:
+        index, _ = store.cached(("similarity_index", approximate), lambda: _build_cached_index(store, approximate),
+                                lambda cached, edit, row: _update_index(store, cached, edit, row))
+        row = store.row_of(profile_id)
+        rows, scores = index.search(index.vector(row), k + 1)
+        return [
+            (store.record(int(match)), float(score))
+            for match, score in zip(rows[0], scores[0])
+            if match >= 0 and match != row
+        ][:k]
@@ -0,0 +1,368 @@
+"""Persistent storage for consumer profiles, products and advice history.
+
+``ProfileRepository`` is the pluggable interface; ``SQLiteRepository`` is
+the local implementation. Single-profile edits go through ``apply_edit``,
+which writes the profile row and its edit journal entry (see
+``consumer_insights.journal``) together. Exports are chunked end to end: profiles are
+read from the database and written to CSV and Parquet files in
+fixed-size chunks, so millions of profiles can be moved without holding
+them all in memory. Imports (of profiles and of products) go through
+``consumer_insights.ingest``.
+"""
+
+import io
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .schema import PRODUCT_FIELDS, PROFILE_FIELDS
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+LIST_FIELDS = ("interests", "pain_points")
+
+# Separator for list-valued fields in CSV files
+CSV_LIST_SEPARATOR = "; "
+
+_LIST_COLUMNS = [(PROFILE_FIELDS.index(field), field) for field in LIST_FIELDS]
+
+_encode_list = json.JSONEncoder().encode
+
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class ProfileRepository:
+    """Interface for profile, product and advice persistence backends."""
+
+    def iter_profiles(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield lists of profile dicts, at most ``chunk_size`` per list."""
+        raise NotImplementedError
+
+    def count_profiles(self):
+        raise NotImplementedError
+
+    def save_profiles(self, profiles):
+        """Insert or replace profiles."""
+        raise NotImplementedError
+
+    def save_profile(self, profile):
+        self.save_profiles([profile])
+
+    def delete_profile(self, profile_id):
+        raise NotImplementedError
+
+    def iter_products(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield lists of product dicts, at most ``chunk_size`` per list."""
+        raise NotImplementedError
+
+    def count_products(self):
+        raise NotImplementedError
+
+    def save_products(self, products):
+        """Insert or replace products."""
+        raise NotImplementedError
+
+    def delete_product(self, product_id):
+        raise NotImplementedError
+
+    def apply_edit(self, profile_id, before, after, created_at, undoes=None):
+        """Save ``after`` (or delete the profile when ``None``) and journal the edit atomically.
+
+        Returns the edit's sequence number.
+        """
+        raise NotImplementedError
+
+    def recent_edits(self, limit):
+        """Return the newest ``limit`` journaled edits as dicts, oldest first."""
+        raise NotImplementedError
+
+    def compact_edits(self, through):
+        """Delete journaled edits with sequence numbers up to ``through``."""
+        raise NotImplementedError
+
+    def append_advice(self, profile_id, advice, session=None):
+        """Store an advice record, tagged with the ``session`` key that generated it."""
+        raise NotImplementedError
+
+    def recent_advice(self, limit=100, session=None):
+        """Return the newest ``limit`` advice records, oldest first.
+
+        With ``session``, only the records appended with that key.
+        """
+        raise NotImplementedError
+
+    def prune_advice(self, before):
+        """Delete advice records created before the Unix time ``before``."""
+        raise NotImplementedError
+
+    def get_counter(self, name, default=0):
+        """Return a persisted integer counter such as the next profile id."""
+        raise NotImplementedError
+
+    def set_counter(self, name, value):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteRepository(ProfileRepository):
+    """SQLite-backed repository, safe to share between Streamlit sessions."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles ("
+                " id INTEGER PRIMARY KEY, name TEXT, age INTEGER, occupation TEXT, income TEXT,"
+                " location TEXT, interests TEXT, pain_points TEXT, spending_habits TEXT,"
+                " avatar TEXT, buying_stage TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS advice ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, profile_id INTEGER, type TEXT,"
+                " date TEXT, content TEXT, created_at REAL, session TEXT)"
+            )
+            # Databases created before advice records were tagged with their session
+            if "session" not in {column[1] for column in self._conn.execute("PRAGMA table_info(advice)")}:
+                self._conn.execute("ALTER TABLE advice ADD COLUMN session TEXT")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS products ("
+                " id INTEGER PRIMARY KEY, name TEXT, category TEXT, price REAL, eco_friendly INTEGER)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS profile_edits ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT, profile_id INTEGER, before TEXT, after TEXT,"
+                " created_at REAL, undoes INTEGER)"
+            )
+
+    @staticmethod
+    def _to_row(profile):
+        row = [profile.get(field, "") for field in PROFILE_FIELDS]
+        for index, field in _LIST_COLUMNS:
+            row[index] = _encode_list(profile.get(field, []))
+        return row
+
+    @staticmethod
+    def _from_row(row):
+        profile = dict(zip(PROFILE_FIELDS, row))
+        for field in LIST_FIELDS:
+            profile[field] = json.loads(profile[field] or "[]")
+        return profile
+
+    def iter_profiles(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        # A dedicated connection so a long export does not hold the shared one
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(PROFILE_FIELDS)} FROM profiles ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield [self._from_row(row) for row in rows]
+        finally:
+            conn.close()
+
+    def count_profiles(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def save_profiles(self, profiles):
+        placeholders = ", ".join("?" for _ in PROFILE_FIELDS)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO profiles ({', '.join(PROFILE_FIELDS)}) VALUES ({placeholders})",
+                (self._to_row(profile) for profile in profiles),
+            )
+
+    def delete_profile(self, profile_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM profiles WHERE id = ?", (profile_id,))
+
+    def iter_products(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(PRODUCT_FIELDS)} FROM products ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield [{"id": product_id, "name": name, "category": category, "price": price,
+                        "eco_friendly": bool(eco_friendly)}
+                       for product_id, name, category, price, eco_friendly in rows]
+        finally:
+            conn.close()
+
+    def count_products(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def save_products(self, products):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO products ({', '.join(PRODUCT_FIELDS)}) VALUES (?, ?, ?, ?, ?)",
+                ((product["id"], product["name"], product["category"], float(product["price"]),
+                  int(bool(product["eco_friendly"]))) for product in products),
+            )
+
+    def delete_product(self, product_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
+
+    def apply_edit(self, profile_id, before, after, created_at, undoes=None):
+        with self._lock, self._conn:
+            if after is None:
+                self._conn.execute("DELETE FROM profiles WHERE id = ?", (profile_id,))
+            else:
+                placeholders = ", ".join("?" for _ in PROFILE_FIELDS)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO profiles ({', '.join(PROFILE_FIELDS)}) VALUES ({placeholders})",
+                    self._to_row(after),
+                )
+            cursor = self._conn.execute(
+                "INSERT INTO profile_edits (profile_id, before, after, created_at, undoes) VALUES (?, ?, ?, ?, ?)",
+                (profile_id, _encode_json(before), _encode_json(after), created_at, undoes),
+            )
+            return cursor.lastrowid
+
+    def recent_edits(self, limit):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, profile_id, before, after, created_at, undoes FROM profile_edits"
+                " ORDER BY seq DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            {"seq": seq, "profile_id": profile_id, "before": json.loads(before), "after": json.loads(after),
+             "created_at": created_at, "undoes": undoes}
+            for seq, profile_id, before, after, created_at, undoes in reversed(rows)
+        ]
+
+    def compact_edits(self, through):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM profile_edits WHERE seq <= ?", (through,))
+
+    def append_advice(self, profile_id, advice, session=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO advice (profile_id, type, date, content, created_at, session) VALUES (?, ?, ?, ?, ?, ?)",
+                (profile_id, advice["type"], advice["date"], advice["content"], time.time(), session),
+            )
+
+    def recent_advice(self, limit=100, session=None):
+        where, params = ("", (limit,)) if session is None else ("WHERE session = ? ", (session, limit))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT profile_id, type, date, content, created_at FROM advice "
+                f"{where}ORDER BY id DESC LIMIT ?", params
+            ).fetchall()
+        return [
+            {"profile_id": profile_id, "type": advice_type, "date": date, "content": content, "created_at": created_at}
+            for profile_id, advice_type, date, content, created_at in reversed(rows)
+        ]
+
+    def prune_advice(self, before):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM advice WHERE created_at < ?", (before,))
+
+    def get_counter(self, name, default=0):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_counter(self, name, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (name, value))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ----------------------------------------------------------------------
+# Bulk file transfer
+# ----------------------------------------------------------------------
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError("Parquet import/export requires the optional 'pyarrow' package") from exc
+    return pyarrow
+
+
+def require_format(file_format):
+    """Raise unless profiles can be written and read as ``file_format`` here."""
+    if file_format == "parquet":
+        _require_pyarrow()
+    elif file_format != "csv":
+        raise ValueError(f"Unsupported file format: {file_format}")
+
+
+def write_profiles(chunks, destination, file_format="csv"):
+    """Write an iterable of profile chunks to a CSV or Parquet destination.
+
+    Returns the number of profiles written. Only one chunk is held in
+    memory at a time.
+    """
+    written = 0
+    if file_format == "csv":
+        import pandas as pd
+
+        text = io.TextIOWrapper(destination, encoding="utf-8", newline="") \
+            if not isinstance(destination, str) else open(destination, "w", encoding="utf-8", newline="")
+        try:
+            for i, chunk in enumerate(chunks):
+                frame = pd.DataFrame(chunk, columns=PROFILE_FIELDS)
+                for field in LIST_FIELDS:
+                    frame[field] = frame[field].map(CSV_LIST_SEPARATOR.join)
+                frame.to_csv(text, header=i == 0, index=False)
+                written += len(frame)
+            if written == 0:
+                text.write(",".join(PROFILE_FIELDS) + "\n")
+        finally:
+            if isinstance(destination, str):
+                text.close()
+            else:
+                text.detach()
+    elif file_format == "parquet":
+        pa = _require_pyarrow()
+        schema = pa.schema([
+            ("id", pa.int64()), ("name", pa.string()), ("age", pa.int64()), ("occupation", pa.string()),
+            ("income", pa.string()), ("location", pa.string()), ("interests", pa.list_(pa.string())),
+            ("pain_points", pa.list_(pa.string())), ("spending_habits", pa.string()),
+            ("avatar", pa.string()), ("buying_stage", pa.string()),
+        ])
+        with pa.parquet.ParquetWriter(destination, schema) as writer:
+            for chunk in chunks:
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                written += len(chunk)
+    else:
+        raise ValueError(f"Unsupported file format: {file_format}")
+    return written
+
+
+def export_profiles(repository, destination, file_format="csv", chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream every stored profile to ``destination``; returns the count."""
+    return write_profiles(repository.iter_profiles(chunk_size), destination, file_format)
+
+
+def export_to_temporary_file(repository, file_format="csv", chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream every stored profile to a new temporary file.
+
+    Returns the file opened for reading from its start; it is deleted when
+    closed. Used to serve downloads without building the export in memory.
+    """
+    handle = tempfile.TemporaryFile()
+    try:
+        export_profiles(repository, handle, file_format, chunk_size)
+        handle.seek(0)
+    except BaseException:
+        handle.close()
+        raise
+    return handle
@@ -0,0 +1,52 @@
+"""Validation and normalization rules shared by the editor and bulk imports."""
+
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+from .schema import BUYING_STAGES, INTERESTS, LOCATIONS, PAIN_POINTS
+
+# "$75,000", "75000", "75k", "$1.2M", "60k-80k" (ranges give the midpoint)
+_AMOUNT = r"(\d+(?:\.\d+)?)\s*([km]?)"
+_INCOME_PATTERN = re.compile(rf"{_AMOUNT}(?:\s*(?:-|to)\s*{_AMOUNT})?")
+_INCOME_NOISE = r"[$,\s]|usd|per\s*year|/\s*(?:yr|year)|a\s*year"
+_SCALE = {"": 1.0, "k": 1e3, "m": 1e6}
+
+VOCABULARIES = {
+    "location": frozenset(LOCATIONS),
+    "buying_stage": frozenset(BUYING_STAGES),
+    "interests": frozenset(INTERESTS),
+    "pain_points": frozenset(PAIN_POINTS),
+}
+
+
+def parse_income(value):
+    """Return an income as a float, or None when it is empty or unreadable."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return None if math.isnan(value) else float(value)
+    text = re.sub(_INCOME_NOISE, "", str(value or "").lower())
+    match = _INCOME_PATTERN.fullmatch(text)
+    if match is None:
+        return None
+    low = float(match[1]) * _SCALE[match[2]]
+    if match[3] is None:
+        return low
+    return (low + float(match[3]) * _SCALE[match[4] or match[2]]) / 2
+
+
+def parse_incomes(values):
+    """Vectorized ``parse_income``; unreadable values become NaN.
+
+    Each distinct value is parsed once, which is cheap for the heavily
+    repeated income strings of real data.
+    """
+    inverse, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    parsed = [parse_income(value) for value in uniques]
+    return np.array([np.nan if amount is None else amount for amount in parsed], dtype=np.float64)[inverse]
+
+
+def format_income(amount):
+    """Canonical display form of a parsed income, e.g. ``$75,000``."""
+    return "" if amount is None or math.isnan(amount) else f"${amount:,.0f}"
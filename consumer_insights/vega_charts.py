@@ -0,0 +1,105 @@
+"""Vega-Lite chart specs for the Dashboard and Insights pages.
+
+Same functions and arguments as ``consumer_insights.charts``, but each one
+returns a Vega-Lite spec (a dict) with the pre-aggregated values inlined,
+for ``st.vega_lite_chart``. The browser draws the chart, so the server
+only aggregates: no figure is rendered or rasterized and only a few
+hundred bytes of data are sent per chart. The chart's action menu exports
+PNG/SVG client-side; ``consumer_insights.charts`` (matplotlib) stays
+available for static images.
+"""
+
+HEIGHT = 320
+
+
+def _values(records):
+    """Cast NumPy scalars to plain Python so the spec is JSON serializable."""
+    return [{name: value.item() if hasattr(value, "item") else value for name, value in record.items()}
+            for record in records]
+
+
+def _spec(values, title=None, height=HEIGHT, **spec):
+    spec = {"data": {"values": _values(values)}, "height": height, **spec}
+    if title:
+        spec["title"] = title
+    return spec
+
+
+def _bar(counts, horizontal=False, label="label", title=None, height=HEIGHT, x_title=None, y_title="count"):
+    labels = list(counts.index)
+    values = [{label: name, "count": count} for name, count in zip(labels, counts.values)]
+    category = {"field": label, "type": "nominal", "sort": labels, "title": x_title}
+    count = {"field": "count", "type": "quantitative", "title": y_title}
+    encoding = {"y": category, "x": count} if horizontal else {"x": category, "y": count}
+    encoding["tooltip"] = [{"field": label, "type": "nominal"}, {"field": "count", "type": "quantitative"}]
+    return _spec(values, title, height, mark={"type": "bar"}, encoding=encoding)
+
+
+def interests_column_chart(interest_counts):
+    return _bar(interest_counts, label="interest", x_title="Interest")
+
+
+def age_histogram(ages, counts=None):
+    """Histogram of ages; ``counts`` weights each age when data is pre-aggregated."""
+    counts = [1] * len(ages) if counts is None else counts
+    values = [{"age": age, "count": count} for age, count in zip(ages, counts)]
+    return _spec(values, mark={"type": "bar"}, encoding={
+        "x": {"field": "age", "type": "quantitative", "bin": {"maxbins": 10}, "title": "age"},
+        "y": {"aggregate": "sum", "field": "count", "type": "quantitative", "title": "count"},
+    })
+
+
+def location_pie(location_counts):
+    total = max(int(location_counts.sum()), 1)
+    values = [{"location": name, "count": count, "share": count / total}
+              for name, count in zip(location_counts.index, location_counts.values)]
+    return _spec(values, mark={"type": "arc"}, encoding={
+        "theta": {"field": "count", "type": "quantitative", "stack": True},
+        "color": {"field": "location", "type": "nominal", "sort": list(location_counts.index)},
+        "tooltip": [{"field": "location", "type": "nominal"}, {"field": "count", "type": "quantitative"},
+                    {"field": "share", "type": "quantitative", "format": ".1%"}],
+    })
+
+
+def horizontal_bar(counts):
+    return _bar(counts, horizontal=True, label=counts.index.name or "label", y_title="count")
+
+
+def stage_bar(stage_counts):
+    return _bar(stage_counts, label="stage", x_title="Buying Stage", y_title="Number of Consumers")
+
+
+def stage_funnel(stages, stage_counts):
+    """Stage bars annotated with the conversion rate from the previous stage."""
+    values = []
+    for i, (stage, count) in enumerate(zip(stages, stage_counts)):
+        previous = stage_counts[i - 1] if i else 0
+        rate = f"→ {count / previous * 100:.1f}%" if i and previous > 0 and count > 0 else ""
+        values.append({"stage": stage, "count": count, "conversion": rate})
+    x = {"field": "stage", "type": "nominal", "sort": list(stages), "title": None}
+    y = {"field": "count", "type": "quantitative", "title": "Number of Consumers"}
+    return _spec(values, "Consumer Journey Stage Conversion", layer=[
+        {"mark": {"type": "bar"}, "encoding": {"x": x, "y": y}},
+        {"mark": {"type": "text", "dy": -8, "fontWeight": "bold"},
+         "encoding": {"x": x, "y": y, "text": {"field": "conversion", "type": "nominal"}}},
+    ])
+
+
+def heatmap(table, title=None):
+    """Annotated heatmap of a count table such as a segment cross-tab."""
+    rows = [str(label) for label in table.index]
+    columns = [str(label) for label in table.columns]
+    values = [{"row": row, "column": column, "count": count}
+              for row, counts in zip(rows, table.to_numpy()) for column, count in zip(columns, counts)]
+    threshold = table.to_numpy().max() / 2 if table.size else 0
+    x = {"field": "column", "type": "nominal", "sort": columns, "title": None}
+    y = {"field": "row", "type": "nominal", "sort": rows, "title": None}
+    return _spec(values, title, max(120, 28 * len(rows)), encoding={"x": x, "y": y}, layer=[
+        {"mark": {"type": "rect"},
+         "encoding": {"color": {"field": "count", "type": "quantitative", "scale": {"scheme": "blues"},
+                                "legend": None}}},
+        {"mark": {"type": "text"},
+         "encoding": {"text": {"field": "count", "type": "quantitative"},
+                      "color": {"condition": {"test": f"datum.count > {threshold}", "value": "white"},
+                                "value": "black"}}},
+    ])
@@ -1,10 +1,52 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from PIL import Image
-import random
+import os
+import time
+import uuid
+from functools import partial
+
+# Only light modules here: numpy/pandas, the plotting stack and the profile data
+# are loaded by the pages that need them
+from consumer_insights.advice import SUPPORTED_ADVICE_TYPES
+from consumer_insights.advice_cache import DAY, AdviceHistory
+from consumer_insights.engine import InsightsEngine
+from consumer_insights.figure_cache import FigureCache
+from consumer_insights.jobs import DONE, QueueFullError
+from consumer_insights.metrics import Metrics
+from consumer_insights.storage import export_to_temporary_file, require_format
+from consumer_insights.schema import (ADVICE_TYPES, AGE_RANGE, AVATARS, BUYING_STAGES, INTERESTS, LOCATIONS,
+                                      PAIN_POINTS, PRODUCT_CATEGORIES)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "consumer_insights.db")
+
+# Advice history kept per session: at most this many records, for this many days by default
+ADVICE_HISTORY_SIZE = 100
+DEFAULT_ADVICE_RETENTION_DAYS = 90
+
+# Number of look-alike personas listed on the advisor page
+SIMILAR_PROFILES_SHOWN = 5
+
+# Charts are drawn natively in the browser ("vega") or rendered to images with matplotlib ("matplotlib")
+CHART_BACKENDS = {"vega": "Interactive (Vega-Lite)", "matplotlib": "Static images (matplotlib)"}
+DEFAULT_CHART_BACKEND = "vega"
+
+# Segments beyond this many are left out of the Insights segment tables and heatmaps
+MAX_SEGMENTS_SHOWN = 15
+
+# Profile edits each session can undo, and journal entries listed on the profiles page
+UNDO_STEPS = 20
+RECENT_EDITS_SHOWN = 10
+
+# Journey analytics windows and cohort periods on the Insights page, in days
+JOURNEY_WINDOWS = {7: "Last 7 days", 30: "Last 30 days", 90: "Last 90 days", 365: "Last year"}
+COHORT_PERIODS = {1: "Day", 7: "Week", 30: "Month"}
+
+# Products listed at once when browsing the catalog in Settings
+PRODUCTS_SHOWN = 50
+
+# Advice runs as background jobs: a click waits this long for the result (enough for cached
+# advice), then the page shows the job's progress, polling it at this interval
+JOB_WAIT_SECONDS = 0.5
+JOB_POLL_SECONDS = 0.5
 
 # Set page configuration
 st.set_page_config(
@@ -41,67 +83,118 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state variables
-if 'consumer_profiles' not in st.session_state:
-    # Create some example consumer profiles
-    st.session_state.consumer_profiles = [
-        {
-            "id": 1,
-            "name": "Emily Chen",
-            "age": 28,
-            "occupation": "Marketing Manager",
-            "income": "$75,000",
-            "location": "Urban",
-            "interests": ["Fitness", "Sustainable products", "Travel"],
-            "pain_points": ["Lack of time", "Price sensitivity", "Wants eco-friendly options"],
-            "spending_habits": "Prefers quality over quantity, researches before purchasing",
-            "avatar": "👩‍💼",
-            "buying_stage": "Consideration"
-        },
-        {
-            "id": 2,
-            "name": "James Wilson",
-            "age": 42,
-            "occupation": "IT Professional",
-            "income": "$95,000",
-            "location": "Suburban",
-            "interests": ["Technology", "Home improvement", "Gaming"],
-            "pain_points": ["Feature complexity", "Technical support", "Value for money"],
-            "spending_habits": "Early adopter, willing to pay premium for latest tech",
-            "avatar": "👨‍💻",
-            "buying_stage": "Awareness"
+
+@st.cache_resource
+def get_engine():
+    # One engine (SQLite database plus in-memory copy of the data) for all sessions;
+    # the same engine backs the HTTP API in consumer_insights.server. The profiles
+    # are only loaded into memory when a page first uses them
+    return InsightsEngine.open(os.environ.get("CONSUMER_INSIGHTS_DB", DEFAULT_DB_PATH))
+
+
+engine = get_engine()
+dataset = engine.dataset
+repository = dataset.repository
+
+
+@st.cache_resource
+def get_chart_cache():
+    # Shared by all sessions; entries are keyed on the profile data version
+    return FigureCache(max_entries=64)
+
+
+@st.cache_resource
+def get_metrics():
+    # Shared by all sessions; only sessions with debug mode on record timings.
+    # Set CONSUMER_INSIGHTS_METRICS_LOG to also append every timing to a JSON lines file
+    advice_cache = get_engine().dataset.advice_cache
+    jobs = get_engine().jobs
+    chart_cache = get_chart_cache()
+    return Metrics(
+        gauges={
+            "advice_cache_hit_rate": lambda: advice_cache.stats()["hit_rate"],
+            "chart_cache_hit_rate": lambda: chart_cache.hits / max(chart_cache.hits + chart_cache.misses, 1),
+            "jobs_queued": lambda: jobs.stats()["queued"],
+            "jobs_running": lambda: jobs.stats()["running"],
         },
-        {
-            "id": 3,
-            "name": "Maria Rodriguez",
-            "age": 35,
-            "occupation": "Healthcare Worker",
-            "income": "$62,000",
-            "location": "Urban",
-            "interests": ["Cooking", "Family activities", "Health & wellness"],
-            "pain_points": ["Limited free time", "Product reliability", "Family budget constraints"],
-            "spending_habits": "Practical buyer, looks for deals and family-oriented products",
-            "avatar": "👩‍⚕️",
-            "buying_stage": "Decision"
-        }
-    ]
+        log_path=os.environ.get("CONSUMER_INSIGHTS_METRICS_LOG"),
+    )
+
+
+metrics = get_metrics()
+
+
+def timed(stage):
+    # Times the block into the current page's histogram for this stage when debug mode is on
+    return metrics.timer(page.split(" ", 1)[1], stage, enabled=st.session_state.debug_mode)
+
+
+def show_chart(name, render, *params):
+    # render(backend) builds the chart with either chart module; both have the same functions
+    with timed("chart"):
+        if st.session_state.chart_backend == "vega":
+            from consumer_insights import vega_charts
+            
+            st.vega_lite_chart(render(vega_charts), use_container_width=True)
+        else:
+            from consumer_insights import charts
+            
+            key = (name, dataset.profiles.token, dataset.profiles.version) + params
+            st.image(get_chart_cache().get_or_render(key, lambda: render(charts)))
+
+
+def session_job(name, request=None):
+    # The background job this session started, kept in st.session_state[name] as (job id, request);
+    # forgotten once the job expired or, when given, the request no longer matches the page's
+    entry = st.session_state.get(name)
+    if entry is None:
+        return None
+    job_id, job_request = entry
+    try:
+        if request is None or job_request == request:
+            return engine.job(job_id)
+    except KeyError:
+        pass
+    del st.session_state[name]
+    return None
+
+
+def show_job_progress(job):
+    # Queue position while waiting, then the stage progress the job reports as it runs
+    position = engine.jobs.position(job)
+    if position:
+        text = f"Waiting for {position} earlier requests..."
+    elif job.stage:
+        text = f"{job.stage.capitalize()} done"
+    else:
+        text = "Starting..."
+    st.progress(job.fraction, text=text)
+    if len(job.users) > 1:
+        st.caption(f"Shared with {len(job.users) - 1} other identical request(s)")
 
-if 'selected_profile' not in st.session_state:
-    st.session_state.selected_profile = None
 
-if 'advice_history' not in st.session_state:
-    st.session_state.advice_history = []
+def get_advice_history():
+    # This session's stored advice, loaded the first time a page of the session needs it
+    if 'advice_history' not in st.session_state:
+        records = repository.recent_advice(limit=ADVICE_HISTORY_SIZE, session=st.session_state.job_user)
+        st.session_state.advice_history = AdviceHistory(st.session_state.advice_retention_days, records,
+                                                        max_entries=ADVICE_HISTORY_SIZE)
+    return st.session_state.advice_history
+
+if 'debug_mode' not in st.session_state:
+    st.session_state.debug_mode = False
+
+if 'chart_backend' not in st.session_state:
+    st.session_state.chart_backend = DEFAULT_CHART_BACKEND
+
+if 'advice_retention_days' not in st.session_state:
+    st.session_state.advice_retention_days = DEFAULT_ADVICE_RETENTION_DAYS
+
+# Identifies this session to the job queue, which limits and interleaves jobs per user, and in the
+# stored advice history
+if 'job_user' not in st.session_state:
+    st.session_state.job_user = uuid.uuid4().hex
 
-if 'products' not in st.session_state:
-    # Example product data
-    st.session_state.products = [
-        {"name": "Premium Fitness Tracker", "category": "Fitness", "price": 129.99, "eco_friendly": True},
-        {"name": "Smart Home Hub", "category": "Technology", "price": 199.99, "eco_friendly": False},
-        {"name": "Organic Meal Kit Subscription", "category": "Cooking", "price": 12.99, "eco_friendly": True},
-        {"name": "Professional Laptop", "category": "Technology", "price": 1299.99, "eco_friendly": False},
-        {"name": "Eco-Friendly Water Bottle", "category": "Sustainable products", "price": 24.99, "eco_friendly": True},
-        {"name": "Family Board Game Set", "category": "Family activities", "price": 34.99, "eco_friendly": True}
-    ]
 
 # Sidebar - App navigation
 st.sidebar.title("Consumer Insights AI")
@@ -114,10 +207,12 @@ page = st.sidebar.radio("Navigation", [
     "🤖 AI Consumer Advisor",
     "📊 Insights & Analytics",
     "⚙️ Settings"
-])
+], key="page")
+page_started = time.perf_counter()
 
 # Main content area
 if page == "🏠 Dashboard":
+    profile_store = dataset.profiles
     st.title("Consumer Insights AI Dashboard")
     st.subheader("Welcome to your digital consumer advisor")
     
@@ -130,7 +225,7 @@ if page == "🏠 Dashboard":
             <p>Currently simulating {0} consumer personas</p>
             <p>Last updated: Today</p>
         </div>
-        """.format(len(st.session_state.consumer_profiles)), unsafe_allow_html=True)
+        """.format(len(profile_store)), unsafe_allow_html=True)
         
         st.markdown("""
         <div class="consumer-card">
@@ -148,27 +243,82 @@ if page == "🏠 Dashboard":
         st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
         st.subheader("Consumer Interests Distribution")
         
-        # Gather all interests from profiles
-        all_interests = []
-        for profile in st.session_state.consumer_profiles:
-            all_interests.extend(profile["interests"])
-        
-        interest_counts = pd.Series(all_interests).value_counts()
-        
-        fig, ax = plt.subplots(figsize=(8, 5))
-        sns.barplot(x=interest_counts.index, y=interest_counts.values, ax=ax)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        st.pyplot(fig)
+        show_chart("interests_column", lambda charts: charts.interests_column_chart(engine.value_counts("interests")))
         st.markdown("</div>", unsafe_allow_html=True)
 
 elif page == "👥 Consumer Profiles":
+    from consumer_insights import profile_query
+    from consumer_insights.profile_store import ProfileConflictError
+    
+    profile_store = dataset.profiles
+    if 'selected_profile' not in st.session_state:
+        st.session_state.selected_profile = None
+    if 'profile_undo' not in st.session_state:
+        st.session_state.profile_undo = []
     st.title("Digital Consumer Profiles")
     st.write("Browse and manage your digital consumer personas.")
     
-    # Display existing profiles in a grid
+    # Undo this session's edits, newest first; the undo itself is journaled like any edit
+    if st.session_state.profile_undo and st.button("↩️ Undo Last Edit"):
+        try:
+            dataset.undo(st.session_state.profile_undo.pop())
+        except ProfileConflictError:
+            st.error("That profile was changed in another session since your edit, so it was not undone.")
+        except KeyError:
+            st.error("That edit is too old to undo.")
+    
+    with st.expander("Recent Edits"):
+        recent_edits = engine.edits(limit=RECENT_EDITS_SHOWN)
+        if not recent_edits:
+            st.write("No profile edits yet.")
+        for edit in reversed(recent_edits):
+            edited = edit.after or edit.before
+            action = f"undo of #{edit.undoes}" if edit.undoes else edit.op
+            st.write(f"#{edit.seq} · {time.strftime('%Y-%m-%d %H:%M', time.localtime(edit.created_at))} · "
+                     f"{action} · {edited['name'] or 'Unnamed'} (id {edit.profile_id})")
+    
+    # Search, filter and sort controls; only the current page is rendered
+    search = st.text_input("Search by name", key="profile_search")
+    filter_col1, filter_col2, filter_col3 = st.columns(3)
+    with filter_col1:
+        location_filter = st.multiselect("Location", LOCATIONS, key="profile_locations")
+    with filter_col2:
+        stage_filter = st.multiselect("Buying Stage", BUYING_STAGES, key="profile_stages")
+    with filter_col3:
+        interest_filter = st.multiselect("Interests", INTERESTS, key="profile_interests")
+    
+    sort_col1, sort_col2, sort_col3, sort_col4 = st.columns(4)
+    with sort_col1:
+        sort_label = st.selectbox("Sort by", list(profile_query.SORT_FIELDS), key="profile_sort")
+    with sort_col2:
+        descending = st.checkbox("Descending", key="profile_descending")
+    with sort_col3:
+        page_size = st.selectbox("Per page", profile_query.PAGE_SIZES, index=1, key="profile_page_size")
+    with sort_col4:
+        page_number = st.number_input("Page", min_value=1, value=1, step=1, key="profile_page")
+    
+    with timed("data"):
+        profile_page = engine.query_profiles(
+            search=search,
+            locations=location_filter,
+            stages=stage_filter,
+            interests=interest_filter,
+            sort_by=profile_query.SORT_FIELDS[sort_label],
+            descending=descending,
+            page=int(page_number),
+            page_size=page_size,
+        )
+    if profile_page.total:
+        first = (profile_page.page - 1) * page_size + 1
+        last = first + len(profile_page.records) - 1
+        st.caption(f"Showing {first}–{last} of {profile_page.total} profiles "
+                   f"(page {profile_page.page} of {profile_page.page_count})")
+    else:
+        st.info("No profiles match the current search and filters.")
+    
+    # Display the current page of profiles in a grid
     cols = st.columns(3)
-    for i, profile in enumerate(st.session_state.consumer_profiles):
+    for i, profile in enumerate(profile_page.records):
         with cols[i % 3]:
             st.markdown(f"""
             <div class="consumer-card">
@@ -184,11 +334,12 @@ elif page == "👥 Consumer Profiles":
             
             if st.button(f"Edit {profile['name']}", key=f"edit_{profile['id']}"):
                 st.session_state.selected_profile = profile
+                st.session_state.selected_revision = profile_store.revision(profile["id"])
     
     # Add new profile button
     if st.button("+ Add New Consumer Profile"):
         st.session_state.selected_profile = {
-            "id": len(st.session_state.consumer_profiles) + 1,
+            "id": dataset.allocate_profile_id(),
             "name": "",
             "age": 30,
             "occupation": "",
@@ -200,40 +351,49 @@ elif page == "👥 Consumer Profiles":
             "avatar": "👤",
             "buying_stage": "Awareness"
         }
+        st.session_state.selected_revision = None
     
-    # Profile editor
-    if st.session_state.selected_profile:
+    # Profile editor: a fragment, so changing a field reruns only the editor rather than the
+    # search and grid above; saving, deleting and cancelling rerun the whole page
+    def remember_edit(edit):
+        st.session_state.profile_undo = (st.session_state.profile_undo + [edit.seq])[-UNDO_STEPS:]
+    
+    @st.fragment
+    def profile_editor():
+        if not st.session_state.selected_profile:
+            return
+        
         st.subheader("Edit Consumer Profile")
         
         col1, col2 = st.columns(2)
         
         with col1:
             name = st.text_input("Name", value=st.session_state.selected_profile.get("name", ""))
-            age = st.number_input("Age", min_value=18, max_value=100, value=st.session_state.selected_profile.get("age", 30))
+            age = st.number_input("Age", min_value=AGE_RANGE[0], max_value=AGE_RANGE[1], value=st.session_state.selected_profile.get("age", 30))
             occupation = st.text_input("Occupation", value=st.session_state.selected_profile.get("occupation", ""))
             income = st.text_input("Income", value=st.session_state.selected_profile.get("income", ""))
-            location = st.selectbox("Location", ["Urban", "Suburban", "Rural"], 
-                                   index=["Urban", "Suburban", "Rural"].index(st.session_state.selected_profile.get("location", "Urban")) if st.session_state.selected_profile.get("location") else 0)
+            location = st.selectbox("Location", LOCATIONS, 
+                                   index=LOCATIONS.index(st.session_state.selected_profile.get("location", "Urban")) if st.session_state.selected_profile.get("location") else 0)
         
         with col2:
-            avatar_options = ["👤", "👩‍💼", "👨‍💼", "👩‍⚕️", "👨‍⚕️", "👩‍🏫", "👨‍🏫", "👩‍💻", "👨‍💻", "👩‍🍳", "👨‍🍳"]
+            avatar_options = AVATARS
             avatar = st.selectbox("Avatar", avatar_options, 
                                  index=avatar_options.index(st.session_state.selected_profile.get("avatar", "👤")) if st.session_state.selected_profile.get("avatar") in avatar_options else 0)
             
-            buying_stage = st.selectbox("Buying Stage", ["Awareness", "Consideration", "Decision"], 
-                                       index=["Awareness", "Consideration", "Decision"].index(st.session_state.selected_profile.get("buying_stage", "Awareness")) if st.session_state.selected_profile.get("buying_stage") else 0)
+            buying_stage = st.selectbox("Buying Stage", BUYING_STAGES, 
+                                       index=BUYING_STAGES.index(st.session_state.selected_profile.get("buying_stage", "Awareness")) if st.session_state.selected_profile.get("buying_stage") else 0)
             
             interests = st.multiselect("Interests", 
-                                      ["Fitness", "Technology", "Cooking", "Travel", "Family activities", "Gaming", "Reading", "Music", "Sustainable products", "Health & wellness", "Home improvement"],
+                                      INTERESTS,
                                       default=st.session_state.selected_profile.get("interests", []))
             
             pain_points = st.multiselect("Pain Points", 
-                                        ["Lack of time", "Price sensitivity", "Feature complexity", "Technical support", "Product reliability", "Family budget constraints", "Value for money", "Wants eco-friendly options"],
+                                        PAIN_POINTS,
                                         default=st.session_state.selected_profile.get("pain_points", []))
         
         spending_habits = st.text_area("Spending Habits", value=st.session_state.selected_profile.get("spending_habits", ""))
         
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
         with col1:
             if st.button("Save Profile"):
                 # Update the profile in session state
@@ -251,38 +411,52 @@ elif page == "👥 Consumer Profiles":
                     "buying_stage": buying_stage
                 }
                 
-                # Find and update the profile in the list, or add new one
-                found = False
-                for i, profile in enumerate(st.session_state.consumer_profiles):
-                    if profile["id"] == updated_profile["id"]:
-                        st.session_state.consumer_profiles[i] = updated_profile
-                        found = True
-                        break
-                
-                if not found:
-                    st.session_state.consumer_profiles.append(updated_profile)
-                
-                st.session_state.selected_profile = None
-                st.success("Profile saved successfully!")
-                st.experimental_rerun()
+                # Update the shared profile (aggregates get the delta), or add new one;
+                # refuse if another session saved it since it was opened
+                try:
+                    remember_edit(dataset.save_profile(updated_profile,
+                                                       expected_revision=st.session_state.get("selected_revision")))
+                except ProfileConflictError:
+                    st.error("This profile was changed in another session. Cancel and reopen it to see the latest version.")
+                else:
+                    st.session_state.selected_profile = None
+                    st.success("Profile saved successfully!")
+                    st.rerun()
         
         with col2:
             if st.button("Cancel"):
                 st.session_state.selected_profile = None
-                st.experimental_rerun()
+                st.rerun()
+        
+        with col3:
+            if st.session_state.selected_profile["id"] in profile_store and st.button("Delete Profile"):
+                try:
+                    remember_edit(dataset.delete_profile(st.session_state.selected_profile["id"]))
+                except KeyError:
+                    pass  # Already deleted in another session
+                st.session_state.selected_profile = None
+                st.rerun()
+    
+    profile_editor()
 
 elif page == "🤖 AI Consumer Advisor":
+    import pandas as pd
+    
+    profile_store = dataset.profiles
+    advice_history = get_advice_history()
     st.title("AI Consumer Advisor")
     st.write("Get personalized advice based on consumer profiles.")
     
     # Select a consumer profile
     selected_profile_id = st.selectbox(
         "Select Consumer Profile",
-        options=[p["id"] for p in st.session_state.consumer_profiles],
-        format_func=lambda x: next((p["name"] for p in st.session_state.consumer_profiles if p["id"] == x), "")
+        options=sorted(profile_store.ids.tolist()),
+        format_func=profile_store.name_of,
+        key="advisor_profile_id"
     )
     
-    selected_profile = next((p for p in st.session_state.consumer_profiles if p["id"] == selected_profile_id), None)
+    with timed("data"):
+        selected_profile = profile_store.get(selected_profile_id)
     
     if selected_profile:
         col1, col2 = st.columns([1, 2])
@@ -300,157 +474,138 @@ elif page == "🤖 AI Consumer Advisor":
                 <p><b>Pain Points:</b> {', '.join(selected_profile['pain_points'])}</p>
             </div>
             """, unsafe_allow_html=True)
+            
+            # Nearest personas by interests, pain points, age, income, location and stage
+            st.markdown("#### Similar Consumers")
+            
+            def select_advisor_profile(profile_id):
+                st.session_state.advisor_profile_id = profile_id
+            
+            with timed("data"):
+                similar_consumers = engine.similar_profiles(selected_profile_id, k=SIMILAR_PROFILES_SHOWN)
+            for similar, similarity in similar_consumers:
+                st.button(f"{similar['avatar']} {similar['name']}, {similar['age']} · {similarity:.0%} similar",
+                          key=f"similar_{similar['id']}", on_click=select_advisor_profile, args=(similar["id"],),
+                          help=f"{similar['occupation']}, {similar['location']}, {similar['buying_stage']}: "
+                               f"{', '.join(similar['interests'])}")
         
         with col2:
             st.subheader("What would you like advice on?")
             
             advice_type = st.selectbox(
                 "Advice Type",
-                ["Product Recommendations", "Marketing Messaging", "Pricing Strategy", "Customer Experience", "Feature Prioritization"]
+                ADVICE_TYPES
             )
             
             category = st.selectbox(
                 "Product Category",
-                ["All Categories", "Fitness", "Technology", "Cooking", "Family activities", "Sustainable products"]
+                PRODUCT_CATEGORIES
             )
             
+            advice_request = (selected_profile["id"], advice_type, category)
             if st.button("Generate Advice"):
-                with st.spinner("Analyzing consumer profile..."):
-                    # Simulate processing time
-                    progress_bar = st.progress(0)
-                    for i in range(100):
-                        progress_bar.progress(i + 1)
-                        import time
-                        time.sleep(0.01)
-                    
-                    # Generate advice based on profile and selected options
-                    if advice_type == "Product Recommendations":
-                        # Filter products by category and interests
-                        relevant_products = []
-                        for product in st.session_state.products:
-                            if (category == "All Categories" or product["category"] == category) and \
-                               (product["category"] in selected_profile["interests"] or \
-                                (product["eco_friendly"] and "Sustainable products" in selected_profile["interests"])):
-                                relevant_products.append(product)
-                        
-                        # Sort by relevance (simplistic approach for demo)
-                        if "Price sensitivity" in selected_profile["pain_points"]:
-                            relevant_products.sort(key=lambda x: x["price"])
-                        
-                        # Generate advice
-                        advice = {
-                            "type": advice_type,
-                            "date": "Today",
-                            "content": f"Based on {selected_profile['name']}'s profile, I recommend focusing on these products:\n\n"
-                        }
-                        
-                        if relevant_products:
-                            for product in relevant_products[:3]:
-                                eco_label = " (Eco-friendly)" if product["eco_friendly"] else ""
-                                advice["content"] += f"- {product['name']}{eco_label}: ${product['price']}\n"
-                            
-                            # Add rationale
-                            advice["content"] += f"\nRationale: These products align with {selected_profile['name']}'s interests in {', '.join(selected_profile['interests'][:2])}. "
-                            
-                            if "Price sensitivity" in selected_profile["pain_points"]:
-                                advice["content"] += "I've prioritized more affordable options due to price sensitivity. "
-                            
-                            if "Wants eco-friendly options" in selected_profile["pain_points"] and any(p["eco_friendly"] for p in relevant_products[:3]):
-                                advice["content"] += "I've included eco-friendly options as requested. "
-                            
-                            advice["content"] += f"\n\nFor this {selected_profile['buying_stage'].lower()} stage consumer, emphasize "
-                            
-                            if selected_profile["buying_stage"] == "Awareness":
-                                advice["content"] += "how these products solve specific problems they face."
-                            elif selected_profile["buying_stage"] == "Consideration":
-                                advice["content"] += "comparative benefits and unique features."
-                            else:  # Decision
-                                advice["content"] += "social proof, guarantees, and easy purchasing process."
-                        else:
-                            advice["content"] += "No specific products match the criteria. Consider expanding your product catalog to include items related to " + ", ".join(selected_profile["interests"]) + "."
-                    
-                    elif advice_type == "Marketing Messaging":
-                        # Generate messaging advice
-                        advice = {
-                            "type": advice_type,
-                            "date": "Today",
-                            "content": f"Recommended messaging approach for {selected_profile['name']}:\n\n"
-                        }
-                        
-                        # Tailor by buying stage
-                        if selected_profile["buying_stage"] == "Awareness":
-                            advice["content"] += "Focus on problem identification and education. Use messaging that helps this consumer recognize the challenges they face.\n\n"
-                            advice["content"] += "Suggested headlines:\n"
-                            advice["content"] += f"- \"How {selected_profile['occupation']}s Save Time While Maximizing Results\"\n"
-                            advice["content"] += f"- \"The Hidden Challenges of {selected_profile['interests'][0]} That Nobody Talks About\"\n"
-                            advice["content"] += "- \"Discover What's Possible: Reimagining Your Approach to " + (category if category != "All Categories" else selected_profile["interests"][0]) + "\"\n"
-                        
-                        elif selected_profile["buying_stage"] == "Consideration":
-                            advice["content"] += "Focus on solution comparison and value demonstration. Help this consumer evaluate options and see your unique value.\n\n"
-                            advice["content"] += "Suggested headlines:\n"
-                            advice["content"] += f"- \"Why Busy {selected_profile['occupation']}s Choose Our {category if category != 'All Categories' else 'Products'}\"\n"
-                            advice["content"] += "- \"5 Ways Our Approach Stands Apart in " + (category if category != "All Categories" else selected_profile["interests"][0]) + "\"\n"
-                            advice["content"] += f"- \"How We Address the Top 3 {', '.join(selected_profile['pain_points'][:1])} Challenges\"\n"
-                        
-                        else:  # Decision
-                            advice["content"] += "Focus on risk reduction and purchase facilitation. Make the final decision easy and low-risk.\n\n"
-                            advice["content"] += "Suggested headlines:\n"
-                            advice["content"] += "- \"Join Thousands Who've Transformed Their " + (category if category != "All Categories" else selected_profile["interests"][0]) + " Experience\"\n"
-                            advice["content"] += "- \"Our 30-Day Satisfaction Guarantee Means Zero Risk\"\n"
-                            advice["content"] += f"- \"Special Offer for {selected_profile['location']} {selected_profile['occupation']}s: Start Today\"\n"
-                        
-                        # Add channel recommendations
-                        advice["content"] += "\nRecommended channels:\n"
-                        if selected_profile["age"] < 30:
-                            advice["content"] += "- Social media (Instagram, TikTok)\n- Mobile-first content\n- Influencer partnerships\n"
-                        elif selected_profile["age"] < 45:
-                            advice["content"] += "- LinkedIn\n- Email newsletters\n- Podcast sponsorships\n"
-                        else:
-                            advice["content"] += "- Email campaigns\n- Industry publications\n- Facebook\n"
-                    
-                    elif advice_type == "Pricing Strategy":
-                        # Generate pricing advice
-                        advice = {
-                            "type": advice_type,
-                            "date": "Today",
-                            "content": f"Pricing strategy recommendations for {selected_profile['name']}:\n\n"
-                        }
-                        
-                        # Check for price sensitivity
-                        if "Price sensitivity" in selected_profile["pain_points"]:
-                            advice["content"] += "This consumer shows price sensitivity. Consider these strategies:\n\n"
-                            advice["content"] += "1. Value-tier offerings with essential features only\n"
-                            advice["content"] += "2. Installment payment options\n"
-                            advice["content"] += "3. Entry-level products with upgrade paths\n"
-                            advice["content"] += "4. Loyalty programs that reward repeat purchases\n"
-                            advice["content"] += "5. Bundle discounts for complementary products\n\n"
-                            
-                            advice["content"] += "Avoid premium pricing or luxury positioning as this may create immediate barriers."
-                        else:
-                            advice["content"] += "This consumer prioritizes value over lowest price. Consider these strategies:\n\n"
-                            advice["content"] += "1. Good-better-best tiering with clear value steps\n"
-                            advice["content"] += "2. Premium options with additional services included\n"
-                            advice["content"] += "3. Subscription models with exclusive benefits\n"
-                            advice["content"] += "4. Value-based pricing highlighting ROI\n"
-                            advice["content"] += "5. Early adopter or VIP pricing tiers\n\n"
-                            
-                            advice["content"] += "Emphasize the quality/price relationship rather than focusing on discount messaging."
-                    
-                    # Add the advice to history
-                    st.session_state.advice_history.append(advice)
-                    
+                # Advice is generated on the shared job queue, so this run is not blocked and
+                # identical requests from other sessions share one job; unchanged profiles are
+                # served from the shared advice cache
+                try:
+                    job = engine.submit_advice(st.session_state.job_user, selected_profile, advice_type, category)
+                except QueueFullError as error:
+                    st.warning(str(error))
+                except ValueError as error:
+                    st.error(f"Cannot generate {advice_type} advice: {error}")
+                else:
+                    st.session_state.advice_job = (job.id, advice_request)
+                    job.wait(JOB_WAIT_SECONDS)
+            
+            # Poll from a fragment, so only the progress bar reruns until the job is done
+            @st.fragment(run_every=JOB_POLL_SECONDS)
+            def advice_progress(job):
+                if job.done:
+                    st.rerun()
+                show_job_progress(job)
+            
+            advice_job = session_job("advice_job", advice_request)
+            if advice_job is not None and not advice_job.done:
+                advice_progress(advice_job)
+            elif advice_job is not None:
+                advice = advice_job.result
+                # Add the advice to history, once per job
+                if advice_job.status == DONE and st.session_state.get("advice_job_saved") != advice_job.id:
+                    st.session_state.advice_job_saved = advice_job.id
+                    advice_history.append(advice)
+                    repository.append_advice(selected_profile["id"], advice, session=st.session_state.job_user)
+                    if st.session_state.debug_mode:
+                        metrics.observe(page.split(" ", 1)[1], "advice", advice_job.finished_at - advice_job.submitted_at)
+                
                 # Display the advice
-                st.markdown(f"""
-                <div class="consumer-card">
-                    <h3>AI Recommendation</h3>
-                    <p style="white-space: pre-line">{advice["content"]}</p>
-                </div>
-                """, unsafe_allow_html=True)
+                if advice:
+                    st.markdown(f"""
+                    <div class="consumer-card">
+                        <h3>AI Recommendation</h3>
+                        <p style="white-space: pre-line">{advice["content"]}</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                else:
+                    st.error(f"Generating {advice_type} advice failed: {advice_job.error}")
+    
+    # Batch mode: advice for every profile in a segment
+    with st.expander("Batch Advice for a Consumer Segment"):
+        col1, col2 = st.columns(2)
+        with col1:
+            batch_locations = st.multiselect("Locations", LOCATIONS, key="batch_locations")
+            batch_stages = st.multiselect("Buying Stages", BUYING_STAGES, key="batch_stages")
+            batch_interests = st.multiselect("Any of these interests", INTERESTS, key="batch_interests")
+        with col2:
+            batch_types = st.multiselect("Advice Types", SUPPORTED_ADVICE_TYPES, default=SUPPORTED_ADVICE_TYPES,
+                                         key="batch_types")
+            batch_category = st.selectbox("Product Category", PRODUCT_CATEGORIES, key="batch_category")
+        
+        with timed("data"):
+            segment_rows = engine.segment_rows(locations=batch_locations, stages=batch_stages,
+                                               interests=batch_interests)
+        st.write(f"{len(segment_rows)} profiles in segment, {len(segment_rows) * len(batch_types)} advice items to generate")
+        
+        if st.button("Generate Batch Advice", disabled=not batch_types or not len(segment_rows)):
+            try:
+                job = engine.submit_segment_advice(st.session_state.job_user, segment_rows, batch_types,
+                                                   category=batch_category)
+            except QueueFullError as error:
+                st.warning(str(error))
+            else:
+                st.session_state.batch_job = (job.id, None)
+                job.wait(JOB_WAIT_SECONDS)
+        
+        @st.fragment(run_every=JOB_POLL_SECONDS)
+        def batch_progress(job):
+            if job.done:
+                st.rerun()
+            show_job_progress(job)
+        
+        batch_job = session_job("batch_job")
+        if batch_job is not None and not batch_job.done:
+            batch_progress(batch_job)
+        elif batch_job is not None:
+            del st.session_state.batch_job
+            if batch_job.status == DONE:
+                st.session_state.batch_advice = pd.DataFrame(batch_job.result,
+                                                             columns=["profile_id", "type", "date", "content"])
+                if st.session_state.debug_mode:
+                    metrics.observe(page.split(" ", 1)[1], "batch advice",
+                                    batch_job.finished_at - batch_job.submitted_at)
+            else:
+                st.error(f"Generating batch advice failed: {batch_job.error}")
+        
+        if st.session_state.get("batch_advice") is not None:
+            batch_advice = st.session_state.batch_advice
+            st.success(f"Generated {len(batch_advice)} advice items")
+            st.dataframe(batch_advice.head(100), use_container_width=True)
+            st.download_button("Download Batch Advice (CSV)", batch_advice.to_csv(index=False),
+                               file_name="batch_advice.csv", mime="text/csv")
     
     # Show advice history
-    if st.session_state.advice_history:
+    if len(advice_history):
         st.subheader("Previous Advice")
-        for advice in reversed(st.session_state.advice_history[:-1][:3]):  # Show last 3 excluding the most recent
+        for advice in reversed(advice_history.recent(4)[:-1]):  # Show last 3 excluding the most recent
             st.markdown(f"""
             <div class="consumer-card" style="opacity: 0.8">
                 <h4>{advice["type"]} ({advice["date"]})</h4>
@@ -459,22 +614,13 @@ elif page == "🤖 AI Consumer Advisor":
             """, unsafe_allow_html=True)
 
 elif page == "📊 Insights & Analytics":
-    st.title("Consumer Insights Analytics")
+    from consumer_insights import segments
     
-    # Create some sample data for analytics
-    profile_data = pd.DataFrame([
-        {
-            "name": p["name"],
-            "age": p["age"],
-            "location": p["location"],
-            "buying_stage": p["buying_stage"],
-            "interests_count": len(p["interests"]),
-            "pain_points_count": len(p["pain_points"])
-        } for p in st.session_state.consumer_profiles
-    ])
+    profile_store = dataset.profiles
+    st.title("Consumer Insights Analytics")
     
     # Display analytics tabs
-    tab1, tab2, tab3 = st.tabs(["Demographics", "Interests & Pain Points", "Buying Stages"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Demographics", "Interests & Pain Points", "Buying Stages", "Segments"])
     
     with tab1:
         st.subheader("Consumer Demographics")
@@ -486,9 +632,7 @@ elif page == "📊 Insights & Analytics":
             st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
             st.write("Age Distribution")
             
-            fig, ax = plt.subplots(figsize=(8, 5))
-            sns.histplot(profile_data["age"], bins=5, kde=True, ax=ax)
-            st.pyplot(fig)
+            show_chart("age_histogram", lambda charts: charts.age_histogram(*engine.age_histogram()))
             st.markdown("</div>", unsafe_allow_html=True)
         
         with col2:
@@ -496,24 +640,12 @@ elif page == "📊 Insights & Analytics":
             st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
             st.write("Location Distribution")
             
-            location_counts = profile_data["location"].value_counts()
-            fig, ax = plt.subplots(figsize=(8, 5))
-            plt.pie(location_counts, labels=location_counts.index, autopct='%1.1f%%', startangle=90)
-            plt.axis('equal')
-            st.pyplot(fig)
+            show_chart("location_pie", lambda charts: charts.location_pie(engine.value_counts("location")))
             st.markdown("</div>", unsafe_allow_html=True)
     
     with tab2:
         st.subheader("Consumer Interests & Pain Points")
         
-        # Gather all interests and pain points
-        all_interests = []
-        all_pain_points = []
-        
-        for profile in st.session_state.consumer_profiles:
-            all_interests.extend(profile["interests"])
-            all_pain_points.extend(profile["pain_points"])
-        
         col1, col2 = st.columns(2)
         
         with col1:
@@ -521,11 +653,7 @@ elif page == "📊 Insights & Analytics":
             st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
             st.write("Top Interests")
             
-            interest_counts = pd.Series(all_interests).value_counts()
-            fig, ax = plt.subplots(figsize=(8, 5))
-            sns.barplot(x=interest_counts.values, y=interest_counts.index, ax=ax)
-            plt.tight_layout()
-            st.pyplot(fig)
+            show_chart("interests_bar", lambda charts: charts.horizontal_bar(engine.value_counts("interests")))
             st.markdown("</div>", unsafe_allow_html=True)
         
         with col2:
@@ -533,11 +661,7 @@ elif page == "📊 Insights & Analytics":
             st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
             st.write("Top Pain Points")
             
-            pain_point_counts = pd.Series(all_pain_points).value_counts()
-            fig, ax = plt.subplots(figsize=(8, 5))
-            sns.barplot(x=pain_point_counts.values, y=pain_point_counts.index, ax=ax)
-            plt.tight_layout()
-            st.pyplot(fig)
+            show_chart("pain_points_bar", lambda charts: charts.horizontal_bar(engine.value_counts("pain_points")))
             st.markdown("</div>", unsafe_allow_html=True)
     
     with tab3:
@@ -547,43 +671,92 @@ elif page == "📊 Insights & Analytics":
         st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
         st.write("Distribution of Buying Stages")
         
-        buying_stage_counts = profile_data["buying_stage"].value_counts()
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.barplot(x=buying_stage_counts.index, y=buying_stage_counts.values, ax=ax)
-        plt.ylabel("Number of Consumers")
-        plt.xlabel("Buying Stage")
-        st.pyplot(fig)
+        show_chart("stage_bar", lambda charts: charts.stage_bar(engine.value_counts("buying_stage")))
         st.markdown("</div>", unsafe_allow_html=True)
         
         # Funnel visualization
         st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
         st.write("Consumer Journey Funnel")
         
-        stages = ["Awareness", "Consideration", "Decision"]
-        stage_counts = [sum(profile_data["buying_stage"] == stage) for stage in stages]
+        stages = BUYING_STAGES
+        show_chart("stage_funnel", lambda charts: charts.stage_funnel(
+            stages, profile_store.value_counts("buying_stage", sort=False).reindex(stages, fill_value=0).tolist()))
         
-        fig, ax = plt.subplots(figsize=(10, 6))
-        plt.bar(stages, stage_counts, width=0.6)
+        st.markdown("</div>", unsafe_allow_html=True)
         
-        # Add conversion rate arrows
-        if stage_counts[0] > 0 and stage_counts[1] > 0:
-            awareness_to_consideration = f"{(stage_counts[1] / stage_counts[0]) * 100:.1f}%"
-            plt.annotate(f"→ {awareness_to_consideration}", 
-                        xy=(0.5, min(stage_counts[0], stage_counts[1]) + 0.1),
-                        xytext=(0.5, min(stage_counts[0], stage_counts[1]) + 0.1),
-                        arrowprops=dict(arrowstyle="->"))
+        # Journey analytics over the recorded stage transitions
+        st.subheader("Journey Over Time")
+        if not dataset.journey_tracking:
+            st.info("Enable consumer journey tracking in Settings to record stage changes over time.")
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                window = st.selectbox("Window", list(JOURNEY_WINDOWS), index=2, format_func=JOURNEY_WINDOWS.get)
+            with col2:
+                period = st.selectbox("Cohort period", list(COHORT_PERIODS), index=1,
+                                      format_func=COHORT_PERIODS.get)
+            with timed("data"):
+                cohorts = engine.cohort_conversion(days=window, period_days=period)
+                stays = engine.time_in_stage(days=window)
+            
+            st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
+            st.write(f"Conversion by Cohort (entered {stages[0]})")
+            if cohorts["profiles"].sum() == 0:
+                st.info("No consumers entered the journey in this window yet.")
+            else:
+                cohorts.index = cohorts.index.strftime("%Y-%m-%d")
+                st.dataframe(cohorts.style.format("{:.1%}", subset=list(cohorts.columns[1:]), na_rep="–"))
+            st.markdown("</div>", unsafe_allow_html=True)
+            
+            st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
+            st.write("Time in Stage (days)")
+            if stays["stays"].sum() == 0:
+                st.info("No completed stage stays in this window yet.")
+            else:
+                st.dataframe(stays.style.format("{:.1f}", subset=list(stays.columns[1:]), na_rep="–"))
+                show_chart("time_in_stage", lambda charts: charts.horizontal_bar(
+                    stays["p50_days"].fillna(0)), window, dataset.journeys.version)
+            st.markdown("</div>", unsafe_allow_html=True)
+    
+    with tab4:
+        st.subheader("Segment Analysis")
         
-        if stage_counts[1] > 0 and stage_counts[2] > 0:
-            consideration_to_decision = f"{(stage_counts[2] / stage_counts[1]) * 100:.1f}%"
-            plt.annotate(f"→ {consideration_to_decision}", 
-                        xy=(1.5, min(stage_counts[1], stage_counts[2]) + 0.1),
-                        xytext=(1.5, min(stage_counts[1], stage_counts[2]) + 0.1),
-                        arrowprops=dict(arrowstyle="->"))
+        segment_label = st.selectbox("Segment consumers by", list(segments.SEGMENT_FIELDS))
+        segment_field = segments.SEGMENT_FIELDS[segment_label]
+        with timed("data"):
+            report = engine.segment_report(segment_field)
         
-        plt.ylabel("Number of Consumers")
-        plt.title("Consumer Journey Stage Conversion")
-        st.pyplot(fig)
+        # Keep the largest segments readable when there are many (e.g. occupations)
+        shown = report["funnel"].sum(axis=1).nlargest(MAX_SEGMENTS_SHOWN).index
+        if len(shown) < len(report["funnel"]):
+            st.caption(f"Showing the {len(shown)} largest of {len(report['funnel'])} segments")
         
+        st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
+        st.write(f"Journey Funnel by {segment_label}")
+        funnel_table = report["funnel"].loc[shown].join(report["conversion"].loc[shown])
+        st.dataframe(funnel_table.style.format("{:.1%}", subset=list(report["conversion"].columns), na_rep="–"))
+        st.markdown("</div>", unsafe_allow_html=True)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
+            st.write(f"Interests by {segment_label}")
+            
+            show_chart("segment_interests", lambda charts: charts.heatmap(report["interests"].loc[shown]), segment_field)
+            st.markdown("</div>", unsafe_allow_html=True)
+        
+        with col2:
+            st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
+            st.write(f"Pain Points by {segment_label}")
+            
+            show_chart("segment_pain_points", lambda charts: charts.heatmap(report["pain_points"].loc[shown]), segment_field)
+            st.markdown("</div>", unsafe_allow_html=True)
+        
+        st.markdown("<div class='consumer-card'>", unsafe_allow_html=True)
+        st.write("Pain Point Co-occurrence")
+        
+        show_chart("pain_point_pairs", lambda charts: charts.heatmap(report["pain_point_pairs"]))
         st.markdown("</div>", unsafe_allow_html=True)
 
 elif page == "⚙️ Settings":
@@ -592,23 +765,137 @@ elif page == "⚙️ Settings":
     with st.expander("Consumer Profile Settings"):
         st.checkbox("Allow custom attributes for consumer profiles", value=True)
         st.number_input("Maximum number of consumer profiles", min_value=5, max_value=100, value=20)
-        st.checkbox("Enable consumer journey tracking", value=True)
+        journey_tracking = st.checkbox("Enable consumer journey tracking", value=dataset.journey_tracking,
+                                       help="Record every buying-stage change for the journey analytics "
+                                            "on the Insights page (applies to all sessions)")
+        if journey_tracking != dataset.journey_tracking:
+            dataset.journey_tracking = journey_tracking
     
     with st.expander("AI Advisor Settings"):
         st.slider("Creativity level for recommendations", min_value=0, max_value=10, value=7)
         st.multiselect("Enabled advice types", 
-                      ["Product Recommendations", "Marketing Messaging", "Pricing Strategy", "Customer Experience", "Feature Prioritization"],
-                      default=["Product Recommendations", "Marketing Messaging", "Pricing Strategy"])
+                      ADVICE_TYPES,
+                      default=SUPPORTED_ADVICE_TYPES)
         st.checkbox("Include competitive analysis in recommendations", value=False)
+        
+        chart_backend = st.radio("Chart rendering", list(CHART_BACKENDS), format_func=CHART_BACKENDS.get,
+                                 index=list(CHART_BACKENDS).index(st.session_state.chart_backend),
+                                 help="Interactive charts are drawn by the browser from aggregated data; "
+                                      "static images are rendered on the server and suit exports")
+        if chart_backend != st.session_state.chart_backend:
+            st.session_state.chart_backend = chart_backend
+        
+        # Shared by all sessions; counts since the server started
+        cache_stats = dataset.advice_cache.stats()
+        cache_col1, cache_col2, cache_col3, cache_col4 = st.columns(4)
+        cache_col1.metric("Advice cache hits", cache_stats["hits"])
+        cache_col2.metric("Advice cache misses", cache_stats["misses"])
+        cache_col3.metric("Hit rate", f"{cache_stats['hit_rate']:.0%}")
+        cache_col4.metric("Cached advice", cache_stats["entries"])
+        if st.button("Clear advice cache"):
+            dataset.advice_cache.clear()
+        
+        # Background advice jobs of all sessions
+        job_stats = engine.jobs.stats()
+        job_col1, job_col2, job_col3, job_col4 = st.columns(4)
+        job_col1.metric("Queued jobs", job_stats["queued"])
+        job_col2.metric("Running jobs", job_stats["running"])
+        job_col3.metric("Shared requests", job_stats["coalesced"],
+                        help="Requests that joined an identical job already in progress")
+        job_col4.metric("Rejected requests", job_stats["rejected"],
+                        help="Requests refused because a session or the queue had too many jobs waiting")
+    
+    with st.expander("Product Catalog"):
+        catalog = dataset.catalog
+        st.metric("Products", f"{len(catalog):,}")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            catalog_category = st.selectbox("Category", PRODUCT_CATEGORIES, key="catalog_category")
+        with col2:
+            min_price = st.number_input("Minimum price ($)", min_value=0.0, value=0.0, step=10.0)
+        with col3:
+            max_price = st.number_input("Maximum price ($)", min_value=0.0, value=0.0, step=10.0,
+                                        help="0 for no upper limit")
+        eco_only = st.checkbox("Eco-friendly only", key="catalog_eco_only")
+        if max_price and max_price < min_price:
+            st.warning("The maximum price is below the minimum price.")
+        else:
+            products = engine.products(catalog_category, min_price or None, max_price or None, eco_only,
+                                       limit=PRODUCTS_SHOWN)
+            if products:
+                st.caption(f"Cheapest {len(products)} matching products")
+                st.dataframe(products, hide_index=True)
+            else:
+                st.info("No products match these filters.")
+        
+        product_file = st.file_uploader("Product catalog file (CSV or Parquet)", type=["csv", "parquet"],
+                                        help="Columns: id, name, category, price, eco_friendly; "
+                                             "rows with a known id replace that product")
+        if st.button("Import Products", disabled=product_file is None):
+            file_format = "parquet" if product_file.name.lower().endswith(".parquet") else "csv"
+            try:
+                report = dataset.import_products(product_file, file_format)
+            except (ImportError, ValueError, KeyError) as exc:
+                st.error(f"Import failed: {exc}")
+            else:
+                st.success(report.summary())
+                if report.rejected:
+                    import pandas as pd
+                    
+                    st.write("Rejected rows by reason:")
+                    st.dataframe(pd.Series(report.rejections, name="rows").sort_values(ascending=False))
     
     with st.expander("Data Management"):
         st.checkbox("Store historical advice records", value=True)
-        st.number_input("Days to retain advice history", min_value=30, max_value=365, value=90)
-        st.button("Export All Consumer Profiles (CSV)")
-        st.button("Import Consumer Profiles")
+        retention_days = st.number_input("Days to retain advice history", min_value=30, max_value=365,
+                                         value=st.session_state.advice_retention_days)
+        if retention_days != st.session_state.advice_retention_days:
+            st.session_state.advice_retention_days = retention_days
+            get_advice_history().set_retention(retention_days)
+            repository.prune_advice(time.time() - retention_days * DAY)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            for file_format, label in (("csv", "CSV"), ("parquet", "Parquet")):
+                try:
+                    require_format(file_format)
+                except ImportError as exc:
+                    st.caption(str(exc))
+                    continue
+                # The export runs on click, chunk by chunk into a temporary file that is then served
+                st.download_button(f"Export All Consumer Profiles ({label})",
+                                   partial(export_to_temporary_file, repository, file_format),
+                                   file_name=f"consumer_profiles.{file_format}")
+        with col2:
+            uploaded_file = st.file_uploader("Consumer profiles file (CSV or Parquet)", type=["csv", "parquet"])
+            if st.button("Import Consumer Profiles", disabled=uploaded_file is None):
+                file_format = "parquet" if uploaded_file.name.lower().endswith(".parquet") else "csv"
+                status = st.empty()
+                try:
+                    report = dataset.import_profiles(
+                        uploaded_file, file_format,
+                        on_progress=lambda report: status.write(f"Read {report.read:,} rows "
+                                                                f"({report.rows_per_second:,.0f} rows/s)"))
+                except (ImportError, ValueError, KeyError) as exc:
+                    st.error(f"Import failed: {exc}")
+                else:
+                    status.empty()
+                    st.success(report.summary())
+                    if report.rejected:
+                        import pandas as pd
+                        
+                        st.write("Rejected rows by reason:")
+                        st.dataframe(pd.Series(report.rejections, name="rows").sort_values(ascending=False))
     
     with st.expander("Advanced Settings"):
-        st.checkbox("Enable debug mode", value=False)
+        debug_mode = st.checkbox("Enable debug mode", value=st.session_state.debug_mode,
+                                 help="Time every page and stage and show a performance panel in the sidebar")
+        if debug_mode != st.session_state.debug_mode:
+            st.session_state.debug_mode = debug_mode
+            if not debug_mode:
+                # Release the timing log; a session still in debug mode reopens it on its next timing
+                metrics.close_log()
         st.checkbox("Use experimental features", value=False)
         api_key = st.text_input("API Key (if connecting to external services)", type="password")
         st.button("Test API Connection")
@@ -619,3 +906,26 @@ st.markdown("""
     <p>Consumer Insights AI Demo | Created with Streamlit</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Performance panel: page render, data-prep, chart and advice timings across all debug sessions
+if st.session_state.debug_mode:
+    metrics.observe(page.split(" ", 1)[1], "render", time.perf_counter() - page_started)
+    
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        timings = [{name: round(value, 2) if isinstance(value, float) else value for name, value in series.items()}
+                   for series in metrics.snapshot()]
+        if timings:
+            st.dataframe(timings, hide_index=True, use_container_width=True)
+        
+        gauges = metrics.gauge_values()
+        perf_col1, perf_col2 = st.columns(2)
+        perf_col1.metric("Advice cache hits", f"{gauges['advice_cache_hit_rate']:.0%}")
+        perf_col2.metric("Chart cache hits", f"{gauges['chart_cache_hit_rate']:.0%}")
+        
+        st.download_button("Export Prometheus metrics", metrics.to_prometheus(),
+                           file_name="consumer_insights.prom", mime="text/plain")
+        st.download_button("Export JSON lines", metrics.to_json_lines(),
+                           file_name="consumer_insights_metrics.jsonl", mime="application/x-ndjson")
+        if st.button("Reset timings"):
+            metrics.reset()
+            st.rerun()
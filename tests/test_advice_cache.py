@@ -0,0 +1,116 @@
+import sqlite3
+
+import pytest
+
+from consumer_insights.advice_cache import DAY, AdviceCache, AdviceHistory, advice_key
+from consumer_insights.dataset import SharedDataset
+from consumer_insights.sample_data import SAMPLE_PROFILES
+from consumer_insights.storage import SQLiteRepository
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _advice(text):
+    return {"type": "Pricing Strategy", "date": "Today", "content": text}
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = AdviceCache(max_entries=3)
+    for key in "abc":
+        cache.get_or_create((key,), lambda key=key: _advice(key))
+    cache.get_or_create(("a",), lambda: pytest.fail("a is cached"))
+    cache.get_or_create(("d",), lambda: _advice("d"))
+
+    assert len(cache) == 3
+    assert cache.get_or_create(("b",), lambda: _advice("new b"))["content"] == "new b"
+    assert cache.stats() == {"entries": 3, "hits": 1, "misses": 5, "hit_rate": 1 / 6}
+
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = AdviceCache(ttl=60, clock=clock)
+    cache.get_or_create(("a",), lambda: _advice("first"))
+    clock.now += 59
+    assert cache.get_or_create(("a",), lambda: _advice("second"))["content"] == "first"
+    clock.now += 1
+    assert cache.get_or_create(("a",), lambda: _advice("second"))["content"] == "second"
+
+
+def test_cached_advice_is_returned_as_a_copy():
+    cache = AdviceCache()
+    cache.get_or_create(("a",), lambda: _advice("text"))["content"] = "changed"
+    assert cache.get_or_create(("a",), lambda: _advice("other"))["content"] == "text"
+
+
+def test_invalidate_profile_drops_only_that_profiles_entries():
+    cache = AdviceCache()
+    first, second = SAMPLE_PROFILES[:2]
+    for profile in (first, second):
+        for advice_type in ("Pricing Strategy", "Marketing Messaging"):
+            cache.get_or_create(advice_key(profile, advice_type, "All Categories"), lambda: _advice("x"))
+    cache.invalidate_profile(first["id"])
+    assert len(cache) == 2
+    assert all(key[0] == second["id"] for key in cache._entries)
+
+
+def test_profile_edits_invalidate_cached_advice(tmp_path):
+    repository = SQLiteRepository(str(tmp_path / "insights.db"))
+    repository.save_profiles(SAMPLE_PROFILES)
+    dataset = SharedDataset(repository)
+    first, second = (dataset.profiles.get(profile["id"]) for profile in SAMPLE_PROFILES[:2])
+    for profile in (first, second):
+        dataset.generate_advice(profile, "Pricing Strategy")
+
+    dataset.save_profile(dict(first, name="Emily Chen-Park"))
+    assert len(dataset.advice_cache) == 1
+    content = dataset.generate_advice(dataset.profiles.get(first["id"]), "Pricing Strategy")["content"]
+    assert "Emily Chen-Park" in content
+    dataset.delete_profile(second["id"])
+    assert all(key[0] == first["id"] for key in dataset.advice_cache._entries)
+
+
+def test_history_forgets_old_records_and_keeps_a_bounded_number():
+    clock = Clock(100 * DAY)
+    old = {"content": "old", "created_at": clock.now - 31 * DAY}
+    history = AdviceHistory(30, [old, {"content": "kept", "created_at": clock.now - DAY}], max_entries=3,
+                            clock=clock)
+    assert [record["content"] for record in history] == ["kept"]
+
+    for text in "abc":
+        history.append(_advice(text))
+    assert [record["content"] for record in history] == ["a", "b", "c"]
+    assert [record["content"] for record in history.recent(2)] == ["b", "c"]
+
+    clock.now += 10 * DAY
+    history.set_retention(5)
+    assert len(history) == 0
+
+
+def test_stored_history_is_scoped_to_the_session(tmp_path):
+    repository = SQLiteRepository(str(tmp_path / "insights.db"))
+    for i, session in enumerate(["one", "two", "one", None]):
+        repository.append_advice(1, _advice(f"advice {i}"), session=session)
+
+    assert [record["content"] for record in repository.recent_advice(session="one")] == ["advice 0", "advice 2"]
+    assert [record["content"] for record in repository.recent_advice(limit=1, session="one")] == ["advice 2"]
+    assert len(repository.recent_advice()) == 4
+
+
+def test_advice_tables_from_before_sessions_are_migrated(tmp_path):
+    path = str(tmp_path / "insights.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE advice (id INTEGER PRIMARY KEY AUTOINCREMENT, profile_id INTEGER, type TEXT,"
+                     " date TEXT, content TEXT, created_at REAL)")
+        conn.execute("INSERT INTO advice (profile_id, type, date, content, created_at) VALUES (1, 't', 'd', 'c', 0)")
+    conn.close()
+
+    repository = SQLiteRepository(path)
+    repository.append_advice(1, _advice("new"), session="one")
+    assert [record["content"] for record in repository.recent_advice()] == ["c", "new"]
+    assert [record["content"] for record in repository.recent_advice(session="one")] == ["new"]
@@ -0,0 +1,90 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from consumer_insights.ingest import MAX_ID, _SeenIds, ingest_products, ingest_profiles
+from consumer_insights.sample_data import SAMPLE_PRODUCTS, SAMPLE_PROFILES
+
+
+def _csv(records):
+    frame = pd.DataFrame(records)
+    for field in ("interests", "pain_points"):
+        if field in frame:
+            frame[field] = frame[field].map("; ".join)
+    return io.BytesIO(frame.to_csv(index=False).encode())
+
+
+def _ingest(ingest, records, chunk_size=1000):
+    written = []
+    report = ingest(_csv(records), written.extend, chunk_size=chunk_size)
+    return report, written
+
+
+def test_profile_rows_are_rejected_for_the_first_rule_they_break():
+    valid = dict(SAMPLE_PROFILES[0], id=1)
+    rows = [
+        valid,
+        dict(valid, id="x"),
+        dict(valid, id=0),
+        dict(valid, id=1.5),
+        dict(valid, id=MAX_ID + 1),
+        dict(valid, id=2, name=" "),
+        dict(valid, id=3, age=5),
+        dict(valid, id=4, location="Mars"),
+        dict(valid, id=5, buying_stage="Loyal"),
+        dict(valid, id=6, interests=["Fitness", "Knitting"]),
+        dict(valid, id=7, income="lots"),
+        dict(valid, id=1, name="Duplicate"),
+        dict(valid, id="x", age=5),
+    ]
+    report, written = _ingest(ingest_profiles, rows)
+
+    assert [profile["id"] for profile in written] == [1]
+    assert written[0]["name"] == valid["name"]
+    assert report.read == len(rows) and report.accepted == 1
+    assert report.rejections == {
+        "invalid id": 5, "missing name": 1, "age out of range": 1, "unknown location": 1,
+        "unknown buying stage": 1, "unknown interests": 1, "invalid income": 1, "duplicate id": 1,
+    }
+
+
+def test_duplicate_ids_are_rejected_across_chunks():
+    rows = [dict(SAMPLE_PROFILES[0], id=i) for i in (5, 6, 7, 5, 8, 6)]
+    report, written = _ingest(ingest_profiles, rows, chunk_size=2)
+
+    assert [profile["id"] for profile in written] == [5, 6, 7, 8]
+    assert report.rejections == {"duplicate id": 2}
+
+
+def test_invalid_products_are_rejected():
+    valid = dict(SAMPLE_PRODUCTS[0], id=1)
+    rows = [
+        valid,
+        dict(valid, id=-3),
+        dict(valid, id=2, category="Weapons"),
+        dict(valid, id=3, price="free"),
+        dict(valid, id=4, price=-1),
+        dict(valid, id=5, eco_friendly="maybe"),
+        dict(valid, id=1),
+        dict(valid, id=6, eco_friendly="yes"),
+    ]
+    report, written = _ingest(ingest_products, rows)
+
+    assert [(product["id"], product["eco_friendly"]) for product in written] == [(1, valid["eco_friendly"]), (6, True)]
+    assert report.rejections == {"invalid id": 1, "unknown category": 1, "invalid price": 2,
+                                 "invalid eco-friendly flag": 1, "duplicate id": 1}
+
+
+def test_seen_ids_match_a_set_for_dense_and_sparse_ids():
+    seen, reference = _SeenIds(), set()
+    rng = np.random.default_rng(0)
+    for ids in (np.arange(1, 1000), rng.integers(1, MAX_ID, 100), rng.integers(1, 5000, 500), np.array([2 ** 40])):
+        ids = np.unique(ids)
+        assert seen.contains(ids).tolist() == [i in reference for i in ids.tolist()]
+        new = ids[~seen.contains(ids)]
+        seen.add(new)
+        reference.update(new.tolist())
+        assert seen.contains(ids).all()
+    # Sparse ids stay in the set instead of growing the bitmap to the largest id
+    assert len(seen._dense) < 64 * len(reference)
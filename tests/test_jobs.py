@@ -0,0 +1,143 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_profiles
+from consumer_insights import batch
+from consumer_insights.dataset import SharedDataset
+from consumer_insights.engine import _POOL_THRESHOLD, InsightsEngine
+from consumer_insights.jobs import DONE, FAILED, QUEUED, JobQueue, QueueFullError
+from consumer_insights.sample_data import SAMPLE_PRODUCTS
+from consumer_insights.storage import SQLiteRepository
+
+TIMEOUT = 60
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(workers=1)
+    yield queue
+    queue.close(wait=False)
+
+
+def _blocker(queue):
+    """Submit a job that keeps the only worker busy until the returned event is set."""
+    gate, started = threading.Event(), threading.Event()
+
+    def block(progress):
+        started.set()
+        gate.wait(TIMEOUT)
+
+    queue.submit("blocker", "block", block)
+    assert started.wait(TIMEOUT)
+    return gate
+
+
+def test_concurrent_submits_with_a_key_share_one_job(queue):
+    gate = _blocker(queue)
+    calls = []
+
+    def work(progress):
+        calls.append(1)
+        return "result"
+
+    jobs = []
+    threads = [threading.Thread(target=lambda user=user: jobs.append(queue.submit(user, "work", work, key="same")))
+               for user in ("a", "b", "c", "a")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    gate.set()
+
+    assert len({job.id for job in jobs}) == 1
+    job = jobs[0]
+    assert job.wait(TIMEOUT)
+    assert job.status == DONE and job.result == "result"
+    assert sorted(job.users) == ["a", "b", "c"]
+    assert calls == [1]
+    assert queue.stats()["coalesced"] == 3
+    # Once finished, the key no longer joins the old job
+    assert queue.submit("a", "work", work, key="same").id != job.id
+
+
+def test_pending_jobs_are_limited_per_user_and_overall(queue):
+    queue.max_pending_per_user = 2
+    queue.max_queued = 3
+    gate = _blocker(queue)
+    queue.submit("a", "work", lambda progress: None)
+    queue.submit("a", "work", lambda progress: None)
+
+    with pytest.raises(QueueFullError):
+        queue.submit("a", "work", lambda progress: None)
+    queue.submit("b", "work", lambda progress: None)
+    with pytest.raises(QueueFullError):
+        queue.submit("c", "work", lambda progress: None)
+    assert queue.stats()["rejected"] == 2
+    gate.set()
+
+
+def test_users_are_served_in_turn(queue):
+    gate = _blocker(queue)
+    order = []
+    jobs = [queue.submit(user, "work", lambda progress, user=user: order.append(user))
+            for user in ("a", "a", "a", "b")]
+    assert jobs[-1].status == QUEUED
+    assert queue.position(jobs[-1]) == 1
+    gate.set()
+    for job in jobs:
+        assert job.wait(TIMEOUT)
+    assert order == ["a", "b", "a", "a"]
+
+
+def test_failed_job_reports_its_error(queue):
+    def fail(progress):
+        progress("working", 0.5)
+        raise ValueError("bad input")
+
+    job = queue.submit("a", "work", fail, key="fails")
+    assert job.wait(TIMEOUT)
+    assert job.status == FAILED
+    assert job.error == "bad input"
+    assert job.stage == "working"
+    assert queue.submit("a", "work", lambda progress: 1, key="fails").id != job.id
+
+
+def test_finished_jobs_expire():
+    now = [0.0]
+    queue = JobQueue(workers=1, finished_ttl=10, clock=lambda: now[0])
+    job = queue.submit("a", "work", lambda progress: 1)
+    assert job.wait(TIMEOUT)
+    assert queue.get(job.id) is job
+    now[0] = 11.0
+    with pytest.raises(KeyError):
+        queue.get(job.id)
+    queue.close()
+
+
+def test_large_segment_job_runs_on_the_process_pool(tmp_path, monkeypatch):
+    repository = SQLiteRepository(str(tmp_path / "insights.db"))
+    repository.save_profiles(generate_profiles(_POOL_THRESHOLD + 500, seed=2))
+    repository.save_products(SAMPLE_PRODUCTS)
+    engine = InsightsEngine(SharedDataset(repository))
+    pools = []
+
+    class RecordingPool(batch.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(kwargs["mp_context"].get_start_method())
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", RecordingPool)
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    store = engine.profiles
+    rows = np.arange(len(store))
+
+    job = engine.submit_segment_advice("analyst", rows, ["Product Recommendations"])
+    assert job.wait(TIMEOUT)
+    engine.jobs.close()
+
+    assert job.status == DONE, job.error
+    assert pools == [batch._START_METHOD]
+    assert sorted(advice["profile_id"] for advice in job.result) == sorted(store.ids.tolist())
@@ -0,0 +1,182 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from consumer_insights import profile_query
+from consumer_insights.dataset import SharedDataset
+from consumer_insights.journal import CREATE, DELETE, UPDATE
+from consumer_insights.profile_query import search_rows, sort_order
+from consumer_insights.profile_store import ProfileConflictError, ProfileStore
+from consumer_insights.sample_data import SAMPLE_PROFILES
+from consumer_insights.segments import SEGMENT_FIELDS, segment_report
+from consumer_insights.storage import SQLiteRepository
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    repository = SQLiteRepository(str(tmp_path / "insights.db"))
+    repository.save_profiles(SAMPLE_PROFILES)
+    return SharedDataset(repository)
+
+
+def _edited(dataset, profile_id, **fields):
+    profile = dataset.profiles.get(profile_id)
+    profile.update(fields)
+    return profile
+
+
+def test_edits_are_journaled_and_persisted(dataset):
+    create = dataset.save_profile(dict(SAMPLE_PROFILES[0], id=100, name="New Person"))
+    update = dataset.save_profile(_edited(dataset, 1, name="Renamed"))
+    delete = dataset.delete_profile(2)
+
+    assert [create.op, update.op, delete.op] == [CREATE, UPDATE, DELETE]
+    assert [edit.seq for edit in dataset.journal.entries()] == [create.seq, update.seq, delete.seq]
+    reloaded = {profile["id"]: profile for chunk in dataset.repository.iter_profiles() for profile in chunk}
+    assert reloaded[100]["name"] == "New Person"
+    assert reloaded[1]["name"] == "Renamed"
+    assert 2 not in reloaded
+
+
+def test_undo_restores_each_kind_of_edit(dataset):
+    original = dataset.profiles.get(1)
+    create = dataset.save_profile(dict(SAMPLE_PROFILES[0], id=100))
+    update = dataset.save_profile(_edited(dataset, 1, name="Renamed"))
+    delete = dataset.delete_profile(2)
+
+    for edit in (delete, update, create):
+        undo = dataset.undo(edit.seq)
+        assert undo.undoes == edit.seq
+    assert dataset.profiles.get(1) == original
+    assert dataset.profiles.get(2)["name"] == SAMPLE_PROFILES[1]["name"]
+    assert 100 not in dataset.profiles
+
+
+def test_undo_after_a_later_edit_conflicts(dataset):
+    first = dataset.save_profile(_edited(dataset, 1, name="First"))
+    dataset.save_profile(_edited(dataset, 1, name="Second"))
+
+    with pytest.raises(ProfileConflictError):
+        dataset.undo(first.seq)
+    assert dataset.profiles.get(1)["name"] == "Second"
+
+
+def test_snapshot_reverts_newer_edits(dataset):
+    first = dataset.save_profile(_edited(dataset, 1, name="First"))
+    dataset.save_profile(_edited(dataset, 1, name="Second"))
+    dataset.delete_profile(3)
+
+    snapshot = dataset.snapshot(first.seq)
+    assert snapshot.get(1)["name"] == "First"
+    assert snapshot.get(3)["name"] == SAMPLE_PROFILES[2]["name"]
+    assert dataset.profiles.get(1)["name"] == "Second"
+    assert 3 not in dataset.profiles
+
+
+def test_compacted_edits_cannot_be_undone_or_snapshotted(dataset):
+    first = dataset.save_profile(_edited(dataset, 1, name="First"))
+    dataset.save_profile(_edited(dataset, 1, name="Second"))
+    dataset.journal.compact(keep=1)
+
+    with pytest.raises(KeyError):
+        dataset.undo(first.seq)
+    with pytest.raises(ValueError):
+        dataset.snapshot(first.seq - 1)
+
+
+def _derived(store):
+    return {
+        "search": {token: search_rows(store, token).tolist() for token in ("a", "em", "renamed", "zz")},
+        "sort": {field: store.column(field)[sort_order(store, field)].tolist() for field in ("id", "name", "age")},
+        "segments": {field: segment_report(store, field) for field in SEGMENT_FIELDS.values()},
+        "frame": store.frame(),
+    }
+
+
+def _assert_same(updated, rebuilt):
+    assert updated["search"] == rebuilt["search"]
+    names = [str(name).lower() for name in updated["sort"].pop("name")]
+    assert names == sorted(names) == [str(name).lower() for name in rebuilt["sort"].pop("name")]
+    assert updated["sort"] == rebuilt["sort"]
+    for field, report in updated["segments"].items():
+        for name, table in report.items():
+            pd.testing.assert_frame_equal(table, rebuilt["segments"][field][name], check_dtype=False)
+    pd.testing.assert_frame_equal(updated["frame"], rebuilt["frame"])
+
+
+@pytest.mark.parametrize("compact_min", [1024, 2])
+def test_derived_indexes_follow_journaled_edits(dataset, monkeypatch, compact_min):
+    monkeypatch.setattr(profile_query, "_COMPACT_MIN", compact_min)
+    store = dataset.profiles
+    _derived(store)
+    rng = np.random.default_rng(0)
+    for step in range(30):
+        ids = store.ids.tolist()
+        kind = step % 3
+        if kind == 0:
+            profile = dict(SAMPLE_PROFILES[step % len(SAMPLE_PROFILES)], id=dataset.allocate_profile_id())
+            dataset.save_profile(dict(profile, name=f"Renamed {profile['name']}"))
+        elif kind == 1:
+            profile_id = int(rng.choice(ids))
+            source = SAMPLE_PROFILES[int(rng.integers(len(SAMPLE_PROFILES)))]
+            dataset.save_profile(_edited(dataset, profile_id, name=source["name"] + " Ann", age=source["age"],
+                                         location=source["location"], interests=source["interests"][:2]))
+        elif len(ids) > 2:
+            dataset.delete_profile(int(rng.choice(ids)))
+        cached = {key: entry[1] for key, entry in store._derived.items()}
+        updated = _derived(store)
+        # The search index and sort orders followed the edit instead of being rebuilt
+        assert all(store._derived[key][1] is cached[key] for key in store._derived
+                   if key == "name_word_index" or key[0] == "sort_order")
+        _assert_same(updated, _derived(ProfileStore.from_records(store.records())))
+
+
+@pytest.mark.parametrize("change", ["create", "update", "delete", "undo"])
+def test_failed_repository_write_leaves_the_store_unchanged(dataset, monkeypatch, change):
+    store = dataset.profiles
+    update = dataset.save_profile(_edited(dataset, 1, name="Saved"))
+    _derived(store)
+    similar = store.cached(("similarity", "test"), lambda: object(), lambda value, edit, row: value)
+    records = list(store.records())
+    version, derived = store.version, dict(store._derived)
+    seen = []
+    dataset.journal.subscribe(seen.append)
+
+    def fail(*args):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(dataset.repository, "apply_edit", fail)
+    with pytest.raises(sqlite3.OperationalError):
+        if change == "create":
+            dataset.save_profile(dict(SAMPLE_PROFILES[0], id=100))
+        elif change == "update":
+            dataset.save_profile(_edited(dataset, 2, name="Lost"), expected_revision=store.revision(2))
+        elif change == "delete":
+            dataset.delete_profile(2)
+        else:
+            dataset.undo(update.seq)
+
+    assert list(store.records()) == records
+    assert store.version == version
+    assert store._derived == derived
+    assert store.cached(("similarity", "test"), lambda: None) is similar
+    assert seen == [] and len(dataset.journal) == 1
+    _assert_same(_derived(store), _derived(ProfileStore.from_records(store.records())))
+
+
+def test_save_profile_returns_the_profile_as_stored(dataset):
+    edit = dataset.save_profile(dict(SAMPLE_PROFILES[0], id=100, age=41.0, interests=["Travel", "Travel"],
+                                     extra="dropped"))
+    assert edit.after == dataset.profiles.get(100)
+    assert dataset.undo(edit.seq).after is None
+
+
+def test_invalid_edit_is_rejected_before_it_is_persisted(dataset):
+    count = dataset.repository.count_profiles()
+    with pytest.raises(ValueError):
+        dataset.save_profile(dict(SAMPLE_PROFILES[0], id=100, interests=[f"Hobby {i}" for i in range(100)]))
+    assert 100 not in dataset.profiles
+    assert dataset.repository.count_profiles() == count
+    assert len(dataset.journal) == 0
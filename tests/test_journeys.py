@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from consumer_insights.journeys import (
+    DAY_MS, EVENT_DTYPE, NO_STAGE, StageEventStore, cohort_conversion, time_in_stage, transition_counts,
+)
+
+START = 1_700_000_000  # Unix seconds, mid-day UTC
+
+
+def _journeys(profiles=300, seed=0):
+    """Random stage journeys over about ten days: ``(time_ms, profile_id, from, to)`` tuples by time."""
+    rng = np.random.default_rng(seed)
+    events = []
+    for profile_id in range(1, profiles + 1):
+        at = START * 1000 + int(rng.integers(0, 6 * DAY_MS))
+        stage = NO_STAGE
+        for _ in range(int(rng.integers(1, 5))):
+            to = int(rng.choice([-1, 0, 1, 2])) if stage != NO_STAGE else int(rng.integers(0, 3))
+            if to == stage:
+                continue
+            events.append((at, profile_id, stage, to))
+            if to == NO_STAGE:
+                break
+            stage = to
+            at += int(rng.integers(60_000, 2 * DAY_MS))
+    return sorted(events)
+
+
+def _append(store, events, rng):
+    # Several batches, each shuffled, so appends span and revisit day partitions out of order
+    for batch in np.array_split(np.arange(len(events)), 4):
+        batch = [events[i] for i in rng.permutation(batch)]
+        store.append(*map(list, zip(*batch)))
+
+
+def _with_dwell(events):
+    previous, rows = {}, []
+    for at, profile_id, from_stage, to_stage in events:
+        known = from_stage != NO_STAGE and profile_id in previous
+        rows.append((at, profile_id, from_stage, to_stage, (at - previous[profile_id]) // 1000 if known else -1))
+        previous[profile_id] = at
+    return np.array(rows, dtype=EVENT_DTYPE)
+
+
+@pytest.fixture
+def journeys():
+    return _journeys()
+
+
+@pytest.fixture
+def store(journeys):
+    store = StageEventStore()
+    _append(store, journeys, np.random.default_rng(1))
+    return store
+
+
+def test_appends_are_partitioned_by_day_and_persisted(tmp_path, journeys):
+    store = StageEventStore(str(tmp_path))
+    _append(store, journeys, np.random.default_rng(1))
+    expected = _with_dwell(journeys)
+
+    assert len(store) == len(journeys) and store.version == 4
+    days = {int(at // DAY_MS) for at, *_ in journeys}
+    assert len(list(tmp_path.iterdir())) == len(days) > 1
+    np.testing.assert_array_equal(store.events(), expected)
+
+    reopened = StageEventStore(str(tmp_path))
+    assert len(reopened) == len(journeys)
+    np.testing.assert_array_equal(reopened.events(), expected)
+    # Appends after reopening continue from the stored events
+    last = journeys[-1]
+    reopened.record(last[1], "Awareness", "Decision", at=last[0] / 1000 + 90)
+    assert reopened.events()[-1]["dwell"] == 90
+
+
+def test_range_scans_across_partitions(store, journeys):
+    expected = _with_dwell(journeys)
+    times = expected["time"]
+    for start, end in ((None, None), (START + 3600, START + 4 * 86400 + 7), (START + 86400.5, None),
+                       (None, START + 2 * 86400), (START + 100 * 86400, None), (START + 5, START + 5)):
+        low = -np.inf if start is None else start * 1000
+        high = np.inf if end is None else end * 1000
+        np.testing.assert_array_equal(store.events(start, end), expected[(times >= low) & (times < high)])
+    assert set(store.columns(START, None, fields=("time", "to_stage"))) == {"time", "to_stage"}
+
+
+def _reference_conversion(events, start, end, period_days, horizon_days, cohort_code):
+    start_ms, end_ms, period_ms = start * 1000, end * 1000, period_days * DAY_MS
+    limit = np.inf if horizon_days is None else end_ms + horizon_days * DAY_MS
+    horizon = np.inf if horizon_days is None else horizon_days * DAY_MS
+    entered, furthest = {}, {}
+    for at, profile_id, _, to_stage in events:
+        if not start_ms <= at < limit:
+            continue
+        if to_stage == cohort_code and at < end_ms and profile_id not in entered:
+            entered[profile_id] = at
+            furthest[profile_id] = cohort_code
+        elif profile_id in entered and to_stage > cohort_code and at - entered[profile_id] <= horizon:
+            furthest[profile_id] = max(furthest[profile_id], to_stage)
+    periods = -(-(end_ms - start_ms) // period_ms)
+    sizes = np.zeros(periods, dtype=np.int64)
+    reached = np.zeros((periods, 3), dtype=np.int64)
+    for profile_id, at in entered.items():
+        period = (at - start_ms) // period_ms
+        sizes[period] += 1
+        reached[period, :furthest[profile_id] + 1] += 1
+    return sizes, reached
+
+
+@pytest.mark.parametrize("period_days, horizon_days, cohort_stage", [
+    (1, None, None), (2, 3, None), (7, None, "Consideration"), (3, 0.5, "Consideration"), (1, None, "Decision"),
+])
+def test_cohort_conversion_matches_a_replay(store, journeys, period_days, horizon_days, cohort_stage):
+    start, end = START + 3600, START + 6 * 86400
+    table = cohort_conversion(store, start, end, period_days, horizon_days, cohort_stage)
+    cohort_code = 0 if cohort_stage is None else store.code(cohort_stage)
+    sizes, reached = _reference_conversion(journeys, start, end, period_days, horizon_days, cohort_code)
+
+    assert list(table.columns) == ["profiles"] + store.stages[cohort_code + 1:]
+    assert table.index[0] == pd.Timestamp(start, unit="s")
+    np.testing.assert_array_equal(table["profiles"], sizes)
+    assert sizes.sum() > 0
+    for code in range(cohort_code + 1, len(store.stages)):
+        expected = np.where(sizes > 0, reached[:, code] / np.maximum(sizes, 1), np.nan)
+        np.testing.assert_allclose(table[store.stages[code]], expected)
+
+
+def test_cohort_conversion_rejects_an_unknown_stage(store):
+    with pytest.raises(ValueError, match="Loyal"):
+        cohort_conversion(store, START, START + 86400, cohort_stage="Loyal")
+
+
+def test_time_in_stage_and_transition_counts(store, journeys):
+    start, end = START + 86400, START + 5 * 86400
+    events = _with_dwell(journeys)
+    events = events[(events["time"] >= start * 1000) & (events["time"] < end * 1000)]
+
+    summary = time_in_stage(store, start, end, quantiles=(0.5,))
+    for code, stage in enumerate(store.stages):
+        days = events["dwell"][(events["from_stage"] == code) & (events["dwell"] >= 0)] / 86400
+        assert summary.loc[stage, "stays"] == len(days) > 0
+        assert summary.loc[stage, "mean_days"] == pytest.approx(days.mean())
+        assert summary.loc[stage, "p50_days"] == pytest.approx(np.median(days))
+
+    counts = transition_counts(store, start, end)
+    for from_code in range(-1, 3):
+        for to_code in range(-1, 3):
+            expected = np.count_nonzero((events["from_stage"] == from_code) & (events["to_stage"] == to_code))
+            assert counts.iloc[from_code + 1, to_code + 1] == expected
+    assert counts.to_numpy().sum() == len(events)
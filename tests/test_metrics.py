@@ -0,0 +1,81 @@
+import json
+import math
+import re
+
+import pytest
+
+from consumer_insights.metrics import BUCKETS, METRIC_NAME, Histogram, Metrics
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = Histogram(bounds=(1.0, 2.0, 4.0))
+    assert math.isnan(histogram.quantile(0.5))
+    for seconds in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(seconds)
+
+    assert histogram.counts == [1, 2, 1, 0]
+    assert histogram.quantile(0.0) == 0.0
+    assert histogram.quantile(0.25) == 1.0
+    assert histogram.quantile(0.5) == 1.5
+    assert histogram.quantile(0.75) == 2.0
+    # Never above the largest observation, even inside a wide bucket
+    assert histogram.quantile(1.0) == 3.0
+
+
+def test_histogram_quantiles_in_the_overflow_bucket_use_the_maximum():
+    histogram = Histogram(bounds=(1.0,))
+    for seconds in (0.5, 5.0, 9.0):
+        histogram.observe(seconds)
+    assert histogram.counts == [1, 2]
+    assert histogram.quantile(1.0) == 9.0
+    assert 1.0 < histogram.quantile(0.5) < 9.0
+    assert histogram.sum == 14.5 and histogram.max == 9.0
+
+
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\]|\\.)*",?)*\})? \S+$')
+
+
+def test_prometheus_export_format():
+    metrics = Metrics(gauges={"advice_cache_hit_rate": lambda: 0.75})
+    for seconds in (0.0002, 0.003, 0.003, 20.0):
+        metrics.observe("Dashboard", "chart", seconds)
+    metrics.observe('Say "hi"\n', "load", 0.5)
+    lines = metrics.to_prometheus().split("\n")
+
+    assert lines[:2] == [f"# HELP {METRIC_NAME} Time spent per page and stage.", f"# TYPE {METRIC_NAME} histogram"]
+    assert lines[-1] == ""
+    for line in lines[2:-1]:
+        assert line.startswith("# TYPE ") or SAMPLE.match(line), line
+
+    labels = 'page="Dashboard",stage="chart"'
+    buckets = [line for line in lines if line.startswith(f"{METRIC_NAME}_bucket{{{labels},")]
+    assert len(buckets) == len(BUCKETS) + 1
+    cumulative = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert cumulative == sorted(cumulative)
+    assert f'{METRIC_NAME}_bucket{{{labels},le="0.00025"}} 1' in lines
+    assert f'{METRIC_NAME}_bucket{{{labels},le="0.005"}} 3' in lines
+    assert f'{METRIC_NAME}_bucket{{{labels},le="10.0"}} 3' in lines
+    assert f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} 4' in lines
+    assert f"{METRIC_NAME}_count{{{labels}}} 4" in lines
+    sum_line = next(line for line in lines if line.startswith(f"{METRIC_NAME}_sum{{{labels}}}"))
+    assert float(sum_line.rsplit(" ", 1)[1]) == pytest.approx(20.0062)
+    assert f'{METRIC_NAME}_count{{page="Say \\"hi\\"\\n",stage="load"}} 1' in lines
+    assert lines[-3:-1] == ["# TYPE consumer_insights_advice_cache_hit_rate gauge",
+                            "consumer_insights_advice_cache_hit_rate 0.75"]
+
+
+def test_json_lines_export_and_log(tmp_path):
+    log_path = tmp_path / "metrics.jsonl"
+    metrics = Metrics(gauges={"entries": lambda: 3}, log_path=str(log_path), clock=lambda: 123.0)
+    with metrics.timer("Insights", "report"):
+        pass
+    metrics.observe("Insights", "report", 0.002)
+    metrics.close_log()
+
+    series, gauge = [json.loads(line) for line in metrics.to_json_lines().splitlines()]
+    assert series["page"] == "Insights" and series["stage"] == "report" and series["count"] == 2
+    assert gauge == {"gauge": "entries", "value": 3.0}
+    logged = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert [entry["seconds"] for entry in logged][1:] == [0.002]
+    assert {entry["time"] for entry in logged} == {123.0}
+    assert metrics.timer("Insights", "report", enabled=False) is metrics.timer("Other", "stage", enabled=False)
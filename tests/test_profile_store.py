@@ -0,0 +1,63 @@
+import pytest
+
+from consumer_insights.profile_store import ProfileConflictError, ProfileStore
+from consumer_insights.sample_data import SAMPLE_PROFILES
+
+
+def _profile(profile_id, **fields):
+    profile = dict(SAMPLE_PROFILES[0], id=profile_id)
+    profile.update(fields)
+    return profile
+
+
+def test_extend_inserts_and_replaces_with_one_version_bump():
+    store = ProfileStore.from_records(SAMPLE_PROFILES)
+    version = store.version
+    store.extend([_profile(100), _profile(1, name="Replaced"), _profile(100, age=50)])
+
+    assert store.version == version + 1
+    assert len(store) == len(SAMPLE_PROFILES) + 1
+    assert store.get(1)["name"] == "Replaced"
+    assert store.get(100)["age"] == 50
+    assert store.value_counts("location", sort=False).sum() == len(store)
+
+
+def test_failed_extend_leaves_the_store_unchanged():
+    store = ProfileStore.from_records(SAMPLE_PROFILES)
+    version = store.version
+    # More distinct locations than the vocabulary allows, so the block is rejected
+    profiles = [_profile(1000 + i, location=f"Place {i}") for i in range(200)]
+
+    with pytest.raises(ValueError):
+        store.extend(profiles)
+
+    assert len(store) == len(SAMPLE_PROFILES)
+    assert store.version == version
+    assert 1000 not in store
+    assert store.get(1000) is None
+    store.upsert(_profile(1000))
+    assert store.get(1000)["id"] == 1000
+
+
+def test_delete_keeps_lookups_consistent():
+    store = ProfileStore.from_records(SAMPLE_PROFILES)
+    deleted = SAMPLE_PROFILES[1]["id"]
+    store.delete(deleted)
+
+    assert deleted not in store
+    assert sorted(store.ids.tolist()) == sorted(p["id"] for p in SAMPLE_PROFILES if p["id"] != deleted)
+    for profile in SAMPLE_PROFILES:
+        if profile["id"] != deleted:
+            assert store.get(profile["id"]) == store.record(store.row_of(profile["id"]))
+            assert store.get(profile["id"])["name"] == profile["name"]
+    assert store.value_counts("location", sort=False).sum() == len(store)
+
+
+def test_upsert_with_stale_revision_conflicts():
+    store = ProfileStore.from_records(SAMPLE_PROFILES)
+    revision = store.revision(1)
+    store.upsert(_profile(1, name="First"), expected_revision=revision)
+
+    with pytest.raises(ProfileConflictError):
+        store.upsert(_profile(1, name="Second"), expected_revision=revision)
+    assert store.get(1)["name"] == "First"
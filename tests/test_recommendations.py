@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from consumer_insights.catalog import ProductCatalog
+from consumer_insights.recommendations import SUSTAINABLE_INTEREST, RecommendationEngine
+from consumer_insights.schema import ALL_CATEGORIES, PRODUCT_CATEGORIES
+
+CATEGORIES = [category for category in PRODUCT_CATEGORIES if category != ALL_CATEGORIES]
+
+
+def _product(rng, product_id):
+    return {"id": product_id, "name": f"Product {product_id}", "category": str(rng.choice(CATEGORIES)),
+            # Few distinct prices, so ties must fall back to catalog order
+            "price": float(rng.choice([9.99, 24.5, 24.5, 99.0, 150.0])), "eco_friendly": bool(rng.random() < 0.4)}
+
+
+def _reference(products, interests, category=None, price_sensitive=False, k=3):
+    """The original linear filter and stable price sort."""
+    matches = [product for product in products
+               if (category is None or product["category"] == category)
+               and (product["category"] in interests
+                    or (product["eco_friendly"] and SUSTAINABLE_INTEREST in interests))]
+    if price_sensitive:
+        matches.sort(key=lambda product: product["price"])
+    return matches[:k]
+
+
+def _price_reference(products, low, high, category, eco_only):
+    return sorted((product for product in products
+                   if (low is None or product["price"] >= low) and (high is None or product["price"] <= high)
+                   and (category is None or product["category"] == category)
+                   and (not eco_only or product["eco_friendly"])), key=lambda product: product["price"])
+
+
+def _check(catalog, products, rng):
+    engine = RecommendationEngine(catalog)
+    interest_sets = [[], [SUSTAINABLE_INTEREST], CATEGORIES[:1], CATEGORIES[1:3] + [SUSTAINABLE_INTEREST]]
+    interest_sets += [list(rng.choice(CATEGORIES + [SUSTAINABLE_INTEREST], size=3, replace=False)) for _ in range(5)]
+    for interests in interest_sets:
+        for category in [None] + CATEGORIES:
+            for price_sensitive in (False, True):
+                for k in (1, 3, 50):
+                    expected = _reference(products, interests, category, price_sensitive, k)
+                    assert engine.recommend(interests, category, price_sensitive, k) == expected
+    for low, high in ((None, None), (None, 24.5), (20, 100), (150.0, None), (200, 300)):
+        for category in [None] + CATEGORIES[:2]:
+            for eco_only in (False, True):
+                rows = catalog.price_range(low, high, category, eco_only)
+                assert catalog.records(rows) == _price_reference(products, low, high, category, eco_only)
+
+
+def _replace(products, product):
+    for i, existing in enumerate(products):
+        if existing["id"] == product["id"]:
+            products[i] = product
+            return
+    products.append(product)
+
+
+def test_recommendations_match_the_linear_filter():
+    rng = np.random.default_rng(0)
+    products = [_product(rng, i) for i in range(1, 301)]
+    catalog = ProductCatalog.from_records(products)
+    _check(catalog, products, rng)
+
+
+def test_indexes_follow_upsert_delete_and_extend():
+    rng = np.random.default_rng(1)
+    products = [_product(rng, i) for i in range(1, 201)]
+    catalog = ProductCatalog.from_records(products)
+
+    for product_id in (5, 50, 150):
+        product = _product(rng, product_id)
+        catalog.upsert(product)
+        _replace(products, product)
+    product = _product(rng, 500)
+    catalog.upsert(product)
+    _replace(products, product)
+    for product_id in (1, 77, 500):
+        catalog.delete(product_id)
+        products = [product for product in products if product["id"] != product_id]
+    _check(catalog, products, rng)
+
+    batch = [_product(rng, i) for i in (10, 20, 600, 601, 10, 600)]
+    catalog.extend(batch)
+    for product in batch:
+        _replace(products, product)
+    assert len(catalog) == len(products)
+    _check(catalog, products, rng)
+
+
+def test_failed_extend_leaves_the_catalog_unchanged():
+    rng = np.random.default_rng(2)
+    products = [_product(rng, i) for i in range(1, 51)]
+    catalog = ProductCatalog.from_records(products)
+    engine = RecommendationEngine(catalog)
+    version = catalog.version
+
+    with pytest.raises(ValueError):
+        catalog.extend([_product(rng, 100), dict(products[0], price=1.0), dict(_product(rng, 101), price="cheap")])
+
+    assert len(catalog) == len(products) and catalog.version == version
+    assert 100 not in catalog and catalog.get(100) is None
+    assert catalog.get(1) == products[0]
+    _check(catalog, products, rng)
+    assert engine.rank([(None, False)], price_sensitive=True, k=len(products)) == \
+        [catalog.row_of(product["id"]) for product in sorted(products, key=lambda product: product["price"])]
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_profiles
+from consumer_insights import segments
+from consumer_insights.dataset import SharedDataset
+from consumer_insights.segments import SEGMENT_FIELDS, _segment_label, segment_report
+from consumer_insights.storage import SQLiteRepository
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    repository = SQLiteRepository(str(tmp_path / "insights.db"))
+    repository.save_profiles(generate_profiles(300, seed=6))
+    return SharedDataset(repository)
+
+
+def _assert_same_report(report, expected):
+    assert report.keys() == expected.keys()
+    for name in expected:
+        pd.testing.assert_frame_equal(report[name], expected[name], check_dtype=False)
+
+
+@pytest.mark.parametrize("field", SEGMENT_FIELDS.values())
+def test_journaled_edits_update_the_cached_report_like_a_rebuild(dataset, monkeypatch, field):
+    store = dataset.profiles
+    updates = []
+    update_report = segments._update_report
+
+    def counting_update(*args):
+        report = update_report(*args)
+        updates.append(report is not None)
+        return report
+    monkeypatch.setattr(segments, "_update_report", counting_update)
+
+    segment_report(store, field)
+    rng = np.random.default_rng(7)
+    new = iter(generate_profiles(20, start_id=1000, seed=8))
+    for step in range(60):
+        ids = store.ids.tolist()
+        if step % 3 == 0:
+            dataset.save_profile(next(new))
+        elif step % 3 == 1:
+            profile = store.get(int(rng.choice(ids)))
+            other = store.get(int(rng.choice(ids)))
+            dataset.save_profile(dict(profile, age=other["age"], location=other["location"],
+                                      occupation=other["occupation"], buying_stage=other["buying_stage"],
+                                      interests=other["interests"], pain_points=profile["pain_points"][1:]))
+        else:
+            dataset.delete_profile(int(rng.choice(ids)))
+
+    # Empty the smallest segment
+    labels = [_segment_label(field, store.record(row)) for row in range(len(store))]
+    smallest = min(set(labels), key=labels.count)
+    for profile_id in [int(store.ids[row]) for row, label in enumerate(labels) if label == smallest]:
+        dataset.delete_profile(profile_id)
+
+    updated = segment_report(store, field)
+    assert smallest not in updated["funnel"].index
+    assert updates and all(updates)
+    store._derived.clear()
+    _assert_same_report(updated, segment_report(store, field))
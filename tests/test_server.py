@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import pytest
+
+from consumer_insights.engine import InsightsEngine
+from consumer_insights.server import ApiServer
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # Seeded with the sample profiles and products
+    engine = InsightsEngine.open(str(tmp_path / "insights.db"))
+    yield engine
+    engine.jobs.close()
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        return None
+    headers = {}
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    return int(status_line.split()[1]), headers, json.loads(body)
+
+
+async def _exchange(engine, requests, raw=None):
+    """Send ``(method, target, body)`` requests on one keep-alive connection; return the responses."""
+    api = ApiServer(engine, threads=2)
+    server = await api.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        responses = []
+        for method, target, body in requests:
+            body = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b""
+            writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            responses.append(await _read_response(reader))
+        if raw is not None:
+            writer.write(raw)
+            await writer.drain()
+            responses.append(await _read_response(reader))
+            responses.append(await reader.read())  # the server closes the connection
+        writer.close()
+        return responses
+    finally:
+        server.close()
+        await server.wait_closed()
+        api.close()
+
+
+def _call(engine, *requests, raw=None):
+    return asyncio.run(_exchange(engine, requests, raw))
+
+
+def test_routes_return_json(engine):
+    health, page, profile, similar, products, advice, counts, report = _call(
+        engine,
+        ("GET", "/health", None),
+        ("GET", "/profiles?page_size=2&sort=name", None),
+        ("GET", "/profiles/1", None),
+        ("GET", "/profiles/1/similar?k=2", None),
+        ("GET", "/products?max_price=50&limit=5", None),
+        ("POST", "/advice", {"profile_id": 1, "advice_type": "Pricing Strategy"}),
+        ("GET", "/analytics/counts/location", None),
+        ("GET", "/analytics/segments/location/", None),
+    )
+    assert all(status == 200 and headers["connection"] == "keep-alive"
+               for status, headers, _ in (health, page, profile, similar, products, advice, counts, report))
+    profile_count = len(engine.profiles)
+    assert page[2]["total"] == profile_count and len(page[2]["profiles"]) == 2
+    names = [record["name"] for record in page[2]["profiles"]]
+    assert names == sorted(names)
+    assert profile[2]["id"] == 1
+    assert len(similar[2]) == 2 and all(match["profile"]["id"] != 1 for match in similar[2])
+    prices = [product["price"] for product in products[2]]
+    assert prices == sorted(prices) and all(price <= 50 for price in prices)
+    assert advice[2]["type"] == "Pricing Strategy" and "Pricing strategy" in advice[2]["content"]
+    assert sum(counts[2].values()) == profile_count
+    assert set(report[2]) >= {"funnel", "conversion"} and set(report[2]["funnel"]) == {"index", "columns", "data"}
+
+
+def test_errors_map_to_status_codes(engine):
+    responses = _call(
+        engine,
+        ("GET", "/nowhere", None),
+        ("DELETE", "/profiles/1", None),
+        ("GET", "/profiles/999999", None),
+        ("GET", "/profiles?page_size=0", None),
+        ("POST", "/advice", {"profile_id": 1, "advice_type": "Horoscope"}),
+        ("POST", "/advice", b"{not json"),
+        ("POST", "/advice", [1, 2]),
+        ("POST", "/advice/batch", {"profile_ids": "1"}),
+        ("GET", "/health", None),
+    )
+    statuses = [status for status, _, _ in responses]
+    assert statuses == [404, 405, 404, 400, 400, 400, 400, 400, 200]
+    assert responses[0][2] == {"error": "Not Found"}
+    assert responses[1][2] == {"error": "Method Not Allowed"}
+    assert "page_size" in responses[3][2]["error"]
+    assert responses[6][2] == {"error": "Request body must be a JSON object"}
+
+
+def test_malformed_requests_close_the_connection(engine):
+    (status, _, _), (bad_status, headers, body), rest = _call(
+        engine, ("GET", "/health", None), raw=b"NONSENSE\r\n\r\n")
+    assert status == 200
+    assert bad_status == 400 and headers["connection"] == "close"
+    assert body == {"error": "Malformed request line"}
+    assert rest == b""
+
+
+def test_oversized_and_chunked_bodies_are_rejected(engine):
+    for raw, message in ((b"POST /advice HTTP/1.1\r\nContent-Length: 999999999\r\n\r\n", "Request body too large"),
+                         (b"POST /advice HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n",
+                          "Chunked request bodies are not supported")):
+        (status, _, body), rest = _call(engine, raw=raw)
+        assert status == 400 and body == {"error": message} and rest == b""
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_profiles
+from consumer_insights.dataset import SharedDataset
+from consumer_insights.similarity import feature_matrix, similar_profiles
+from consumer_insights.storage import SQLiteRepository
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    repository = SQLiteRepository(str(tmp_path / "insights.db"))
+    repository.save_profiles(generate_profiles(500, seed=3))
+    return SharedDataset(repository)
+
+
+@pytest.mark.parametrize("approximate", [False, True])
+def test_similarity_index_follows_journaled_edits(dataset, approximate):
+    store = dataset.profiles
+    similar_profiles(store, 1, approximate=approximate)
+    index, _ = store._derived[("similarity_index", approximate)][1]
+    rng = np.random.default_rng(4)
+    new = iter(generate_profiles(50, start_id=1000, seed=5))
+    for step in range(60):
+        ids = store.ids.tolist()
+        if step % 3 == 0:
+            dataset.save_profile(next(new))
+        elif step % 3 == 1:
+            profile = store.get(int(rng.choice(ids)))
+            dataset.save_profile(dict(profile, age=int(rng.integers(18, 80)), interests=profile["interests"][:1]))
+        else:
+            dataset.delete_profile(int(rng.choice(ids)))
+
+    # The cached index was updated rather than rebuilt, and matches a fresh encoding
+    assert store._derived[("similarity_index", approximate)][1][0] is index
+    vectors, _ = feature_matrix(store)
+    assert len(index) == len(store)
+    np.testing.assert_allclose(np.array([index.vector(row) for row in range(len(store))]), vectors, atol=1e-6)
+    if approximate:
+        index.nprobe = len(index.centroids)
+    for profile_id in store.ids[:20].tolist():
+        row = store.row_of(profile_id)
+        expected = np.sort(vectors @ vectors[row])[::-1][1:6]
+        scores = [score for _, score in similar_profiles(store, profile_id, approximate=approximate)]
+        np.testing.assert_allclose(scores, expected, atol=1e-5)
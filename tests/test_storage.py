@@ -0,0 +1,42 @@
+import pytest
+
+from benchmarks.synthetic import generate_profiles
+from consumer_insights.ingest import ingest_profiles
+from consumer_insights.sample_data import SAMPLE_PROFILES
+from consumer_insights.storage import SQLiteRepository, export_to_temporary_file
+
+
+def _profiles(repository):
+    return [profile for chunk in repository.iter_profiles() for profile in chunk]
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_export_and_import_round_trip(tmp_path, file_format):
+    if file_format == "parquet":
+        pytest.importorskip("pyarrow")
+    profiles = generate_profiles(1200, seed=8) + [
+        dict(SAMPLE_PROFILES[0], id=5000, name='Chen, "Em"', interests=["Travel"], pain_points=[]),
+        dict(SAMPLE_PROFILES[1], id=5001, spending_habits="Line one\nline two; with a separator"),
+    ]
+    source = SQLiteRepository(str(tmp_path / "source.db"))
+    source.save_profiles(profiles)
+
+    with export_to_temporary_file(source, file_format, chunk_size=500) as exported:
+        target = SQLiteRepository(str(tmp_path / "target.db"))
+        report = ingest_profiles(exported, target.save_profiles, file_format, chunk_size=300)
+
+    assert report.read == report.accepted == len(profiles)
+    assert _profiles(target) == _profiles(source)
+    quoted = next(profile for profile in _profiles(target) if profile["id"] == 5000)
+    assert quoted["name"] == 'Chen, "Em"'
+    assert quoted["interests"] == ["Travel"] and quoted["pain_points"] == []
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_empty_export_round_trips(tmp_path, file_format):
+    if file_format == "parquet":
+        pytest.importorskip("pyarrow")
+    source = SQLiteRepository(str(tmp_path / "source.db"))
+    with export_to_temporary_file(source, file_format) as exported:
+        report = ingest_profiles(exported, lambda profiles: None, file_format)
+    assert report.read == report.accepted == 0